@@ -0,0 +1 @@
+"""Administration of the application."""
@@ -0,0 +1,99 @@
+"""Routes for the administration module."""
+
+from __future__ import annotations
+
+import logging
+
+from flask import (
+    Blueprint,
+    Response,
+    abort,
+    current_app,
+    make_response,
+    redirect,
+    request,
+)
+
+from audiobooks import maintenance as db_maintenance
+from audiobooks.admission import exempt, writes
+from audiobooks.extensions import admission_control, db, libraries, maintenance
+from audiobooks.jobs.models import Job
+from audiobooks.jobs.tasks import job_runner
+
+
+log: logging.Logger = logging.getLogger(__name__)
+admin_blueprint = Blueprint("admin", __name__, url_prefix="/admin")
+
+MAINTENANCE_JOBS: dict[str, str] = {
+    "optimize": "optimize_database",
+    "vacuum": "vacuum_database",
+    "check": "check_database",
+    "backup": "backup_database",
+}
+
+
+@admin_blueprint.route("/admission")
+@exempt
+def read_admission() -> Response:
+    """Read the metrics of the admission control.
+
+    The route is exempt from admission control, so it answers when the application
+    is saturated.
+
+    Returns:
+        Response: The queue depth, requests in flight, admitted and shed, of each
+            pool and route limit.
+    """
+    return make_response(admission_control.metrics())
+
+
+@admin_blueprint.route("/maintenance")
+def read_maintenance() -> Response:
+    """Read the storage status of the databases, their schedule and backups.
+
+    Returns:
+        Response: The maintenance status.
+    """
+    backup_dir = maintenance.backup_dir()
+    backups = sorted(backup_dir.glob("audiobooks-*.sqlite"), reverse=True)
+    return make_response(
+        {
+            "database": db_maintenance.database_status(db.engine),
+            "libraries": libraries.for_each(
+                lambda _: db_maintenance.database_status(maintenance.engine())
+            ),
+            "schedule": {
+                job_type: interval
+                for job_type, interval in current_app.config["JOB_SCHEDULE"].items()
+                if interval
+            },
+            "backups": [path.name for path in backups],
+        }
+    )
+
+
+@admin_blueprint.route("/maintenance/<string:task>")
+@writes
+def run_maintenance(task: str) -> Response:
+    """Submit a maintenance task of the database as a background job.
+
+    Args:
+        task (str): The task: optimize, vacuum, check or backup.
+
+    Returns:
+        Response: The job status.
+
+    Raises:
+        HTTPError: Raises 400 error if the arguments don't match the task.
+        HTTPError: Raises 404 error if the task is not found.
+    """
+    if task not in MAINTENANCE_JOBS:
+        log.warning(f"Can't find the maintenance task {task}")
+        abort(404)
+    try:
+        job: Job = job_runner.submit(MAINTENANCE_JOBS[task], **request.args.to_dict())
+    except TypeError as exception:
+        log.warning(f"Can't submit the maintenance task {task}: {exception}")
+        abort(400)
+    log.info(f"Submitted the maintenance task {task} as job {job.record_id}")
+    return make_response(redirect(f"/jobs/{job.record_id}"))
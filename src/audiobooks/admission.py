@@ -0,0 +1,217 @@
+"""Admission control and load shedding of the requests."""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from flask import Flask, current_app, g, request
+from werkzeug.exceptions import ServiceUnavailable
+
+
+log: logging.Logger = logging.getLogger(__name__)
+EXTENSION_NAME = "admission_control"
+
+READ = "read"
+WRITE = "write"
+EXEMPT = "exempt"
+_POOL_ATTRIBUTE = "admission_pool"
+
+View = Callable[..., Any]
+
+
+def writes(view: View) -> View:
+    """Mark a view as a write, admitted by the write pool.
+
+    Args:
+        view (View): The view function.
+
+    Returns:
+        View: The view function.
+    """
+    setattr(view, _POOL_ATTRIBUTE, WRITE)
+    return view
+
+
+def exempt(view: View) -> View:
+    """Mark a view as exempt from admission control.
+
+    Args:
+        view (View): The view function.
+
+    Returns:
+        View: The view function.
+    """
+    setattr(view, _POOL_ATTRIBUTE, EXEMPT)
+    return view
+
+
+class Limiter:
+    """Concurrency limit of a pool or a route, with its metrics."""
+
+    def __init__(self, limit: int) -> None:
+        """Initialize an instance of Limiter.
+
+        Args:
+            limit (int): The maximum number of concurrent requests.
+        """
+        self.limit: int = limit
+        self.in_flight: int = 0
+        self.waiting: int = 0
+        self.max_waiting: int = 0
+        self.admitted: int = 0
+        self.shed: int = 0
+        self._semaphore = threading.BoundedSemaphore(limit)
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline: float) -> bool:
+        """Wait for a slot until a deadline.
+
+        Args:
+            deadline (float): The deadline, in ``time.monotonic()`` seconds.
+
+        Returns:
+            bool: True if a slot was acquired, False if the request must be shed.
+        """
+        with self._lock:
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+        acquired = False
+        try:
+            acquired = self._semaphore.acquire(
+                timeout=max(deadline - time.monotonic(), 0)
+            )
+        finally:
+            with self._lock:
+                self.waiting -= 1
+                if acquired:
+                    self.in_flight += 1
+                    self.admitted += 1
+                else:
+                    self.shed += 1
+        return acquired
+
+    def release(self) -> None:
+        """Release a slot acquired with ``acquire``."""
+        with self._lock:
+            self.in_flight -= 1
+        self._semaphore.release()
+
+    def metrics(self) -> dict[str, int]:
+        """Get the metrics of the limiter.
+
+        Returns:
+            dict[str, int]: The limit, the requests in flight and waiting, the
+                maximum of requests waiting, and the requests admitted and shed.
+        """
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "max_waiting": self.max_waiting,
+                "admitted": self.admitted,
+                "shed": self.shed,
+            }
+
+
+class _AdmissionState:
+    def __init__(
+        self,
+        pools: dict[str, Limiter],
+        routes: dict[str, Limiter],
+        queue_timeout: float,
+        retry_after: int,
+    ) -> None:
+        self.pools: dict[str, Limiter] = pools
+        self.routes: dict[str, Limiter] = routes
+        self.queue_timeout: float = queue_timeout
+        self.retry_after: int = retry_after
+
+
+class AdmissionControl:
+    """Flask extension limiting the number of concurrent requests.
+
+    When ``ADMISSION_CONTROL`` is enabled, each request must get a slot in the read
+    pool, of ``ADMISSION_READ_LIMIT`` slots, or in the write pool, of
+    ``ADMISSION_WRITE_LIMIT`` slots, for the views marked with ``writes``.
+    ``ADMISSION_ROUTE_LIMITS`` maps endpoints, such as
+    ``library.find_duplicate_records``, to a lower limit of their own, for expensive
+    routes. The routes of the named libraries have their own endpoints, under the
+    ``libraries`` blueprint, so they need their own limits. A request waits at most
+    ``ADMISSION_QUEUE_TIMEOUT`` seconds for its slots, then it is shed with a 503
+    response and a ``Retry-After`` header of ``ADMISSION_RETRY_AFTER`` seconds. The
+    slots are released when the request is torn down.
+    """
+
+    def init_app(self, app: Flask) -> None:
+        """Initialize the admission control for a Flask application.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        if not app.config["ADMISSION_CONTROL"]:
+            return
+        app.extensions[EXTENSION_NAME] = _AdmissionState(
+            pools={
+                READ: Limiter(app.config["ADMISSION_READ_LIMIT"]),
+                WRITE: Limiter(app.config["ADMISSION_WRITE_LIMIT"]),
+            },
+            routes={
+                view: Limiter(int(limit))
+                for view, limit in app.config["ADMISSION_ROUTE_LIMITS"].items()
+            },
+            queue_timeout=app.config["ADMISSION_QUEUE_TIMEOUT"],
+            retry_after=app.config["ADMISSION_RETRY_AFTER"],
+        )
+        app.before_request(self._admit)
+        app.teardown_request(self._release)
+
+    def metrics(self) -> dict[str, Any]:
+        """Get the metrics of the pools and routes of the current application.
+
+        Returns:
+            dict[str, Any]: Whether admission control is enabled, the metrics of each
+                pool and route limit, and the total of requests shed.
+        """
+        state: _AdmissionState | None = current_app.extensions.get(EXTENSION_NAME)
+        if state is None:
+            return {"enabled": False}
+        limiters = [*state.pools.values(), *state.routes.values()]
+        return {
+            "enabled": True,
+            "pools": {name: pool.metrics() for name, pool in state.pools.items()},
+            "routes": {name: route.metrics() for name, route in state.routes.items()},
+            "shed": sum(limiter.shed for limiter in limiters),
+        }
+
+    @staticmethod
+    def _admit() -> None:
+        state: _AdmissionState = current_app.extensions[EXTENSION_NAME]
+        if request.endpoint is None or request.endpoint == "static":
+            return
+        view = current_app.view_functions[request.endpoint]
+        pool = getattr(view, _POOL_ATTRIBUTE, READ)
+        if pool == EXEMPT:
+            return
+        route = state.routes.get(request.endpoint)
+        limiters = [route] if route is not None else []
+        limiters.append(state.pools[pool])
+        deadline = time.monotonic() + state.queue_timeout
+        acquired: list[Limiter] = []
+        for limiter in limiters:
+            if not limiter.acquire(deadline):
+                for held in acquired:
+                    held.release()
+                log.info(f"Shed a request to {request.endpoint} ({pool})")
+                raise ServiceUnavailable(retry_after=state.retry_after)
+            acquired.append(limiter)
+        g.admission = acquired
+
+    @staticmethod
+    def _release(exception: BaseException | None) -> None:
+        for limiter in g.pop("admission", []):
+            limiter.release()
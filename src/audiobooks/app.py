@@ -2,17 +2,33 @@
 
 from flask import Flask
 
-from audiobooks.extensions import cache, db
+from audiobooks.admin.routes import admin_blueprint
+from audiobooks.extensions import (
+    admission_control,
+    cache,
+    cover_cache,
+    db,
+    libraries,
+    maintenance,
+    read_snapshot,
+    write_coalescer,
+)
+from audiobooks.jobs.routes import jobs_blueprint
+from audiobooks.jobs.tasks import job_runner, job_scheduler
+from audiobooks.library.progress import progress_buffer
 from audiobooks.library.routes import library_blueprint
 from audiobooks.main_page.routes import main_blueprint
+from audiobooks.maintenance import upgrade_schema
 
 
-def create_app(config_object: str = "audiobooks.configuration.Config") -> Flask:
+def create_app(
+    config_object: object | str = "audiobooks.configuration.Config",
+) -> Flask:
     """Create the Flask application and initialize it.
 
     Args:
-        config_object (str, optional): Name of the object containing the app
-            configuration. Defaults to "audiobooks.configuration".
+        config_object (object | str, optional): The object containing the app
+            configuration, or its name. Defaults to "audiobooks.configuration".
 
     Returns:
         Flask: The Flask application.
@@ -30,10 +46,21 @@ def register_extensions(app: Flask) -> None:
     Args:
         app (Flask): The Flask application.
     """
+    admission_control.init_app(app)
     db.init_app(app)
+    maintenance.init_app(app)
     with app.app_context():
         db.create_all()
+        with db.engine.begin() as connection:
+            upgrade_schema(connection, db.metadata)
+    libraries.init_app(app)
     cache.init_app(app)
+    cover_cache.init_app(app)
+    read_snapshot.init_app(app)
+    write_coalescer.init_app(app)
+    progress_buffer.init_app(app)
+    job_runner.init_app(app)
+    job_scheduler.init_app(app)
 
 
 def register_blueprints(app: Flask) -> None:
@@ -44,3 +71,9 @@ def register_blueprints(app: Flask) -> None:
     """
     app.register_blueprint(main_blueprint)
     app.register_blueprint(library_blueprint)
+    if app.config["LIBRARIES"]:
+        app.register_blueprint(
+            library_blueprint, url_prefix="/lib/<library:library>", name="libraries"
+        )
+    app.register_blueprint(jobs_blueprint)
+    app.register_blueprint(admin_blueprint)
@@ -0,0 +1,255 @@
+"""Async (ASGI) serving path for the read routes of the library API.
+
+The routes read the same database through SQLAlchemy's asyncio extension and the
+``aiosqlite`` driver, with the models of ``audiobooks.library.models``. Writes stay
+on the Flask application. The application can be served by any ASGI server, for
+example with ``uvicorn --factory audiobooks.asgi:create_asgi_app``.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import json
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+from urllib.parse import parse_qsl
+
+import sqlalchemy
+from flask import Config as FlaskConfig
+from werkzeug.exceptions import HTTPException, NotFound
+from werkzeug.routing import Map, Rule
+from werkzeug.utils import redirect
+from werkzeug.wrappers import Response
+
+from audiobooks.extensions import db
+from audiobooks.libraries import check_library_name, library_converter
+from audiobooks.library.chapters import read_chapters
+from audiobooks.library.models import Book, LibraryModel, get_library_item
+from audiobooks.maintenance import upgrade_schema
+
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, MutableMapping
+
+    from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+    from sqlalchemy.orm import Session
+
+    Scope = MutableMapping[str, Any]
+    Message = MutableMapping[str, Any]
+    Receive = Callable[[], Awaitable[Message]]
+    Send = Callable[[Message], Awaitable[None]]
+
+
+ASYNC_DRIVER: str = "sqlite+aiosqlite"
+REQUIRED_PACKAGES: tuple[str, ...] = ("aiosqlite", "greenlet")
+
+
+def _read_record(
+    session: Session, model: type[LibraryModel], record_id: int
+) -> dict[str, Any] | None:
+    record: LibraryModel | None = model.get_by_id(record_id, session)
+    return record.to_dict() if record else None
+
+
+def _find_record(session: Session, model: type[LibraryModel], name: str) -> int | None:
+    record: LibraryModel | None = model.get_by_name(name, session)
+    return record.record_id if record else None
+
+
+def _read_book_chapters(session: Session, record_id: int) -> dict[str, Any] | None:
+    book: Book | None = Book.get_by_id(record_id, session)
+    if book is None:
+        return None
+    return {
+        "record_id": book.record_id,
+        "duration_ms": book.duration_ms,
+        "chapters": [chapter.to_dict() for chapter in read_chapters(book, session)],
+    }
+
+
+def _json_response(body: Any | None) -> Response:  # noqa: ANN401
+    if body is None:
+        raise NotFound
+    return Response(json.dumps(body), mimetype="application/json")
+
+
+class AsyncLibraryApp:
+    """ASGI application serving the read routes of the library API.
+
+    Each library, the default one and the named ones in ``LIBRARIES``, gets an async
+    engine on its database file. The model methods run in the sync facade of the
+    async session with ``run_sync``, so the lazy relationships of the records are
+    loaded the same way as in the Flask application. The routes are the same as the
+    Flask ones:
+
+    - ``/lib/<item>/<record_id>``
+    - ``/lib/<item>/find?name=<name>``
+    - ``/lib/book/<record_id>/chapters``
+
+    and are also served under ``/lib/<library>`` for the named libraries.
+    """
+
+    def __init__(self, config: FlaskConfig) -> None:
+        """Initialize an instance of AsyncLibraryApp.
+
+        Args:
+            config (Config): The configuration of the application.
+
+        Raises:
+            RuntimeError: The async SQLite driver is not installed.
+            ValueError: The database or a library name is not valid.
+        """
+        missing = [
+            name for name in REQUIRED_PACKAGES if importlib.util.find_spec(name) is None
+        ]
+        if missing:
+            raise RuntimeError(f"The ASGI application requires: {', '.join(missing)}")
+        from sqlalchemy.ext.asyncio import (  # noqa: PLC0415
+            async_sessionmaker,
+            create_async_engine,
+        )
+
+        url = sqlalchemy.make_url(config["SQLALCHEMY_DATABASE_URI"] or "")
+        if url.get_backend_name() != "sqlite" or url.database in {None, "", ":memory:"}:
+            raise ValueError(f"The ASGI application needs a database file: {url!r}")
+        urls: dict[str | None, sqlalchemy.URL] = {
+            None: url.set(drivername=ASYNC_DRIVER)
+        } | {
+            check_library_name(name): sqlalchemy.make_url(
+                f"{ASYNC_DRIVER}:///{Path(path).resolve()}"
+            )
+            for name, path in config["LIBRARIES"].items()
+        }
+        self.engines: dict[str | None, AsyncEngine] = {
+            library: create_async_engine(library_url)
+            for library, library_url in urls.items()
+        }
+        self.sessions: dict[str | None, async_sessionmaker[AsyncSession]] = {
+            library: async_sessionmaker(engine, expire_on_commit=False)
+            for library, engine in self.engines.items()
+        }
+        self.url_map = Map(
+            converters={"library": library_converter(config["LIBRARIES"])}
+        )
+        for prefix in ("/lib", "/lib/<library:library>"):
+            self.url_map.add(Rule(f"{prefix}/<string:item>/find", endpoint="find"))
+            self.url_map.add(
+                Rule(f"{prefix}/<string:item>/<int:record_id>", endpoint="record")
+            )
+            self.url_map.add(
+                Rule(f"{prefix}/book/<int:record_id>/chapters", endpoint="chapters")
+            )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle an ASGI connection.
+
+        Args:
+            scope (Scope): The connection scope.
+            receive (Receive): Coroutine receiving the messages of the client.
+            send (Send): Coroutine sending the messages to the client.
+
+        Raises:
+            NotImplementedError: The connection is not HTTP or lifespan.
+        """
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            raise NotImplementedError(f"Unsupported connection: {scope['type']}")
+        response = await self.dispatch(
+            scope["method"], scope["path"], scope.get("query_string", b"")
+        )
+        await send(
+            {
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": [
+                    (key.lower().encode("latin-1"), value.encode("latin-1"))
+                    for key, value in response.headers.to_wsgi_list()
+                ],
+            }
+        )
+        body = b"" if scope["method"] == "HEAD" else response.get_data()
+        await send({"type": "http.response.body", "body": body})
+
+    async def dispatch(self, method: str, path: str, query_string: bytes) -> Response:
+        """Answer a request.
+
+        Args:
+            method (str): The HTTP method.
+            path (str): The path of the URL.
+            query_string (bytes): The query string of the URL.
+
+        Returns:
+            Response: The response, or the error response of an HTTP error.
+        """
+        adapter = self.url_map.bind("localhost", path_info=path)
+        try:
+            endpoint, values = adapter.match(method=method)
+            arguments = dict(parse_qsl(query_string.decode("latin-1")))
+            return await self._answer(endpoint, values, arguments)
+        except HTTPException as exception:
+            return exception.get_response()
+
+    async def _answer(
+        self, endpoint: str, values: dict[str, Any], arguments: dict[str, str]
+    ) -> Response:
+        async with self.sessions[values.get("library")]() as session:
+            if endpoint == "chapters":
+                return _json_response(
+                    await session.run_sync(_read_book_chapters, values["record_id"])
+                )
+            model = get_library_item(values["item"])
+            if model is None:
+                raise NotFound
+            if endpoint == "record":
+                return _json_response(
+                    await session.run_sync(_read_record, model, values["record_id"])
+                )
+            name = arguments.get("name")
+            record_id = (
+                await session.run_sync(_find_record, model, name) if name else None
+            )
+            if record_id is None:
+                raise NotFound
+            return redirect(f"./{record_id}")
+
+    async def startup(self) -> None:
+        """Create or upgrade the tables in the database of each library."""
+        for engine in self.engines.values():
+            async with engine.begin() as connection:
+                await connection.run_sync(db.metadata.create_all)
+                await connection.run_sync(upgrade_schema, db.metadata)
+
+    async def shutdown(self) -> None:
+        """Close the connections of all the engines."""
+        for engine in self.engines.values():
+            await engine.dispose()
+
+    async def _lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await self.startup()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+def create_asgi_app(
+    config_object: object | str = "audiobooks.configuration.Config",
+) -> AsyncLibraryApp:
+    """Create the ASGI application.
+
+    Args:
+        config_object (object | str, optional): The object containing the app
+            configuration, or its name. Defaults to "audiobooks.configuration.Config".
+
+    Returns:
+        AsyncLibraryApp: The ASGI application.
+    """
+    config = FlaskConfig(Path(__file__).parent)
+    config.from_object(config_object)
+    return AsyncLibraryApp(config)
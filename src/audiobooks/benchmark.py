@@ -0,0 +1,265 @@
+"""Benchmark of the concurrent read throughput of the WSGI and ASGI applications.
+
+Both applications read the same temporary database of generated books. The WSGI
+application is called by a pool of threads, one per concurrent connection, and the
+ASGI application by as many concurrent tasks. The applications are called in
+process, so the results compare the applications and their database drivers, not
+the HTTP servers::
+
+    python -m audiobooks.benchmark --connections 1 8 32 --requests 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+import rich.console
+import rich.table
+
+from audiobooks.app import create_app
+from audiobooks.asgi import AsyncLibraryApp, create_asgi_app
+from audiobooks.configuration import Config
+from audiobooks.extensions import db
+from audiobooks.library.models import Author, Book
+
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from flask import Flask
+
+
+class BenchmarkResult(NamedTuple):
+    """The throughput of an application for a number of concurrent connections."""
+
+    path: str
+    connections: int
+    requests: int
+    errors: int
+    seconds: float
+
+    @property
+    def throughput(self) -> float:
+        """The number of requests answered per second."""
+        return self.requests / self.seconds if self.seconds else 0.0
+
+
+def benchmark_config(database: Path) -> type[Config]:
+    """Create a configuration class for a benchmark database.
+
+    Args:
+        database (Path): Path of the database file.
+
+    Returns:
+        type[Config]: The configuration class.
+    """
+    return type(
+        "BenchmarkConfig",
+        (Config,),
+        {
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{database.resolve()}",
+            "LIBRARIES": {},
+            "JOB_SCHEDULE": {},
+            "READ_SNAPSHOT": False,
+            "WRITE_COALESCING": False,
+        },
+    )
+
+
+def seed_books(app: Flask, records: int) -> list[str]:
+    """Add generated books with their authors to the database of an application.
+
+    Args:
+        app (Flask): The Flask application.
+        records (int): The number of books.
+
+    Returns:
+        list[str]: The paths of the books in the library API.
+    """
+    with app.app_context():
+        authors = [
+            Author(name=f"Author {number}") for number in range(records // 4 + 1)
+        ]
+        books = [
+            Book(name=f"Book {number}", author=authors[number % len(authors)])
+            for number in range(records)
+        ]
+        db.session.add_all(authors + books)
+        db.session.commit()
+        return [f"/lib/book/{book.record_id}" for book in books]
+
+
+async def asgi_request(
+    app: AsyncLibraryApp, path: str, query_string: bytes = b""
+) -> tuple[int, dict[str, str], bytes]:
+    """Send a GET request to an ASGI application.
+
+    Args:
+        app (AsyncLibraryApp): The ASGI application.
+        path (str): The path of the URL.
+        query_string (bytes, optional): The query string. Defaults to b"".
+
+    Returns:
+        tuple[int, dict[str, str], bytes]: The status, headers and body of the
+            response.
+    """
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "query_string": query_string,
+        "headers": [],
+    }
+    messages: list[dict[str, Any]] = []
+
+    async def receive() -> dict[str, Any]:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict[str, Any]) -> None:
+        messages.append(message)
+
+    await app(scope, receive, send)
+    headers = {
+        key.decode("latin-1"): value.decode("latin-1")
+        for key, value in messages[0]["headers"]
+    }
+    return messages[0]["status"], headers, messages[1]["body"]
+
+
+def benchmark_wsgi(
+    app: Flask, paths: Sequence[str], connections: int, requests: int
+) -> BenchmarkResult:
+    """Measure the throughput of the Flask application.
+
+    Args:
+        app (Flask): The Flask application.
+        paths (Sequence[str]): The paths to request, in turn.
+        connections (int): The number of concurrent connections.
+        requests (int): The total number of requests.
+
+    Returns:
+        BenchmarkResult: The result.
+    """
+    targets = list(itertools.islice(itertools.cycle(paths), requests))
+
+    def get(path: str) -> int:
+        return app.test_client().get(path).status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=connections) as executor:
+        statuses = list(executor.map(get, targets))
+    seconds = time.perf_counter() - start
+    errors = sum(status != 200 for status in statuses)  # noqa: PLR2004
+    return BenchmarkResult("wsgi", connections, requests, errors, seconds)
+
+
+async def benchmark_asgi(
+    app: AsyncLibraryApp, paths: Sequence[str], connections: int, requests: int
+) -> BenchmarkResult:
+    """Measure the throughput of the ASGI application.
+
+    Args:
+        app (AsyncLibraryApp): The ASGI application.
+        paths (Sequence[str]): The paths to request, in turn.
+        connections (int): The number of concurrent connections.
+        requests (int): The total number of requests.
+
+    Returns:
+        BenchmarkResult: The result.
+    """
+    targets = iter(list(itertools.islice(itertools.cycle(paths), requests)))
+    statuses: list[int] = []
+
+    async def connection() -> None:
+        for path in targets:
+            status, _, _ = await asgi_request(app, path)
+            statuses.append(status)
+
+    start = time.perf_counter()
+    async with asyncio.TaskGroup() as group:
+        for _ in range(connections):
+            group.create_task(connection())
+    seconds = time.perf_counter() - start
+    errors = sum(status != 200 for status in statuses)  # noqa: PLR2004
+    return BenchmarkResult("asgi", connections, requests, errors, seconds)
+
+
+def run_benchmark(
+    connections: Sequence[int], requests: int, records: int, directory: Path
+) -> list[BenchmarkResult]:
+    """Benchmark both applications on a new database.
+
+    Args:
+        connections (Sequence[int]): The numbers of concurrent connections to test.
+        requests (int): The number of requests for each test.
+        records (int): The number of generated books.
+        directory (Path): The directory of the database file.
+
+    Returns:
+        list[BenchmarkResult]: The results of both applications for each number of
+            connections.
+    """
+    config = benchmark_config(directory / "benchmark.sqlite")
+    wsgi_app = create_app(config)
+    paths = seed_books(wsgi_app, records)
+
+    async def run_asgi() -> list[BenchmarkResult]:
+        asgi_app = create_asgi_app(config)
+        await asgi_app.startup()
+        try:
+            return [
+                await benchmark_asgi(asgi_app, paths, count, requests)
+                for count in connections
+            ]
+        finally:
+            await asgi_app.shutdown()
+
+    results = [
+        benchmark_wsgi(wsgi_app, paths, count, requests) for count in connections
+    ]
+    return results + asyncio.run(run_asgi())
+
+
+def main(arguments: Sequence[str] | None = None) -> None:
+    """Run the benchmark and print the results.
+
+    Args:
+        arguments (Sequence[str], optional): The command line arguments. Defaults to
+            the arguments of the process.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--connections", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--records", type=int, default=1000)
+    options = parser.parse_args(arguments)
+    with tempfile.TemporaryDirectory(prefix="audiobooks-benchmark-") as directory:
+        results = run_benchmark(
+            options.connections, options.requests, options.records, Path(directory)
+        )
+    table = rich.table.Table(
+        "Path", "Connections", "Requests", "Errors", "Seconds", "Requests/s"
+    )
+    for result in sorted(results, key=lambda result: result.connections):
+        table.add_row(
+            result.path,
+            str(result.connections),
+            str(result.requests),
+            str(result.errors),
+            f"{result.seconds:.2f}",
+            f"{result.throughput:.0f}",
+        )
+    rich.console.Console().print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""Group commit of the write operations through a single writer thread."""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, TypeVar
+
+import sqlalchemy
+from flask import Flask, current_app
+
+from audiobooks.libraries import bind_current_library
+
+
+if TYPE_CHECKING:
+    from flask_sqlalchemy import SQLAlchemy
+
+
+log: logging.Logger = logging.getLogger(__name__)
+EXTENSION_NAME = "write_coalescer"
+
+T = TypeVar("T")
+WriteOperation = tuple[Callable[[], Any], Future[Any]]
+
+
+class _WriterState:
+    def __init__(self, window: float, max_size: int) -> None:
+        self.window: float = window
+        self.max_size: int = max_size
+        self.operations: queue.SimpleQueue[WriteOperation | None] = queue.SimpleQueue()
+        self.thread: threading.Thread | None = None
+        self.error: BaseException | None = None
+        self.lock = threading.Lock()
+
+
+class WriteCoalescer:
+    """Flask extension funneling the write operations through a single writer thread.
+
+    When ``WRITE_COALESCING`` is enabled, the writer thread collects the operations
+    submitted during ``WRITE_BATCH_WINDOW`` seconds, up to ``WRITE_BATCH_MAX_SIZE``
+    operations, and runs them in a single transaction with one commit. Each operation
+    runs in its own savepoint, so a failing operation is rolled back without affecting
+    the others, and its exception is raised in the request that submitted it. If the
+    writer thread stops on an error, the pending and later operations fail with a
+    RuntimeError instead of waiting for it. When it is disabled, each operation runs
+    and commits in the calling thread.
+    """
+
+    def __init__(self, database: SQLAlchemy) -> None:
+        """Initialize an instance of WriteCoalescer.
+
+        Args:
+            database (SQLAlchemy): The Flask-SQLAlchemy extension.
+        """
+        self.db: SQLAlchemy = database
+
+    def init_app(self, app: Flask) -> None:
+        """Initialize the write coalescer for a Flask application.
+
+        The writer thread is stopped when the process exits.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        if not app.config["WRITE_COALESCING"]:
+            return
+        state = _WriterState(
+            app.config["WRITE_BATCH_WINDOW"], app.config["WRITE_BATCH_MAX_SIZE"]
+        )
+        state.thread = threading.Thread(
+            target=self._write_loop, args=(app, state), name="writer", daemon=True
+        )
+        app.extensions[EXTENSION_NAME] = state
+        state.thread.start()
+        atexit.register(self.shutdown, app)
+
+    def execute(self, operation: Callable[[], T], timeout: float | None = None) -> T:
+        """Execute a write operation and commit it.
+
+        The operation must use ``db.session`` and return data that doesn't depend on
+        the session, such as a record id, since it may run in another thread. It runs
+        on the library selected for the request.
+
+        Args:
+            operation (Callable[[], T]): The operation.
+            timeout (float | None, optional): Maximum time to wait for the operation,
+                in seconds. Defaults to None.
+
+        Returns:
+            T: The result of the operation.
+
+        Raises:
+            Exception: Any exception raised by the operation or by the commit.
+            RuntimeError: The writer thread stopped on an error.
+        """
+        state: _WriterState | None = current_app.extensions.get(EXTENSION_NAME)
+        if state is None:
+            try:
+                result = operation()
+                self.db.session.commit()
+            except Exception:
+                self.db.session.rollback()
+                raise
+            return result
+        future: Future[T] = Future()
+        with state.lock:
+            if state.error is not None:
+                raise RuntimeError("The writer thread stopped") from state.error
+            state.operations.put((bind_current_library(operation), future))
+        return future.result(timeout)
+
+    def shutdown(self, app: Flask) -> None:
+        """Stop the writer thread of an application after the pending operations.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        state: _WriterState | None = app.extensions.pop(EXTENSION_NAME, None)
+        if state is not None and state.thread is not None:
+            state.operations.put(None)
+            state.thread.join()
+
+    def _write_loop(self, app: Flask, state: _WriterState) -> None:
+        running = True
+        batch: list[WriteOperation] = []
+        try:
+            while running:
+                batch = []
+                operation = state.operations.get()
+                deadline = time.monotonic() + state.window
+                while operation is not None:
+                    batch.append(operation)
+                    if len(batch) >= state.max_size:
+                        break
+                    try:
+                        operation = state.operations.get(
+                            timeout=max(deadline - time.monotonic(), 0)
+                        )
+                    except queue.Empty:
+                        break
+                running = operation is not None
+                if batch:
+                    with app.app_context():
+                        self._write_batch(batch)
+        except BaseException as exception:
+            log.exception("The writer thread stopped")
+            self._fail_pending(state, batch, exception)
+            raise
+
+    @staticmethod
+    def _fail_pending(
+        state: _WriterState, batch: list[WriteOperation], exception: BaseException
+    ) -> None:
+        with state.lock:
+            state.error = exception
+            pending = list(batch)
+            while True:
+                try:
+                    operation = state.operations.get_nowait()
+                except queue.Empty:
+                    break
+                if operation is not None:
+                    pending.append(operation)
+        error = RuntimeError("The writer thread stopped")
+        error.__cause__ = exception
+        for _, future in pending:
+            if not future.done():
+                future.set_exception(error)
+
+    def _write_batch(self, batch: list[WriteOperation]) -> None:
+        session = self.db.session
+        try:
+            if session.get_bind().dialect.name == "sqlite":
+                session.execute(sqlalchemy.text("BEGIN IMMEDIATE"))
+            completed = self._run_operations(batch)
+            session.commit()
+        except Exception as exception:  # noqa: BLE001
+            session.rollback()
+            log.warning(f"Can't commit a batch of {len(batch)} writes: {exception}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exception)
+            return
+        for future, result in completed:
+            future.set_result(result)
+        log.debug(f"Committed a batch of {len(batch)} writes")
+
+    def _run_operations(
+        self, batch: list[WriteOperation]
+    ) -> list[tuple[Future[Any], Any]]:
+        completed: list[tuple[Future[Any], Any]] = []
+        for operation, future in batch:
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                with self.db.session.begin_nested():
+                    result = operation()
+            except Exception as exception:  # noqa: BLE001
+                future.set_exception(exception)
+            else:
+                completed.append((future, result))
+        return completed
@@ -26,6 +26,69 @@ class Config:
         f"sqlite:///{_database_path}" if _database_path else None
     )
     SQLALCHEMY_TRACK_MODIFICATIONS: bool = False
+    LIBRARIES: dict[str, str] = environment.dict("LIBRARIES", default={})
+    LIBRARY_SEARCH_LIMIT: int = 100
+    SQLITE_JOURNAL_MODE: str = environment.str("SQLITE_JOURNAL_MODE", default="WAL")
+
+    WRITE_COALESCING: bool = environment.bool("WRITE_COALESCING", default=False)
+    WRITE_BATCH_WINDOW: float = environment.float("WRITE_BATCH_WINDOW", default=0.005)
+    WRITE_BATCH_MAX_SIZE: int = 64
+
+    READ_SNAPSHOT: bool = environment.bool("READ_SNAPSHOT", default=False)
+    READ_SNAPSHOT_MAX_AGE: float = environment.float(
+        "READ_SNAPSHOT_MAX_AGE", default=5.0
+    )
+    READ_SNAPSHOT_REFRESH_INTERVAL: float = environment.float(
+        "READ_SNAPSHOT_REFRESH_INTERVAL", default=1.0
+    )
+    READ_SNAPSHOT_MIN_REFRESH_INTERVAL: float = environment.float(
+        "READ_SNAPSHOT_MIN_REFRESH_INTERVAL", default=0.5
+    )
+
+    ADMISSION_CONTROL: bool = environment.bool("ADMISSION_CONTROL", default=False)
+    ADMISSION_READ_LIMIT: int = environment.int("ADMISSION_READ_LIMIT", default=16)
+    ADMISSION_WRITE_LIMIT: int = environment.int("ADMISSION_WRITE_LIMIT", default=4)
+    ADMISSION_ROUTE_LIMITS: dict[str, int] = environment.dict(
+        "ADMISSION_ROUTE_LIMITS", subcast_values=int, default={}
+    )
+    ADMISSION_QUEUE_TIMEOUT: float = environment.float(
+        "ADMISSION_QUEUE_TIMEOUT", default=0.5
+    )
+    ADMISSION_RETRY_AFTER: int = environment.int("ADMISSION_RETRY_AFTER", default=1)
 
     CACHE_TYPE: str = "SimpleCache"
     CACHE_DEFAULT_TIMEOUT: int = 300
+
+    BATCH_MAX_SIZE: int = 100
+
+    CHANGES_PAGE_SIZE: int = 100
+    CHANGES_MAX_PAGE_SIZE: int = 1000
+
+    SIMILAR_BOOKS_COUNT: int = 10
+
+    PROGRESS_FLUSH_INTERVAL: float = environment.float(
+        "PROGRESS_FLUSH_INTERVAL", default=5.0
+    )
+    PROGRESS_MAX_PENDING: int = environment.int("PROGRESS_MAX_PENDING", default=1000)
+
+    MEDIA_ROOT: str | None = environment.str("MEDIA_ROOT", default=None)
+    USE_X_SENDFILE: bool = environment.bool("USE_X_SENDFILE", default=False)
+
+    COVER_CACHE_DIR: str | None = environment.str("COVER_CACHE_DIR", default=None)
+    COVER_CACHE_MAX_BYTES: int = environment.int(
+        "COVER_CACHE_MAX_BYTES", default=256 * 1024**2
+    )
+    COVER_MAX_AGE: int = 7 * 24 * 60 * 60
+    COVER_SIZES: tuple[int, ...] = (96, 256, 512)
+
+    JOB_SCHEDULE: dict[str, float] = environment.dict(
+        "JOB_SCHEDULE", subcast_values=float, default={}
+    )
+    JOB_CANCEL_POLL_INTERVAL: float = 1.0
+
+    BACKUP_DIR: str | None = environment.str("BACKUP_DIR", default=None)
+    BACKUP_KEEP: int = environment.int("BACKUP_KEEP", default=7)
+    BACKUP_PAGES_PER_STEP: int = 1024
+    BACKUP_STEP_SLEEP: float = 0.01
+    VACUUM_PAGES_PER_STEP: int = 256
+    VACUUM_STEP_SLEEP: float = 0.01
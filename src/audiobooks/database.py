@@ -2,10 +2,13 @@
 
 from __future__ import annotations
 
+import functools
+from collections.abc import Callable
 from datetime import date
 from decimal import Decimal
 from typing import Any, Self, get_args
 
+import sqlalchemy.orm
 import sqlalchemy.types
 
 from audiobooks.extensions import db
@@ -25,16 +28,24 @@ class Model(db.Model):
         return f"{type(self).__name__}({self.record_id})"
 
     @classmethod
-    def get_by_id(cls: type[Self], record_id: int | None) -> Self | None:
+    def get_by_id(
+        cls: type[Self],
+        record_id: int | None,
+        session: sqlalchemy.orm.Session | None = None,
+    ) -> Self | None:
         """Get a record by id.
 
         Args:
             record_id (int): The id of the record.
+            session (Session, optional): The session to query. Defaults to the
+                application's ``db.session``.
 
         Returns:
             Model | None: The record or None if not found.
         """
-        return db.session.get(cls, record_id) if record_id is not None else None
+        if record_id is None:
+            return None
+        return (session or db.session).get(cls, record_id)
 
     @classmethod
     def get(cls: type[Self], record: Self | int | None) -> Self | None:
@@ -109,11 +120,35 @@ class Model(db.Model):
 
 
 class SqliteDecimal(sqlalchemy.types.TypeDecorator):
-    """SQLAlchemy decimal type adapter for sqlite databases."""
+    """SQLAlchemy decimal type adapter for sqlite databases.
+
+    Values are stored as integers scaled by ``10**precision``, so they can be compared,
+    ordered and aggregated in SQL. Whole values, the most common, skip the decimal
+    division when results are converted, and converted values are shared between
+    rows since ``Decimal`` is immutable.
+    """
 
     impl = sqlalchemy.types.Integer
     cache_ok = True
 
+    class Comparator(sqlalchemy.types.TypeDecorator.Comparator):
+        """Comparator adding SQL expressions for SqliteDecimal columns."""
+
+        @property
+        def scaled(self) -> sqlalchemy.ColumnElement[int]:
+            """The stored integer value, scaled by ``10**precision``."""
+            return sqlalchemy.type_coerce(self.expr, sqlalchemy.types.Integer)
+
+        def whole_number(self) -> sqlalchemy.ColumnElement[int]:
+            """SQL expression of the whole part of the value, for positive values.
+
+            Returns:
+                ColumnElement[int]: The expression.
+            """
+            return self.scaled // self.type.multiplier
+
+    comparator_factory = Comparator
+
     def __init__(self, precision: int = 2) -> None:
         """Initialize an instance of SqliteDecimal.
 
@@ -128,13 +163,43 @@ class SqliteDecimal(sqlalchemy.types.TypeDecorator):
         self, value: SupportDecimal | None, dialect: sqlalchemy.engine.Dialect
     ) -> int | None:
         """Receive a bound parameter value to be converted."""
-        return int(Decimal(value) * self.multiplier) if value is not None else None
+        if value is None:
+            return None
+        if isinstance(value, int):
+            return value * self.multiplier
+        if isinstance(value, Decimal):
+            return int(value.scaleb(self.precision))
+        return int(Decimal(value) * self.multiplier)
 
     def process_result_value(
         self, value: SupportDecimal, dialect: sqlalchemy.engine.Dialect
     ) -> Decimal | None:
         """Receive a result-row column value to be converted."""
-        return Decimal(value) / self.multiplier if value is not None else None
+        if value is None:
+            return None
+        if isinstance(value, int):
+            return _scaled_decimal(value, self.multiplier)
+        return Decimal(str(value)) / self.multiplier
+
+    def result_processor(
+        self, dialect: sqlalchemy.engine.Dialect, coltype: object
+    ) -> Callable[[Any], Decimal | None]:
+        """Return a conversion function for result-row column values."""
+        multiplier = self.multiplier
+        fallback = self.process_result_value
+
+        def process(value: Any) -> Decimal | None:  # noqa: ANN401
+            if type(value) is int:
+                return _scaled_decimal(value, multiplier)
+            return fallback(value, dialect)
+
+        return process
+
+
+@functools.lru_cache(maxsize=4096)
+def _scaled_decimal(value: int, multiplier: int) -> Decimal:
+    whole, fraction = divmod(value, multiplier)
+    return Decimal(whole) if not fraction else Decimal(value) / multiplier
 
 
 def _simplify_description(
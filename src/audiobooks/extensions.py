@@ -3,6 +3,19 @@
 import flask_caching
 import flask_sqlalchemy
 
+from audiobooks.admission import AdmissionControl
+from audiobooks.coalescer import WriteCoalescer
+from audiobooks.libraries import Libraries, LibrarySession
+from audiobooks.library.covers import CoverCache
+from audiobooks.maintenance import DatabaseMaintenance
+from audiobooks.snapshot import ReadSnapshot
 
+
+admission_control = AdmissionControl()
 cache = flask_caching.Cache()
-db = flask_sqlalchemy.SQLAlchemy()
+cover_cache = CoverCache()
+db = flask_sqlalchemy.SQLAlchemy(session_options={"class_": LibrarySession})
+libraries = Libraries(db)
+maintenance = DatabaseMaintenance(db)
+read_snapshot = ReadSnapshot(db)
+write_coalescer = WriteCoalescer(db)
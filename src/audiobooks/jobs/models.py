@@ -0,0 +1,77 @@
+"""Database table models for the background jobs."""
+
+from __future__ import annotations
+
+from datetime import UTC, datetime
+from enum import StrEnum
+from typing import Any
+
+from audiobooks.database import Model
+from audiobooks.extensions import db
+
+
+def utc_now() -> datetime:
+    """Get the current UTC time, without timezone for the database.
+
+    Returns:
+        datetime: The current time.
+    """
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+class JobStatus(StrEnum):
+    """Enumeration of the statuses of a job."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    @property
+    def is_finished(self) -> bool:
+        """Whether a job with this status is finished."""
+        return self in {JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED}
+
+
+class Job(Model):
+    """Model for the ``job`` table in the database."""
+
+    job_type = db.Column(db.String, nullable=False, index=True)
+    status = db.Column(db.String, nullable=False, default=JobStatus.QUEUED)
+    arguments = db.Column(db.JSON, nullable=False, default=dict)
+    done = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer)
+    result = db.Column(db.JSON)
+    error = db.Column(db.String)
+    cancel_requested = db.Column(db.Boolean, nullable=False, default=False)
+    owner = db.Column(db.String)
+    created_at = db.Column(db.DateTime, nullable=False, default=utc_now)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    def to_status(self) -> dict[str, Any]:
+        """Creates a dictionary of the status of the job.
+
+        Returns:
+            dict[str, Any]: The status, progress and result of the job.
+        """
+        return {
+            "record_id": self.record_id,
+            "job_type": self.job_type,
+            "status": self.status,
+            "arguments": self.arguments,
+            "done": self.done,
+            "total": self.total,
+            "result": self.result,
+            "error": self.error,
+            "cancel_requested": self.cancel_requested,
+            "owner": self.owner,
+            "created_at": _isoformat(self.created_at),
+            "started_at": _isoformat(self.started_at),
+            "finished_at": _isoformat(self.finished_at),
+        }
+
+
+def _isoformat(value: datetime | None) -> str | None:
+    return value.isoformat() if value is not None else None
@@ -0,0 +1,77 @@
+"""Routes for the background jobs module."""
+
+from __future__ import annotations
+
+import logging
+
+from flask import Blueprint, Response, abort, make_response, redirect, request
+
+from audiobooks.admission import writes
+
+from .models import Job
+from .tasks import job_runner
+
+
+log: logging.Logger = logging.getLogger(__name__)
+jobs_blueprint = Blueprint("jobs", __name__, url_prefix="/jobs")
+
+
+@jobs_blueprint.route("/<string:job_type>/submit")
+@writes
+def submit_job(job_type: str) -> Response:
+    """Submit a new job, with the request arguments as the job arguments.
+
+    Args:
+        job_type (str): The type of job to submit.
+
+    Returns:
+        Response: The job status.
+
+    Raises:
+        HTTPError: Raises 400 error if the arguments don't match the job type.
+        HTTPError: Raises 404 error if the job type is not found.
+    """
+    if job_type not in job_runner.job_types:
+        abort(404)
+    try:
+        job: Job = job_runner.submit(job_type, **request.args.to_dict())
+    except TypeError as exception:
+        log.warning(f"Can't submit {job_type}: {exception}")
+        abort(400)
+    return make_response(redirect(f"../{job.record_id}"))
+
+
+@jobs_blueprint.route("/<int:job_id>")
+def read_job(job_id: int) -> Response:
+    """Read the status, progress and result of a job.
+
+    Args:
+        job_id (int): The id of the job.
+
+    Returns:
+        Response: The job status.
+
+    Raises:
+        HTTPError: Raises 404 error if the job is not found.
+    """
+    job: Job = job_runner.get_job(job_id) or abort(404)
+    return make_response(job.to_status())
+
+
+@jobs_blueprint.route("/<int:job_id>/cancel")
+@writes
+def cancel_job(job_id: int) -> Response:
+    """Request the cancellation of a job.
+
+    Args:
+        job_id (int): The id of the job.
+
+    Returns:
+        Response: The job status.
+
+    Raises:
+        HTTPError: Raises 404 error if the job is not found.
+    """
+    job: Job = job_runner.cancel(job_id) or abort(404)
+    log.info(f"Cancellation requested for job {job.record_id}")
+    return make_response(redirect(f"../{job.record_id}"))
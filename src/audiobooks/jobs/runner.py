@@ -0,0 +1,472 @@
+"""In-process runner for the background jobs."""
+
+from __future__ import annotations
+
+import atexit
+import inspect
+import logging
+import math
+import os
+import socket
+import sys
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+import sqlalchemy
+import sqlalchemy.orm
+from flask import Flask, current_app
+
+from .models import Job, JobStatus, utc_now
+
+
+if TYPE_CHECKING:
+    from flask_sqlalchemy import SQLAlchemy
+
+
+log: logging.Logger = logging.getLogger(__name__)
+EXTENSION_NAME = "job_runner"
+BOOT_ID_PATH: Path = Path("/proc/sys/kernel/random/boot_id")
+
+JobFunction = Callable[..., Any]
+
+
+class JobCancelledError(Exception):
+    """Raised in a job when its cancellation was requested."""
+
+
+class JobType(NamedTuple):
+    """A registered type of job."""
+
+    name: str
+    function: JobFunction
+    max_concurrency: int
+
+
+class JobContext:
+    """Context given to a running job to report its progress and check cancellation."""
+
+    def __init__(self, runner: JobRunner, job_id: int) -> None:
+        """Initialize an instance of JobContext.
+
+        Args:
+            runner (JobRunner): The job runner.
+            job_id (int): The id of the job.
+        """
+        self.runner: JobRunner = runner
+        self.job_id: int = job_id
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the cancellation of the job was requested."""
+        return self.runner.is_cancel_requested(self.job_id)
+
+    def check_cancelled(self) -> None:
+        """Stop the job if its cancellation was requested.
+
+        Raises:
+            JobCancelledError: The cancellation of the job was requested.
+        """
+        if self.cancelled:
+            raise JobCancelledError
+
+    def progress(self, done: int, total: int | None = None) -> None:
+        """Report the progress of the job, and stop it if it was cancelled.
+
+        Args:
+            done (int): The number of steps done.
+            total (int | None, optional): The total number of steps, if known.
+                Defaults to None.
+
+        Raises:
+            JobCancelledError: The cancellation of the job was requested.
+        """
+        self.runner.update_job(self.job_id, done=done, total=total)
+        self.check_cancelled()
+
+
+class _RunnerState:
+    def __init__(self, cancel_poll_interval: float) -> None:
+        self.cancel_poll_interval: float = cancel_poll_interval
+        self.executors: dict[str, ThreadPoolExecutor] = {}
+        self.futures: dict[int, Future[None]] = {}
+        self.cancel_events: dict[int, threading.Event] = {}
+        self.cancel_polls: dict[int, float] = {}
+        self.closed: bool = False
+        self.lock = threading.Lock()
+
+
+class JobRunner:
+    """Flask extension running jobs in worker threads.
+
+    Jobs are stored in the ``job`` table of the application database, so their status
+    and results survive a restart. Each job type has its own thread pool, which bounds
+    the number of jobs of that type running at the same time. Workers run jobs inside
+    an application context, so jobs can use ``db.session``; it is committed when the
+    job succeeds and rolled back otherwise. Status updates use their own sessions so
+    they never commit a job's pending changes. The jobs still queued or running are
+    cancelled when the process exits.
+    """
+
+    def __init__(self, database: SQLAlchemy) -> None:
+        """Initialize an instance of JobRunner.
+
+        Args:
+            database (SQLAlchemy): The Flask-SQLAlchemy extension.
+        """
+        self.db: SQLAlchemy = database
+        self.job_types: dict[str, JobType] = {}
+
+    def init_app(self, app: Flask) -> None:
+        """Initialize the job runner for a Flask application.
+
+        Jobs left unfinished by processes which are no longer running are marked as
+        failed.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        app.extensions[EXTENSION_NAME] = _RunnerState(
+            app.config["JOB_CANCEL_POLL_INTERVAL"]
+        )
+        with app.app_context():
+            self.reap()
+        _register_exit(self.shutdown, app)
+
+    def reap(self) -> list[int]:
+        """Mark the unfinished jobs of the processes no longer running as failed.
+
+        The jobs of the other processes of the application, including those running
+        on other hosts, are left alone.
+
+        Returns:
+            list[int]: The ids of the jobs marked as failed.
+        """
+        with self._session() as session:
+            query = sqlalchemy.select(Job.record_id, Job.owner).where(
+                Job.status.in_([JobStatus.QUEUED, JobStatus.RUNNING])
+            )
+            reaped = [
+                job_id
+                for job_id, owner in session.execute(query)
+                if not is_owner_running(owner)
+            ]
+            if reaped:
+                session.execute(
+                    sqlalchemy.update(Job)
+                    .where(Job.record_id.in_(reaped))
+                    .values(
+                        status=JobStatus.FAILED,
+                        error="Interrupted by a restart",
+                        finished_at=utc_now(),
+                    )
+                )
+                session.commit()
+        if reaped:
+            log.warning(f"Marked the interrupted jobs {reaped} as failed")
+        return reaped
+
+    def job_type(
+        self, name: str, max_concurrency: int = 1
+    ) -> Callable[[JobFunction], JobFunction]:
+        """Decorator registering a function as a type of job.
+
+        The function receives a JobContext and the job arguments as keyword arguments,
+        and returns a JSON-serializable result.
+
+        Args:
+            name (str): The name of the job type.
+            max_concurrency (int, optional): Maximum number of jobs of this type
+                running at the same time. Defaults to 1.
+
+        Returns:
+            Callable: The decorator.
+        """
+
+        def register(function: JobFunction) -> JobFunction:
+            self.job_types[name] = JobType(name, function, max_concurrency)
+            return function
+
+        return register
+
+    def submit(self, job_type: str, **arguments) -> Job:
+        """Submit a new job to run in the current application.
+
+        Args:
+            job_type (str): The name of the job type.
+            arguments: Keyword arguments for the job function.
+
+        Returns:
+            Job: The job record.
+
+        Raises:
+            KeyError: The job type is not registered.
+            TypeError: The arguments don't match the job function.
+            RuntimeError: The job runner is shut down.
+        """
+        registered = self.job_types[job_type]
+        inspect.signature(registered.function).bind(None, **arguments)
+        app = _current_app()
+        state = self._state()
+        with state.lock, self._session() as session:
+            if state.closed:
+                raise RuntimeError("The job runner is shut down.")
+            job = Job(
+                job_type=job_type,
+                status=JobStatus.QUEUED,
+                arguments=arguments,
+                owner=process_owner(),
+            )
+            session.add(job)
+            session.commit()
+            session.expunge(job)
+            job_id = job.record_id
+            executor = state.executors.get(job_type)
+            if executor is None:
+                executor = ThreadPoolExecutor(
+                    max_workers=registered.max_concurrency,
+                    thread_name_prefix=f"job-{job_type}",
+                )
+                state.executors[job_type] = executor
+            state.cancel_events[job_id] = threading.Event()
+            state.futures[job_id] = executor.submit(self._run, app, job_id)
+        return job
+
+    def get_job(self, job_id: int) -> Job | None:
+        """Get a job record, detached from any session.
+
+        Args:
+            job_id (int): The id of the job.
+
+        Returns:
+            Job | None: The job or None if not found.
+        """
+        with self._session() as session:
+            job = session.get(Job, job_id)
+            if job is not None:
+                session.expunge(job)
+            return job
+
+    def cancel(self, job_id: int) -> Job | None:
+        """Request the cancellation of a job.
+
+        A queued job is cancelled immediately, a running job stops the next time it
+        checks for cancellation.
+
+        Args:
+            job_id (int): The id of the job.
+
+        Returns:
+            Job | None: The job or None if not found.
+        """
+        state = self._state()
+        with state.lock:
+            if event := state.cancel_events.get(job_id):
+                event.set()
+            future = state.futures.get(job_id)
+        self.update_job(job_id, cancel_requested=True)
+        if future is not None and future.cancel():
+            self._finish(job_id, JobStatus.CANCELLED)
+        return self.get_job(job_id)
+
+    def wait(self, job_id: int, timeout: float | None = None) -> Job | None:
+        """Wait for a job submitted by this process to finish.
+
+        Args:
+            job_id (int): The id of the job.
+            timeout (float | None, optional): Maximum time to wait, in seconds.
+                Defaults to None.
+
+        Returns:
+            Job | None: The job or None if not found.
+        """
+        state = self._state()
+        with state.lock:
+            future = state.futures.get(job_id)
+        if future is not None and not future.cancelled():
+            future.result(timeout)
+        return self.get_job(job_id)
+
+    def is_cancel_requested(self, job_id: int) -> bool:
+        """Check whether the cancellation of a job was requested.
+
+        The cancellations requested through another process are read from the job
+        record, at most once every ``JOB_CANCEL_POLL_INTERVAL`` seconds.
+
+        Args:
+            job_id (int): The id of the job.
+
+        Returns:
+            bool: True if the cancellation was requested.
+        """
+        state = self._state()
+        with state.lock:
+            event = state.cancel_events.get(job_id)
+            if event is None or event.is_set():
+                return event is not None
+            now = time.monotonic()
+            last_poll = state.cancel_polls.get(job_id, -math.inf)
+            if now - last_poll < state.cancel_poll_interval:
+                return False
+            state.cancel_polls[job_id] = now
+        with self._session() as session:
+            query = sqlalchemy.select(Job.cancel_requested).where(
+                Job.record_id == job_id
+            )
+            if session.scalar(query):
+                event.set()
+        return event.is_set()
+
+    def update_job(self, job_id: int, **values) -> None:
+        """Update the columns of a job record in its own transaction.
+
+        Args:
+            job_id (int): The id of the job.
+            values: {Column: value} pairs to update.
+        """
+        with self._session() as session:
+            session.execute(
+                sqlalchemy.update(Job).where(Job.record_id == job_id).values(**values)
+            )
+            session.commit()
+
+    def shutdown(self, app: Flask, *, wait: bool = True) -> None:
+        """Stop the workers of an application, cancelling its queued and running jobs.
+
+        Args:
+            app (Flask): The Flask application.
+            wait (bool, optional): Wait for the running jobs to stop. Defaults to True.
+        """
+        state: _RunnerState | None = app.extensions.get(EXTENSION_NAME)
+        if state is None:
+            return
+        with state.lock:
+            state.closed = True
+            for event in state.cancel_events.values():
+                event.set()
+            queued = [
+                job_id for job_id, future in state.futures.items() if future.cancel()
+            ]
+            executors = list(state.executors.values())
+        with app.app_context():
+            for job_id in queued:
+                self._finish(job_id, JobStatus.CANCELLED)
+        for executor in executors:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _run(self, app: Flask, job_id: int) -> None:
+        with app.app_context():
+            job = self.get_job(job_id)
+            if job is None or job.cancel_requested:
+                self._finish(job_id, JobStatus.CANCELLED)
+                return
+            self.update_job(job_id, status=JobStatus.RUNNING, started_at=utc_now())
+            context = JobContext(self, job_id)
+            try:
+                result = self.job_types[job.job_type].function(context, **job.arguments)
+                self.db.session.commit()
+            except JobCancelledError:
+                self.db.session.rollback()
+                self._finish(job_id, JobStatus.CANCELLED)
+            except Exception as exception:
+                self.db.session.rollback()
+                log.exception(f"Job {job_id} ({job.job_type}) failed")
+                self._finish(job_id, JobStatus.FAILED, error=str(exception))
+            else:
+                self._finish(job_id, JobStatus.SUCCEEDED, result=result)
+
+    def _finish(self, job_id: int, status: JobStatus, **values) -> None:
+        self.update_job(job_id, status=status, finished_at=utc_now(), **values)
+        state = self._state()
+        with state.lock:
+            state.cancel_events.pop(job_id, None)
+            state.cancel_polls.pop(job_id, None)
+            state.futures.pop(job_id, None)
+
+    def _session(self) -> sqlalchemy.orm.Session:
+        return sqlalchemy.orm.Session(self.db.engine, expire_on_commit=False)
+
+    @staticmethod
+    def _state() -> _RunnerState:
+        return current_app.extensions[EXTENSION_NAME]
+
+
+def process_owner() -> str:
+    """Get the owner recorded on the jobs submitted by the current process.
+
+    Returns:
+        str: The host name, boot id, process id and process start time.
+    """
+    pid = os.getpid()
+    return ":".join(
+        (socket.gethostname(), _boot_id(), str(pid), _process_start(pid) or "")
+    )
+
+
+def is_owner_running(owner: str | None) -> bool:
+    """Check whether the process owning a job may still be running.
+
+    A process of another host is assumed to be running. On the current host, the
+    boot id and the start time of the process tell a stopped process from a new one
+    with the same process id.
+
+    Args:
+        owner (str | None): The owner of the job, see ``process_owner``.
+
+    Returns:
+        bool: False if the owner is unknown or is known to be stopped.
+    """
+    if not owner:
+        return False
+    host, boot_id, pid, start = owner.rsplit(":", 3)
+    if host != socket.gethostname():
+        return True
+    if boot_id != _boot_id():
+        return False
+    current_start = _process_start(int(pid))
+    return current_start is not None and current_start == start
+
+
+def _boot_id() -> str:
+    try:
+        return BOOT_ID_PATH.read_text().strip()
+    except OSError:
+        return ""
+
+
+def _process_start(pid: int) -> str | None:
+    # The start time of a process, in clock ticks since the boot, from the 22nd
+    # field of its stat file, or "" where procfs is not available. None if the
+    # process is not running.
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text()
+    except FileNotFoundError:
+        if Path("/proc/self/stat").exists():
+            return None
+    except OSError:
+        pass
+    else:
+        return stat.rpartition(")")[2].split()[19]
+    if sys.platform == "win32":
+        return ""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return None
+    except PermissionError:
+        pass
+    return ""
+
+
+def _register_exit(function: Callable[..., Any], *arguments: Any) -> None:  # noqa: ANN401
+    # The thread pools wait for their workers in a threading exit hook, which runs
+    # before the atexit ones, so the jobs must be cancelled in such a hook to stop.
+    register = getattr(threading, "_register_atexit", atexit.register)
+    register(function, *arguments)
+
+
+def _current_app() -> Flask:
+    return current_app._get_current_object()  # type: ignore[attr-defined]  # noqa: SLF001
@@ -0,0 +1,121 @@
+"""Periodic submission of background jobs."""
+
+from __future__ import annotations
+
+import inspect
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from flask import Flask, current_app
+
+from .models import JobStatus
+
+
+if TYPE_CHECKING:
+    from .runner import JobRunner
+
+
+log: logging.Logger = logging.getLogger(__name__)
+EXTENSION_NAME = "job_scheduler"
+
+
+class _SchedulerState:
+    def __init__(self, schedule: dict[str, float]) -> None:
+        self.schedule: dict[str, float] = schedule
+        self.last_jobs: dict[str, int] = {}
+        self.stop = threading.Event()
+        self.thread: threading.Thread | None = None
+
+
+class JobScheduler:
+    """Flask extension submitting jobs at regular intervals.
+
+    ``JOB_SCHEDULE`` maps job types to their interval, in seconds. Each job type is
+    first submitted one interval after the start of the application, and a new job is
+    not submitted while the previous one of the same type is still unfinished.
+    """
+
+    def __init__(self, runner: JobRunner) -> None:
+        """Initialize an instance of JobScheduler.
+
+        Args:
+            runner (JobRunner): The job runner.
+        """
+        self.runner: JobRunner = runner
+
+    def init_app(self, app: Flask) -> None:
+        """Initialize the job scheduler for a Flask application.
+
+        Args:
+            app (Flask): The Flask application.
+
+        Raises:
+            KeyError: A scheduled job type is not registered.
+            TypeError: A scheduled job type requires arguments.
+        """
+        schedule: dict[str, float] = {
+            job_type: float(interval)
+            for job_type, interval in app.config["JOB_SCHEDULE"].items()
+            if interval
+        }
+        if not schedule:
+            return
+        if unknown := set(schedule) - set(self.runner.job_types):
+            raise KeyError(f"Unknown job types in JOB_SCHEDULE: {sorted(unknown)}")
+        for job_type in schedule:
+            inspect.signature(self.runner.job_types[job_type].function).bind(None)
+        state = _SchedulerState(schedule)
+        state.thread = threading.Thread(
+            target=self._schedule_loop, args=(app, state), name="scheduler", daemon=True
+        )
+        app.extensions[EXTENSION_NAME] = state
+        state.thread.start()
+
+    def shutdown(self, app: Flask) -> None:
+        """Stop the scheduler of an application.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        state: _SchedulerState | None = app.extensions.pop(EXTENSION_NAME, None)
+        if state is not None and state.thread is not None:
+            state.stop.set()
+            state.thread.join()
+
+    def run_pending(self, due: list[str]) -> list[int]:
+        """Submit the due jobs whose previous run is finished.
+
+        Args:
+            due (list[str]): The job types that are due.
+
+        Returns:
+            list[int]: The ids of the submitted jobs.
+        """
+        state: _SchedulerState = current_app.extensions[EXTENSION_NAME]
+        submitted: list[int] = []
+        for job_type in due:
+            last_id = state.last_jobs.get(job_type)
+            last_job = self.runner.get_job(last_id) if last_id is not None else None
+            if last_job is not None and not JobStatus(last_job.status).is_finished:
+                log.info(f"Skipping {job_type}, job {last_id} is still running")
+                continue
+            job = self.runner.submit(job_type)
+            state.last_jobs[job_type] = job.record_id
+            submitted.append(job.record_id)
+        return submitted
+
+    def _schedule_loop(self, app: Flask, state: _SchedulerState) -> None:
+        start = time.monotonic()
+        next_runs = {job: start + interval for job, interval in state.schedule.items()}
+        while not state.stop.wait(max(min(next_runs.values()) - time.monotonic(), 0)):
+            now = time.monotonic()
+            due = [job_type for job_type, at in next_runs.items() if at <= now]
+            for job_type in due:
+                next_runs[job_type] = now + state.schedule[job_type]
+            try:
+                with app.app_context():
+                    self.run_pending(due)
+            except Exception:
+                log.exception(f"Can't submit the scheduled jobs {due}")
@@ -0,0 +1,238 @@
+"""Background job types for the library."""
+
+from __future__ import annotations
+
+import logging
+from collections import Counter
+from collections.abc import Callable
+from typing import Any
+
+from flask import current_app
+
+from audiobooks import maintenance as db_maintenance
+from audiobooks.extensions import cover_cache, db, libraries, maintenance
+from audiobooks.libraries import DEFAULT_LIBRARY
+from audiobooks.library.changes import compact_changes
+from audiobooks.library.chapters import index_book
+from audiobooks.library.models import Book
+from audiobooks.library.similar import update_similar_books
+
+from .runner import JobContext, JobRunner
+from .scheduler import JobScheduler
+
+
+log: logging.Logger = logging.getLogger(__name__)
+job_runner = JobRunner(db)
+job_scheduler = JobScheduler(job_runner)
+
+
+@job_runner.job_type("scan_covers")
+def scan_covers(context: JobContext) -> dict[str, int]:
+    """Extract the covers of the books with an audio file of every library.
+
+    Args:
+        context (JobContext): The job context.
+
+    Returns:
+        dict[str, int]: The number of books scanned and of covers found.
+    """
+
+    def scan(library: str) -> dict[str, int]:
+        query = db.select(Book.file_path).where(Book.file_path.is_not(None))
+        file_paths: list[str] = list(db.session.scalars(query))
+        found = 0
+        for done, file_path in enumerate(file_paths, start=1):
+            found += cover_cache.get_digest(file_path) is not None
+            context.progress(done, len(file_paths))
+        return {"scanned": len(file_paths), "covers": found}
+
+    return _sum_libraries(libraries.for_each(scan))
+
+
+@job_runner.job_type("compact_changes")
+def compact_change_log(context: JobContext, before: int | str) -> dict[str, int]:
+    """Compact the change feed up to a sequence number.
+
+    Args:
+        context (JobContext): The job context.
+        before (int | str): The last sequence number to compact.
+
+    Returns:
+        dict[str, int]: The number of changes removed.
+    """
+    removed = compact_changes(int(before))
+    context.progress(1, 1)
+    return {"removed": removed}
+
+
+@job_runner.job_type("index_chapters")
+def index_chapters(
+    context: JobContext, *, reindex: bool | str = False
+) -> dict[str, int]:
+    """Index the durations and chapters of the books with an audio file.
+
+    The books of every library are indexed, and each book is committed before the
+    progress is reported.
+
+    Args:
+        context (JobContext): The job context.
+        reindex (bool | str, optional): Index the books already indexed again,
+            and retry the audio files that couldn't be read. Defaults to False.
+
+    Returns:
+        dict[str, int]: The number of books scanned and indexed.
+    """
+
+    def index(library: str) -> dict[str, int]:
+        query = db.select(Book).where(Book.file_path.is_not(None))
+        if not _is_set(reindex):
+            query = query.where(Book.duration_ms.is_(None), Book.indexed_at.is_(None))
+        books: list[Book] = list(db.session.scalars(query))
+        indexed = 0
+        for done, book in enumerate(books, start=1):
+            indexed += index_book(book)
+            db.session.commit()
+            context.progress(done, len(books))
+        return {"scanned": len(books), "indexed": indexed}
+
+    return _sum_libraries(libraries.for_each(index))
+
+
+@job_runner.job_type("index_similar_books")
+def index_similar_books(
+    context: JobContext, *, rebuild: bool | str = False
+) -> dict[str, int]:
+    """Update the similar books index with the books changed since the last update.
+
+    Args:
+        context (JobContext): The job context.
+        rebuild (bool | str, optional): Compute the similar books of all the books.
+            Defaults to False.
+
+    Returns:
+        dict[str, int]: The number of changed books and of books updated.
+    """
+    count: int = current_app.config["SIMILAR_BOOKS_COUNT"]
+    return _sum_libraries(
+        _for_each_library(
+            context,
+            lambda _: update_similar_books(count, rebuild=_is_set(rebuild)),
+        )
+    )
+
+
+@job_runner.job_type("optimize_database")
+def optimize_database(context: JobContext, *, full: bool | str = False) -> None:
+    """Update the statistics of the query planner of every library.
+
+    Args:
+        context (JobContext): The job context.
+        full (bool | str, optional): Rebuild all the statistics with ``ANALYZE``
+            instead of ``PRAGMA optimize``. Defaults to False.
+    """
+    update = db_maintenance.analyze if _is_set(full) else db_maintenance.optimize
+    _for_each_library(context, lambda _: update(maintenance.engine()))
+
+
+@job_runner.job_type("vacuum_database")
+def vacuum_database(context: JobContext) -> dict[str, int]:
+    """Return the free pages of every library to the file system, a few at a time.
+
+    Args:
+        context (JobContext): The job context.
+
+    Returns:
+        dict[str, int]: The number of pages freed.
+    """
+    freed = _for_each_library(
+        context, lambda _: maintenance.vacuum(_cancellation_check(context))
+    )
+    return {"freed": sum(freed.values())}
+
+
+@job_runner.job_type("check_database")
+def check_database(context: JobContext, *, quick: bool | str = False) -> dict[str, Any]:
+    """Check the integrity of the database of every library.
+
+    Args:
+        context (JobContext): The job context.
+        quick (bool | str, optional): Run the faster ``quick_check``. Defaults to
+            False.
+
+    Returns:
+        dict[str, Any]: Whether the databases are sound, and the problems found,
+            prefixed with the name of their library.
+    """
+    results = _for_each_library(
+        context,
+        lambda _: db_maintenance.integrity_check(
+            maintenance.engine(), quick=_is_set(quick)
+        ),
+    )
+    problems = [
+        f"{library}: {problem}"
+        for library, library_problems in results.items()
+        if library_problems != ["ok"]
+        for problem in library_problems
+    ]
+    if problems:
+        log.error(f"Database integrity check failed: {problems}")
+        return {"ok": False, "problems": problems}
+    return {"ok": True, "problems": []}
+
+
+@job_runner.job_type("backup_database")
+def backup_database(context: JobContext) -> dict[str, Any]:
+    """Make a hot backup of every library to the backup directory.
+
+    Args:
+        context (JobContext): The job context.
+
+    Returns:
+        dict[str, Any]: The path of the backup of each library and of the deleted
+            old backups.
+    """
+    results = _for_each_library(
+        context,
+        lambda library: maintenance.backup(
+            _cancellation_check(context),
+            None if library == DEFAULT_LIBRARY else library,
+        ),
+    )
+    return {
+        "paths": {library: str(path) for library, (path, _) in results.items()},
+        "pruned": [str(path) for _, pruned in results.values() for path in pruned],
+    }
+
+
+def _for_each_library(
+    context: JobContext, operation: Callable[[str], Any]
+) -> dict[str, Any]:
+    names = libraries.names()
+
+    def run(library: str) -> Any:  # noqa: ANN401
+        result = operation(library)
+        # Commit first, the progress is written to the default database.
+        db.session.commit()
+        context.progress(names.index(library) + 1, len(names))
+        return result
+
+    return libraries.for_each(run)
+
+
+def _sum_libraries(results: dict[str, dict[str, int]]) -> dict[str, int]:
+    total: Counter[str] = Counter()
+    for result in results.values():
+        total.update(result)
+    return dict(total)
+
+
+def _cancellation_check(context: JobContext) -> Callable[[int, int], None]:
+    def check(done: int, total: int) -> None:
+        context.check_cancelled()
+
+    return check
+
+
+def _is_set(flag: object) -> bool:
+    return flag is True or str(flag).lower() in {"1", "true", "yes"}
@@ -0,0 +1,296 @@
+"""Multiple named libraries, each stored in its own SQLite database."""
+
+from __future__ import annotations
+
+import contextlib
+import functools
+import logging
+import re
+import sqlite3
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+import flask_sqlalchemy.session
+import sqlalchemy
+from flask import Flask, current_app, g, has_app_context
+from werkzeug.routing import BaseConverter
+
+from audiobooks.maintenance import configure_sqlite, upgrade_schema
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+
+    from flask_sqlalchemy import SQLAlchemy
+
+
+log: logging.Logger = logging.getLogger(__name__)
+EXTENSION_NAME = "libraries"
+DEFAULT_LIBRARY: str = "default"
+RESERVED_NAMES: frozenset[str] = frozenset(
+    {DEFAULT_LIBRARY, "all", "author", "batch", "book", "changes", "genre", "series"}
+)
+_VALID_NAME = re.compile(r"[a-z0-9][a-z0-9_-]*")
+
+
+class _Library(NamedTuple):
+    path: Path
+    engine: sqlalchemy.Engine
+
+
+def check_library_name(name: str) -> str:
+    """Check that a library name is valid and not reserved.
+
+    Args:
+        name (str): The name of the library.
+
+    Returns:
+        str: The name of the library.
+
+    Raises:
+        ValueError: The library name is not valid or is reserved.
+    """
+    if not _VALID_NAME.fullmatch(name) or name in RESERVED_NAMES:
+        raise ValueError(f"Invalid library name: {name!r}")
+    return name
+
+
+def library_converter(names: Iterable[str]) -> type[BaseConverter]:
+    """Create a URL converter matching only the names of the libraries.
+
+    Args:
+        names (Iterable[str]): The names of the libraries.
+
+    Returns:
+        type[BaseConverter]: The URL converter.
+    """
+    pattern = "|".join(map(re.escape, names)) or "(?!)"
+    return type("LibraryConverter", (BaseConverter,), {"regex": f"(?:{pattern})"})
+
+
+def current_library() -> str | None:
+    """Get the name of the library selected for the current application context.
+
+    Returns:
+        str | None: The name of the library, or None for the default library.
+    """
+    return g.get("library") if has_app_context() else None
+
+
+@contextlib.contextmanager
+def use_library(library: str | None) -> Iterator[None]:
+    """Select a library for ``db.session`` in the current application context.
+
+    Args:
+        library (str | None): The name of the library, or None for the default one.
+
+    Yields:
+        None: The library is selected until the context exits.
+    """
+    previous = g.get("library")
+    g.library = library
+    try:
+        yield
+    finally:
+        g.library = previous
+
+
+def bind_current_library(operation: Callable[[], Any]) -> Callable[[], Any]:
+    """Bind an operation to the library of the current context.
+
+    This is used to run an operation in another thread, such as the writer thread of
+    the write coalescer, on the library of the request that submitted it.
+
+    Args:
+        operation (Callable[[], Any]): The operation.
+
+    Returns:
+        Callable[[], Any]: The operation, running in the current library.
+    """
+    library = current_library()
+    if library is None:
+        return operation
+
+    @functools.wraps(operation)
+    def run_in_library() -> Any:  # noqa: ANN401
+        with use_library(library):
+            return operation()
+
+    return run_in_library
+
+
+class LibrarySession(flask_sqlalchemy.session.Session):
+    """Session binding every query to the engine of the current library."""
+
+    def get_bind(
+        self,
+        mapper: Any | None = None,  # noqa: ANN401
+        clause: Any | None = None,  # noqa: ANN401
+        bind: sqlalchemy.Engine | sqlalchemy.Connection | None = None,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> sqlalchemy.Engine | sqlalchemy.Connection:
+        """Select the engine of the current library, or the default engine.
+
+        Args:
+            mapper (Any, optional): The mapper being queried. Defaults to None.
+            clause (Any, optional): The clause being executed. Defaults to None.
+            bind (Engine | Connection, optional): An explicit bind. Defaults to None.
+            kwargs (Any): Additional arguments for the parent ``get_bind``.
+
+        Returns:
+            Engine | Connection: The engine of the current library.
+        """
+        library = current_library()
+        if bind is None and library is not None:
+            return current_app.extensions[EXTENSION_NAME][library].engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class Libraries:
+    """Flask extension for multiple named libraries.
+
+    ``LIBRARIES`` maps library names to SQLite database files. Each library gets its
+    own engine, so writes to one library never wait for another. The library routes
+    are also served under ``/lib/<library>``, where ``db.session`` is bound to the
+    engine of the selected library. The default database stays available under
+    ``/lib``.
+    """
+
+    def __init__(self, database: SQLAlchemy) -> None:
+        """Initialize an instance of Libraries.
+
+        Args:
+            database (SQLAlchemy): The Flask-SQLAlchemy extension.
+        """
+        self.db: SQLAlchemy = database
+
+    def init_app(self, app: Flask) -> None:
+        """Initialize the libraries for a Flask application.
+
+        The engine of each library has the same options and SQLite settings as the
+        default engine, and the tables are created or upgraded in its database.
+
+        Args:
+            app (Flask): The Flask application.
+
+        Raises:
+            ValueError: A library name is not valid or is reserved.
+        """
+        libraries: dict[str, _Library] = {}
+        for name, path in app.config["LIBRARIES"].items():
+            check_library_name(name)
+            engine = sqlalchemy.create_engine(
+                f"sqlite:///{Path(path).resolve()}",
+                **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}),
+            )
+            configure_sqlite(engine, app.config["SQLITE_JOURNAL_MODE"])
+            self.db.metadata.create_all(engine)
+            with engine.begin() as connection:
+                upgrade_schema(connection, self.db.metadata)
+            libraries[name] = _Library(Path(path).resolve(), engine)
+        app.extensions[EXTENSION_NAME] = libraries
+        app.url_map.converters["library"] = library_converter(libraries)
+
+    @staticmethod
+    def names() -> list[str]:
+        """Get the names of the libraries of the current application.
+
+        Returns:
+            list[str]: ``DEFAULT_LIBRARY``, then the names of the named libraries.
+        """
+        return [DEFAULT_LIBRARY, *current_app.extensions[EXTENSION_NAME]]
+
+    def for_each(self, operation: Callable[[str], Any]) -> dict[str, Any]:
+        """Run an operation in each library of the current application, in turn.
+
+        ``db.session`` is bound to each library during the operation, then committed
+        and closed, so the records of a library are never flushed to another one.
+
+        Args:
+            operation (Callable[[str], Any]): Called with the name of each library.
+
+        Returns:
+            dict[str, Any]: The result of the operation in each library.
+        """
+        results: dict[str, Any] = {}
+        for name in self.names():
+            with use_library(None if name == DEFAULT_LIBRARY else name):
+                try:
+                    results[name] = operation(name)
+                    self.db.session.commit()
+                finally:
+                    self.db.session.close()
+        return results
+
+    def search(self, table: str, name: str, limit: int) -> list[dict[str, int | str]]:
+        """Search the records of a table by name across all the libraries.
+
+        The library databases are attached to a connection of the default database,
+        so the search runs as a ``UNION ALL`` query. SQLite limits the number of
+        attached databases, 10 by default, so the libraries are searched in groups
+        of at most that many, and the records of the groups are merged.
+
+        Args:
+            table (str): The name of the table of a library model.
+            name (str): Part of the name to search, case-insensitive.
+            limit (int): The maximum number of records.
+
+        Returns:
+            list[dict[str, int | str]]: The records, with the name of their library.
+        """
+        libraries: dict[str, _Library] = current_app.extensions[EXTENSION_NAME]
+        records: list[dict[str, int | str]] = []
+        with self.db.engine.connect() as connection:
+            driver_connection = connection.connection.driver_connection
+            group_size: int = driver_connection.getlimit(  # type: ignore[union-attr]
+                sqlite3.SQLITE_LIMIT_ATTACHED
+            )
+            names = list(libraries)
+            groups = [
+                names[start : start + group_size]
+                for start in range(0, len(names), group_size)
+            ]
+            for number, group in enumerate(groups or [[]]):
+                schemas: dict[str, str | None] = {
+                    library: f"library_{index}"
+                    for index, library in enumerate(group, start=1)
+                }
+                if number == 0:
+                    schemas = {DEFAULT_LIBRARY: None} | schemas
+                query = _search_query(schemas, table, name, limit)
+                for library, schema in schemas.items():
+                    if schema is not None:
+                        connection.exec_driver_sql(
+                            f"ATTACH DATABASE ? AS {schema}",
+                            (str(libraries[library].path),),
+                        )
+                try:
+                    records.extend(row._asdict() for row in connection.execute(query))
+                finally:
+                    connection.rollback()
+                    for schema in schemas.values():
+                        if schema is not None:
+                            connection.exec_driver_sql(f"DETACH DATABASE {schema}")
+        records.sort(key=lambda record: (record["name"], record["library"]))
+        return records[:limit]
+
+
+def _search_query(
+    schemas: dict[str, str | None], table: str, name: str, limit: int
+) -> sqlalchemy.CompoundSelect:
+    selects = []
+    for library, schema in schemas.items():
+        records = sqlalchemy.table(
+            table,
+            sqlalchemy.column("record_id"),
+            sqlalchemy.column("name"),
+            schema=schema,
+        )
+        selects.append(
+            sqlalchemy.select(
+                sqlalchemy.literal(library).label("library"),
+                records.c.record_id,
+                records.c.name,
+            ).where(records.c.name.contains(name, autoescape=True))
+        )
+    return sqlalchemy.union_all(*selects).order_by("name", "library").limit(limit)
@@ -0,0 +1,104 @@
+"""Resolution of batches of library lookups."""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from sqlalchemy.orm import selectinload
+
+from audiobooks.extensions import db
+
+from .models import LibraryModel, get_library_item
+from .utils import clean_name
+
+
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session
+    from sqlalchemy.orm.interfaces import LoaderOption
+
+
+class Lookup(NamedTuple):
+    """A lookup of a library record by id or by name."""
+
+    model: type[LibraryModel]
+    record_id: int | None
+    name: str | None
+
+    @classmethod
+    def from_dict(cls, lookup: Any) -> Lookup:  # noqa: ANN401
+        """Create a lookup from its JSON representation.
+
+        Args:
+            lookup (Any): A mapping with an ``item`` key and either a ``record_id``
+                or a ``name`` key.
+
+        Returns:
+            Lookup: The lookup.
+
+        Raises:
+            TypeError: The lookup is not a mapping.
+            ValueError: The lookup is not valid.
+        """
+        if not isinstance(lookup, dict):
+            raise TypeError(f"Invalid lookup: {lookup!r}")
+        model = get_library_item(str(lookup.get("item", "")))
+        record_id, name = lookup.get("record_id"), lookup.get("name")
+        if model is None:
+            raise ValueError(f"Invalid item: {lookup.get('item')!r}")
+        if isinstance(record_id, int) and not isinstance(record_id, bool):
+            return cls(model, record_id, None)
+        if isinstance(name, str) and name.strip():
+            return cls(model, None, clean_name(name))
+        raise ValueError(f"Lookup needs a record_id or a name: {lookup!r}")
+
+
+def resolve_lookups(
+    lookups: list[Lookup], session: Session | None = None
+) -> list[LibraryModel | None]:
+    """Resolve lookups with one query per model and kind of lookup.
+
+    The public relationships of the records, which ``to_dict`` reads, are loaded
+    with one more query per relationship instead of one per record.
+
+    Args:
+        lookups (list[Lookup]): The lookups.
+        session (Session, optional): The session to query. Defaults to the
+            application's ``db.session``.
+
+    Returns:
+        list[LibraryModel | None]: The records, in the same order as the lookups,
+            with None for the records not found.
+    """
+    session = session or db.session
+    record_ids: defaultdict[type[LibraryModel], set[int]] = defaultdict(set)
+    names: defaultdict[type[LibraryModel], set[str]] = defaultdict(set)
+    for lookup in lookups:
+        if lookup.record_id is not None:
+            record_ids[lookup.model].add(lookup.record_id)
+        elif lookup.name is not None:
+            names[lookup.model].add(lookup.name)
+    by_id: dict[tuple[type[LibraryModel], int], LibraryModel] = {}
+    by_name: dict[tuple[type[LibraryModel], str], LibraryModel] = {}
+    for model, ids in record_ids.items():
+        query = db.select(model).where(model.record_id.in_(ids))
+        query = query.options(*_eager_loads(model))
+        by_id.update(((model, r.record_id), r) for r in session.scalars(query))
+    for model, model_names in names.items():
+        query = db.select(model).where(model.name.in_(model_names))
+        query = query.options(*_eager_loads(model))
+        by_name.update(((model, r.name), r) for r in session.scalars(query))
+    return [
+        by_id.get((lookup.model, lookup.record_id))
+        if lookup.record_id is not None
+        else by_name.get((lookup.model, lookup.name or ""))
+        for lookup in lookups
+    ]
+
+
+def _eager_loads(model: type[LibraryModel]) -> list[LoaderOption]:
+    return [
+        selectinload(getattr(model, relationship.key))
+        for relationship in db.inspect(model).relationships
+        if not relationship.key.startswith("_")
+    ]
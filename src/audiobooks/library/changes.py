@@ -0,0 +1,176 @@
+"""Change feed of the library items, for incremental synchronization."""
+
+from __future__ import annotations
+
+from datetime import UTC, datetime
+from typing import Any
+
+import sqlalchemy
+import sqlalchemy.orm
+
+from audiobooks.database import Model
+from audiobooks.extensions import db
+
+from .models import LibraryModel
+
+
+class Operation:
+    """Names of the operations recorded in the change feed."""
+
+    CREATE = "create"
+    UPDATE = "update"
+    DELETE = "delete"
+
+
+class Change(Model):
+    """Model for the ``change`` table in the database.
+
+    The record id is the sequence number of the change. The table uses SQLite's
+    ``AUTOINCREMENT`` so sequence numbers are never reused, even after compaction.
+    """
+
+    __table_args__ = (
+        db.Index("ix_change_item", "item", "item_record"),
+        {"sqlite_autoincrement": True},
+    )
+
+    item = db.Column(db.String, nullable=False)
+    item_record = db.Column(db.Integer, nullable=False)
+    operation = db.Column(db.String, nullable=False)
+    changed_at = db.Column(db.DateTime, nullable=False)
+
+    def to_feed(self) -> dict[str, int | str]:
+        """Creates the change feed entry of the change.
+
+        Returns:
+            dict[str, int | str]: The entry.
+        """
+        return {
+            "seq": self.record_id,
+            "item": self.item,
+            "record_id": self.item_record,
+            "operation": self.operation,
+            "changed_at": self.changed_at.isoformat(),
+        }
+
+
+class Checkpoint(Model):
+    """Model for the ``checkpoint`` table in the database.
+
+    A checkpoint is the sequence number of the last change processed by a consumer
+    of the change feed, such as an index kept up to date incrementally.
+    """
+
+    consumer = db.Column(db.String, unique=True, nullable=False)
+    last_seq = db.Column(db.Integer, nullable=False)
+
+
+def read_checkpoint(consumer: str) -> int:
+    """Read the sequence number of the last change processed by a consumer.
+
+    Args:
+        consumer (str): The name of the consumer.
+
+    Returns:
+        int: The sequence number, or 0 if the consumer never processed any change.
+    """
+    query = db.select(Checkpoint.last_seq).filter_by(consumer=consumer)
+    return db.session.scalar(query) or 0
+
+
+def save_checkpoint(consumer: str, last_seq: int) -> None:
+    """Save the sequence number of the last change processed by a consumer.
+
+    Args:
+        consumer (str): The name of the consumer.
+        last_seq (int): The sequence number.
+    """
+    query = db.select(Checkpoint).filter_by(consumer=consumer)
+    checkpoint: Checkpoint | None = db.session.scalar(query)
+    if checkpoint is None:
+        db.session.add(Checkpoint(consumer=consumer, last_seq=last_seq))
+    else:
+        checkpoint.last_seq = last_seq
+
+
+def last_change() -> int:
+    """Get the sequence number of the last change.
+
+    Returns:
+        int: The sequence number, or 0 if there is no change.
+    """
+    return db.session.scalar(db.select(db.func.max(Change.record_id))) or 0
+
+
+def read_changes(since: int, limit: int) -> tuple[list[Change], bool]:
+    """Read the changes made after a sequence number.
+
+    Args:
+        since (int): The sequence number of the last change already seen.
+        limit (int): The maximum number of changes to read.
+
+    Returns:
+        tuple[list[Change], bool]: The changes, in order, and whether there are more.
+    """
+    query = (
+        db.select(Change)
+        .where(Change.record_id > since)
+        .order_by(Change.record_id)
+        .limit(limit + 1)
+    )
+    changes = list(db.session.scalars(query))
+    return changes[:limit], len(changes) > limit
+
+
+def compact_changes(before: int) -> int:
+    """Compact the changes up to a sequence number.
+
+    Only the latest change of each record is kept, which is enough for a client to
+    catch up from any earlier sequence number.
+
+    Args:
+        before (int): The last sequence number to compact.
+
+    Returns:
+        int: The number of changes removed.
+    """
+    latest = (
+        db.select(db.func.max(Change.record_id))
+        .where(Change.record_id <= before)
+        .group_by(Change.item, Change.item_record)
+    )
+    result = db.session.execute(
+        db.delete(Change).where(
+            Change.record_id <= before, Change.record_id.not_in(latest)
+        )
+    )
+    return result.rowcount
+
+
+@sqlalchemy.event.listens_for(sqlalchemy.orm.Session, "after_flush")
+def _record_changes(
+    session: sqlalchemy.orm.Session,
+    flush_context: sqlalchemy.orm.UOWTransaction,
+) -> None:
+    changed_at = datetime.now(UTC).replace(tzinfo=None)
+    rows: list[dict[str, Any]] = [
+        {
+            "item": type(record).__name__.lower(),
+            "item_record": record.record_id,
+            "operation": operation,
+            "changed_at": changed_at,
+        }
+        for operation, records in (
+            (Operation.CREATE, session.new),
+            (Operation.UPDATE, session.dirty),
+            (Operation.DELETE, session.deleted),
+        )
+        for record in records
+        if isinstance(record, LibraryModel)
+        and (
+            operation != Operation.UPDATE
+            or session.is_modified(record, include_collections=False)
+        )
+    ]
+    if rows:
+        session.connection().execute(db.insert(Change), rows)
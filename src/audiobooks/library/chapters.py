@@ -0,0 +1,179 @@
+"""Chapter and duration index of the audio files of the books."""
+
+from __future__ import annotations
+
+import logging
+import struct
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
+
+from audiobooks.extensions import db
+
+from .containers import (
+    ChapterMark,
+    read_flac_duration,
+    read_id3_chapters,
+    read_mp3_duration,
+    read_mp4_chapters,
+    read_mp4_duration,
+)
+from .duplicates import BOOK_RELATIONSHIPS
+from .media import resolve_media_path
+from .models import Book, Chapter, LibraryModel
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from typing import BinaryIO
+
+    from sqlalchemy.orm import Session
+
+
+log: logging.Logger = logging.getLogger(__name__)
+
+INDEX_READERS: dict[
+    str,
+    tuple[Callable[[BinaryIO], int | None], Callable[[BinaryIO], list[ChapterMark]]],
+] = {
+    ".flac": (read_flac_duration, lambda _: []),
+    ".m4a": (read_mp4_duration, read_mp4_chapters),
+    ".m4b": (read_mp4_duration, read_mp4_chapters),
+    ".mp3": (read_mp3_duration, read_id3_chapters),
+    ".mp4": (read_mp4_duration, read_mp4_chapters),
+}
+MS_PER_HOUR: int = 60 * 60 * 1000
+
+
+class AudioIndex(NamedTuple):
+    """The duration and chapters of an audio file."""
+
+    duration_ms: int | None
+    chapters: list[ChapterMark]
+
+
+def extract_audio_index(file_path: Path | str) -> AudioIndex | None:
+    """Extract the duration and the chapters of an audio file from its headers.
+
+    Args:
+        file_path (Path | str): Path of the audio file.
+
+    Returns:
+        AudioIndex | None: The index or None if the file can't be read or is not
+            supported.
+    """
+    file_path = Path(file_path)
+    readers = INDEX_READERS.get(file_path.suffix.lower())
+    if readers is None:
+        return None
+    read_duration, read_chapters = readers
+    try:
+        with file_path.open("rb") as file:
+            return AudioIndex(read_duration(file), read_chapters(file))
+    except (OSError, ValueError, IndexError, struct.error) as exception:
+        log.warning(f"Can't read the chapters of {file_path}: {exception}")
+        return None
+
+
+def index_book(book: Book) -> bool:
+    """Store the duration and the chapters of the audio file of a book.
+
+    The previous chapters of the book are deleted and flushed first, so the new
+    chapters can reuse their numbers. Only the audio files inside ``MEDIA_ROOT`` are
+    read. The time of the attempt is stored in ``indexed_at``, even if the file
+    can't be read, so that the broken files are not read again by each indexing.
+
+    Args:
+        book (Book): The book.
+
+    Returns:
+        bool: True if the audio file was indexed.
+    """
+    file_path = resolve_media_path(book.file_path) if book.file_path else None
+    if file_path is None:
+        return False
+    book.indexed_at = datetime.now(UTC).replace(tzinfo=None)
+    index = extract_audio_index(file_path)
+    if index is None:
+        return False
+    book.duration_ms = index.duration_ms or (
+        index.chapters[-1].end_ms if index.chapters else None
+    )
+    chapters: list[Chapter] = book._chapters  # noqa: SLF001
+    if chapters:
+        chapters.clear()
+        db.session.flush()
+    chapters.extend(
+        Chapter(
+            number=number, title=mark.title, start_ms=mark.start_ms, end_ms=mark.end_ms
+        )
+        for number, mark in enumerate(index.chapters, start=1)
+    )
+    return True
+
+
+def read_chapters(book: Book, session: Session | None = None) -> list[Chapter]:
+    """Read the indexed chapters of a book.
+
+    Args:
+        book (Book): The book.
+        session (Session, optional): The session to query. Defaults to the
+            application's ``db.session``.
+
+    Returns:
+        list[Chapter]: The chapters, in order.
+    """
+    query = (
+        db.select(Chapter)
+        .where(Chapter.book_id == book.record_id)
+        .order_by(Chapter.number)
+    )
+    return list((session or db.session).scalars(query))
+
+
+def total_durations(
+    model: type[LibraryModel],
+) -> list[dict[str, int | float | str]]:
+    """Total the indexed durations of the books of each author, genre or series.
+
+    The totals are computed from the ``(<item>_id, duration_ms)`` indexes of the
+    ``book`` table, without reading the audio files.
+
+    Args:
+        model (type[LibraryModel]): Author, Genre or Series.
+
+    Returns:
+        list[dict[str, int | float | str]]: The number of indexed books and their
+            total duration of each record, longest first.
+
+    Raises:
+        TypeError: The model is not related to books.
+    """
+    if model not in BOOK_RELATIONSHIPS:
+        raise TypeError(f"Books have no {model.__name__.lower()}")
+    foreign_key = getattr(Book, f"{BOOK_RELATIONSHIPS[model]}_id")
+    totals = (
+        db.select(
+            foreign_key.label("record_id"),
+            db.func.count().label("books"),
+            db.func.sum(Book.duration_ms).label("duration_ms"),
+        )
+        .where(foreign_key.is_not(None), Book.duration_ms.is_not(None))
+        .group_by(foreign_key)
+        .subquery()
+    )
+    query = (
+        db.select(model.record_id, model.name, totals.c.books, totals.c.duration_ms)
+        .join(totals, totals.c.record_id == model.record_id)
+        .order_by(totals.c.duration_ms.desc(), model.record_id)
+    )
+    return [
+        {
+            "record_id": row.record_id,
+            "name": row.name,
+            "books": row.books,
+            "duration_ms": row.duration_ms,
+            "hours": round(row.duration_ms / MS_PER_HOUR, 2),
+        }
+        for row in db.session.execute(query)
+    ]
@@ -0,0 +1,484 @@
+"""Low-level readers for audio container metadata.
+
+Only the metadata headers are read: audio payloads are skipped with ``seek`` so that
+parsing a large file stays cheap.
+"""
+
+from __future__ import annotations
+
+import struct
+from pathlib import PurePath
+from typing import TYPE_CHECKING, BinaryIO, NamedTuple
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+
+ID3_FRONT_COVER: int = 3
+FLAC_STREAMINFO_BLOCK: int = 0
+FLAC_PICTURE_BLOCK: int = 6
+MP4_PNG_DATA_TYPE: int = 14
+NERO_TIME_UNITS_PER_MS: int = 10_000
+
+_ATOM_HEADER_SIZE: int = 8
+_ID3_HEADER_SIZE: int = 10
+_FLAC_BLOCK_HEADER_SIZE: int = 4
+_ID3_TEXT_ENCODINGS: dict[int, str] = {
+    0: "latin-1",
+    1: "utf-16",
+    2: "utf-16-be",
+    3: "utf-8",
+}
+_MPEG_PROBE_SIZE: int = 4096
+_MPEG1_LAYER3_BITRATES: tuple[int, ...] = (
+    0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320,
+)  # fmt: skip
+_MPEG2_LAYER3_BITRATES: tuple[int, ...] = (
+    0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160,
+)  # fmt: skip
+
+AUDIO_MIMETYPES: dict[str, str] = {
+    ".aac": "audio/aac",
+    ".flac": "audio/flac",
+    ".m4a": "audio/mp4",
+    ".m4b": "audio/mp4",
+    ".mp3": "audio/mpeg",
+    ".mp4": "audio/mp4",
+    ".oga": "audio/ogg",
+    ".ogg": "audio/ogg",
+    ".opus": "audio/ogg",
+    ".wav": "audio/wav",
+}
+
+
+class Atom(NamedTuple):
+    """Header of an MP4 atom (box)."""
+
+    kind: bytes
+    start: int
+    data_start: int
+    end: int
+
+
+class Id3Frame(NamedTuple):
+    """A frame from an ID3v2 tag."""
+
+    frame_id: str
+    data: bytes
+
+
+class Picture(NamedTuple):
+    """An embedded picture."""
+
+    mimetype: str
+    picture_type: int
+    data: bytes
+
+
+class ChapterMark(NamedTuple):
+    """A chapter marker, with its times in milliseconds."""
+
+    title: str
+    start_ms: int
+    end_ms: int | None
+
+
+def audio_mimetype(file_path: PurePath | str) -> str:
+    """Get the mimetype of an audio file from its extension.
+
+    Args:
+        file_path (PurePath | str): The path of the audio file.
+
+    Returns:
+        str: The mimetype, ``application/octet-stream`` if the extension is unknown.
+    """
+    suffix = PurePath(file_path).suffix.lower()
+    return AUDIO_MIMETYPES.get(suffix, "application/octet-stream")
+
+
+def iter_mp4_atoms(file: BinaryIO, start: int, end: int) -> Iterator[Atom]:
+    """Iterate over the atoms found between two offsets of an MP4 file.
+
+    Args:
+        file (BinaryIO): The open file.
+        start (int): Offset of the first atom.
+        end (int): Offset where the parent atom ends.
+
+    Yields:
+        Atom: The header of each atom.
+    """
+    position = start
+    while position + _ATOM_HEADER_SIZE <= end:
+        file.seek(position)
+        header = file.read(_ATOM_HEADER_SIZE)
+        if len(header) < _ATOM_HEADER_SIZE:
+            return
+        size, kind = struct.unpack(">I4s", header)
+        data_start = position + _ATOM_HEADER_SIZE
+        if size == 1:
+            size = struct.unpack(">Q", file.read(8))[0]
+            data_start += 8
+        elif size == 0:
+            size = end - position
+        if size < data_start - position:
+            return
+        yield Atom(kind, position, data_start, min(position + size, end))
+        position += size
+
+
+def find_mp4_atom(file: BinaryIO, path: tuple[bytes, ...]) -> Atom | None:
+    """Find an atom in an MP4 file by its path.
+
+    The ``meta`` atom is handled as a full atom, skipping its version and flags.
+
+    Args:
+        file (BinaryIO): The open file.
+        path (tuple[bytes, ...]): The kinds of the nested atoms, e.g.
+            ``(b"moov", b"udta")``.
+
+    Returns:
+        Atom | None: The atom or None if not found.
+    """
+    file.seek(0, 2)
+    start, end = 0, file.tell()
+    atom: Atom | None = None
+    for kind in path:
+        atoms = iter_mp4_atoms(file, start, end)
+        atom = next((a for a in atoms if a.kind == kind), None)
+        if atom is None:
+            return None
+        start = atom.data_start + (4 if kind == b"meta" else 0)
+        end = atom.end
+    return atom
+
+
+def read_mp4_cover(file: BinaryIO) -> Picture | None:
+    """Read the cover art stored in the ``covr`` item of an MP4 file.
+
+    Args:
+        file (BinaryIO): The open file.
+
+    Returns:
+        Picture | None: The cover or None if the file has no cover.
+    """
+    covr = find_mp4_atom(file, (b"moov", b"udta", b"meta", b"ilst", b"covr"))
+    if covr is None:
+        return None
+    for atom in iter_mp4_atoms(file, covr.data_start, covr.end):
+        if atom.kind != b"data":
+            continue
+        file.seek(atom.data_start)
+        data_type = struct.unpack(">I", file.read(4))[0] & 0xFFFFFF
+        file.seek(4, 1)
+        mimetype = "image/png" if data_type == MP4_PNG_DATA_TYPE else "image/jpeg"
+        data = file.read(atom.end - atom.data_start - 8)
+        return Picture(mimetype, ID3_FRONT_COVER, data)
+    return None
+
+
+def read_mp4_duration(file: BinaryIO) -> int | None:
+    """Read the duration stored in the ``mvhd`` atom of an MP4 file.
+
+    Args:
+        file (BinaryIO): The open file.
+
+    Returns:
+        int | None: The duration in milliseconds, or None if not found.
+    """
+    mvhd = find_mp4_atom(file, (b"moov", b"mvhd"))
+    if mvhd is None:
+        return None
+    file.seek(mvhd.data_start)
+    if file.read(4)[0] == 1:
+        _, _, timescale, duration = struct.unpack(">QQIQ", file.read(28))
+    else:
+        _, _, timescale, duration = struct.unpack(">IIII", file.read(16))
+    return duration * 1000 // timescale if timescale else None
+
+
+def read_mp4_chapters(file: BinaryIO) -> list[ChapterMark]:
+    """Read the chapters stored in the Nero ``chpl`` atom of an MP4 file.
+
+    The end of each chapter is the start of the next one, and the duration of the
+    file for the last one.
+
+    Args:
+        file (BinaryIO): The open file.
+
+    Returns:
+        list[ChapterMark]: The chapters, in order.
+    """
+    chpl = find_mp4_atom(file, (b"moov", b"udta", b"chpl"))
+    if chpl is None:
+        return []
+    file.seek(chpl.data_start)
+    data = file.read(chpl.end - chpl.data_start)
+    position = 8 if data[0] else 4
+    count = data[position]
+    position += 1
+    marks: list[tuple[str, int]] = []
+    for _ in range(count):
+        start = struct.unpack(">Q", data[position : position + 8])[0]
+        title_size = data[position + 8]
+        title = data[position + 9 : position + 9 + title_size]
+        marks.append((title.decode(errors="replace"), start // NERO_TIME_UNITS_PER_MS))
+        position += 9 + title_size
+    ends = [start for _, start in marks[1:]] + [read_mp4_duration(file)]
+    return [
+        ChapterMark(title, start, end)
+        for (title, start), end in zip(marks, ends, strict=True)
+    ]
+
+
+def iter_id3_frames(file: BinaryIO) -> Iterator[Id3Frame]:
+    """Iterate over the frames of the ID3v2 tag at the start of a file.
+
+    Args:
+        file (BinaryIO): The open file.
+
+    Yields:
+        Id3Frame: Each frame of the tag.
+    """
+    tag = _read_id3_tag(file)
+    if tag is not None:
+        version, data, position, _ = tag
+        yield from _iter_id3_frame_data(data, position, version)
+
+
+def read_id3_cover(file: BinaryIO) -> Picture | None:
+    """Read the cover art stored in the ``APIC`` frames of an ID3v2 tag.
+
+    The front cover is preferred over any other picture.
+
+    Args:
+        file (BinaryIO): The open file.
+
+    Returns:
+        Picture | None: The cover or None if the file has no cover.
+    """
+    pictures = [
+        _parse_apic(frame.data, legacy=frame.frame_id == "PIC")
+        for frame in iter_id3_frames(file)
+        if frame.frame_id in {"APIC", "PIC"}
+    ]
+    return next(
+        (p for p in pictures if p.picture_type == ID3_FRONT_COVER),
+        pictures[0] if pictures else None,
+    )
+
+
+def read_id3_chapters(file: BinaryIO) -> list[ChapterMark]:
+    """Read the chapters stored in the ``CHAP`` frames of an ID3v2 tag.
+
+    Args:
+        file (BinaryIO): The open file.
+
+    Returns:
+        list[ChapterMark]: The chapters, in order.
+    """
+    tag = _read_id3_tag(file)
+    if tag is None:
+        return []
+    version, data, position, _ = tag
+    chapters: list[ChapterMark] = []
+    for frame in _iter_id3_frame_data(data, position, version):
+        if frame.frame_id != "CHAP":
+            continue
+        times_start = frame.data.index(b"\x00") + 1
+        start, end = struct.unpack(">II", frame.data[times_start : times_start + 8])
+        subframes = _iter_id3_frame_data(frame.data, times_start + 16, version)
+        title = next(
+            (_decode_id3_text(f.data) for f in subframes if f.frame_id == "TIT2"), ""
+        )
+        chapters.append(ChapterMark(title, start, end))
+    chapters.sort(key=lambda chapter: chapter.start_ms)
+    return [
+        chapter._replace(title=chapter.title or f"Chapter {number}")
+        for number, chapter in enumerate(chapters, start=1)
+    ]
+
+
+def read_mp3_duration(file: BinaryIO) -> int | None:
+    """Read the duration of an MP3 file from its headers.
+
+    The ``TLEN`` frame of the ID3v2 tag is used if present, then the frame count of
+    the Xing or Info header of the first MPEG frame, and otherwise the duration is
+    estimated from the size of the file and the bitrate of the first frame.
+
+    Args:
+        file (BinaryIO): The open file.
+
+    Returns:
+        int | None: The duration in milliseconds, or None if not found.
+    """
+    audio_start = 0
+    tag = _read_id3_tag(file)
+    if tag is not None:
+        version, data, position, audio_start = tag
+        for frame in _iter_id3_frame_data(data, position, version):
+            if frame.frame_id in {"TLEN", "TLE"}:
+                length = _decode_id3_text(frame.data)
+                if length.isdigit():
+                    return int(length)
+    file.seek(0, 2)
+    audio_end = file.tell()
+    file.seek(audio_start)
+    return _read_mpeg_duration(file.read(_MPEG_PROBE_SIZE), audio_end - audio_start)
+
+
+def read_flac_cover(file: BinaryIO) -> Picture | None:
+    """Read the cover art stored in the ``PICTURE`` metadata blocks of a FLAC file.
+
+    Args:
+        file (BinaryIO): The open file.
+
+    Returns:
+        Picture | None: The cover or None if the file has no cover.
+    """
+    file.seek(0)
+    if file.read(4) != b"fLaC":
+        return None
+    pictures: list[Picture] = []
+    last = False
+    while not last:
+        header = file.read(_FLAC_BLOCK_HEADER_SIZE)
+        if len(header) < _FLAC_BLOCK_HEADER_SIZE:
+            break
+        last = bool(header[0] & 0x80)
+        block_type = header[0] & 0x7F
+        size = int.from_bytes(header[1:], "big")
+        if block_type != FLAC_PICTURE_BLOCK:
+            file.seek(size, 1)
+            continue
+        block = file.read(size)
+        picture_type, mime_size = struct.unpack(">II", block[:8])
+        mimetype = block[8 : 8 + mime_size].decode("ascii", errors="replace")
+        position = 8 + mime_size
+        description_size = struct.unpack(">I", block[position : position + 4])[0]
+        position += 4 + description_size + 16
+        data_size = struct.unpack(">I", block[position : position + 4])[0]
+        data = block[position + 4 : position + 4 + data_size]
+        pictures.append(Picture(mimetype, picture_type, data))
+    return next(
+        (p for p in pictures if p.picture_type == ID3_FRONT_COVER),
+        pictures[0] if pictures else None,
+    )
+
+
+def read_flac_duration(file: BinaryIO) -> int | None:
+    """Read the duration from the ``STREAMINFO`` metadata block of a FLAC file.
+
+    Args:
+        file (BinaryIO): The open file.
+
+    Returns:
+        int | None: The duration in milliseconds, or None if not found.
+    """
+    file.seek(0)
+    if file.read(4) != b"fLaC":
+        return None
+    header = file.read(_FLAC_BLOCK_HEADER_SIZE)
+    if len(header) < _FLAC_BLOCK_HEADER_SIZE or header[0] & 0x7F:
+        return None
+    info = int.from_bytes(file.read(34)[10:18], "big")
+    sample_rate, samples = info >> 44, info & (1 << 36) - 1
+    return samples * 1000 // sample_rate if sample_rate and samples else None
+
+
+def _read_id3_tag(file: BinaryIO) -> tuple[int, bytes, int, int] | None:
+    file.seek(0)
+    header = file.read(_ID3_HEADER_SIZE)
+    if len(header) < _ID3_HEADER_SIZE or header[:3] != b"ID3":
+        return None
+    version, flags = header[3], header[5]
+    size = _syncsafe(header[6:10])
+    tag = file.read(size)
+    position = 0
+    if flags & 0x40:
+        syncsafe = version > 3  # noqa: PLR2004
+        position = _syncsafe(tag[:4]) if syncsafe else int.from_bytes(tag[:4]) + 4
+    end = _ID3_HEADER_SIZE + size + (_ID3_HEADER_SIZE if flags & 0x10 else 0)
+    return version, tag, position, end
+
+
+def _iter_id3_frame_data(
+    data: bytes, position: int, version: int
+) -> Iterator[Id3Frame]:
+    legacy, syncsafe = version < 3, version > 3  # noqa: PLR2004
+    id_size, header_size = (3, 6) if legacy else (4, _ID3_HEADER_SIZE)
+    while position + header_size <= len(data):
+        frame_id = data[position : position + id_size]
+        if not frame_id.strip(b"\x00"):
+            return
+        size_bytes = data[position + id_size : position + 2 * id_size]
+        size = _syncsafe(size_bytes) if syncsafe else int.from_bytes(size_bytes)
+        data_start = position + header_size
+        yield Id3Frame(frame_id.decode("latin-1"), data[data_start : data_start + size])
+        position = data_start + size
+
+
+def _decode_id3_text(data: bytes) -> str:
+    if not data:
+        return ""
+    encoding = _ID3_TEXT_ENCODINGS.get(data[0], "latin-1")
+    return data[1:].decode(encoding, errors="replace").rstrip("\x00")
+
+
+def _read_mpeg_duration(data: bytes, audio_size: int) -> int | None:
+    for position in range(len(data) - 4):
+        if data[position] != 0xFF:  # noqa: PLR2004
+            continue
+        header = int.from_bytes(data[position : position + 4])
+        version, layer = (header >> 19) & 3, (header >> 17) & 3
+        bitrate_index, rate_index = (header >> 12) & 0xF, (header >> 10) & 3
+        if (
+            header >> 21 != 0x7FF  # noqa: PLR2004
+            or version == 1
+            or layer != 1
+            or bitrate_index in {0, 15}
+            or rate_index == 3  # noqa: PLR2004
+        ):
+            continue
+        mpeg1, mono = version == 3, (header >> 6) & 3 == 3  # noqa: PLR2004
+        sample_rate = (44100, 48000, 32000)[rate_index] >> (
+            3 - version if version else 2
+        )
+        side_info_size = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+        xing = position + 4 + side_info_size
+        has_frames = int.from_bytes(data[xing + 4 : xing + 8]) & 1
+        if data[xing : xing + 4] in {b"Xing", b"Info"} and has_frames:
+            frames = int.from_bytes(data[xing + 8 : xing + 12])
+            return frames * (1152 if mpeg1 else 576) * 1000 // sample_rate
+        bitrates = _MPEG1_LAYER3_BITRATES if mpeg1 else _MPEG2_LAYER3_BITRATES
+        return (audio_size - position) * 8 // bitrates[bitrate_index]
+    return None
+
+
+def _syncsafe(data: bytes) -> int:
+    value = 0
+    for byte in data:
+        value = (value << 7) | (byte & 0x7F)
+    return value
+
+
+def _parse_apic(data: bytes, *, legacy: bool = False) -> Picture:
+    encoding = data[0]
+    if legacy:
+        image_format = data[1:4].decode("latin-1").lower()
+        mimetype = f"image/{'jpeg' if image_format == 'jpg' else image_format}"
+        position = 4
+    else:
+        mime_end = data.index(b"\x00", 1)
+        mimetype = data[1:mime_end].decode("latin-1") or "image/jpeg"
+        position = mime_end + 1
+    picture_type = data[position]
+    position += 1
+    terminator = b"\x00\x00" if encoding in {1, 2} else b"\x00"
+    description_end = data.find(terminator, position)
+    while terminator == b"\x00\x00" and (description_end - position) % 2:
+        description_end = data.find(terminator, description_end + 1)
+    position = description_end + len(terminator)
+    if "/" not in mimetype:
+        mimetype = f"image/{mimetype.lower()}"
+    return Picture(mimetype, picture_type, data[position:])
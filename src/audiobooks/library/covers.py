@@ -0,0 +1,312 @@
+"""Cover art extraction, thumbnails, and the on-disk cover cache."""
+
+from __future__ import annotations
+
+import atexit
+import hashlib
+import importlib.util
+import io
+import logging
+import os
+import struct
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
+
+from .containers import Picture, read_flac_cover, read_id3_cover, read_mp4_cover
+from .media import resolve_media_path
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from typing import BinaryIO
+
+    from flask import Flask
+
+
+log: logging.Logger = logging.getLogger(__name__)
+
+COVER_READERS: dict[str, Callable[[BinaryIO], Picture | None]] = {
+    ".flac": read_flac_cover,
+    ".m4a": read_mp4_cover,
+    ".m4b": read_mp4_cover,
+    ".mp3": read_id3_cover,
+    ".mp4": read_mp4_cover,
+}
+
+ORIGINAL_SIZE: int = 0
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+class Cover(NamedTuple):
+    """A cover thumbnail read from the cache."""
+
+    digest: str
+    mimetype: str
+    data: bytes
+
+
+def extract_cover(file_path: Path | str) -> Picture | None:
+    """Extract the cover art embedded in an audio file.
+
+    Args:
+        file_path (Path | str): Path of the audio file.
+
+    Returns:
+        Picture | None: The cover or None if the file has no cover or is not supported.
+    """
+    file_path = Path(file_path)
+    reader = COVER_READERS.get(file_path.suffix.lower())
+    if reader is None:
+        return None
+    try:
+        with file_path.open("rb") as file:
+            return reader(file)
+    except (OSError, ValueError, IndexError, struct.error) as exception:
+        log.warning(f"Can't read the cover of {file_path}: {exception}")
+        return None
+
+
+def make_thumbnail(image: bytes, size: int) -> bytes:
+    """Resize an image to fit in a square and encode it as JPEG with Pillow.
+
+    Args:
+        image (bytes): The encoded image.
+        size (int): Width and height of the bounding square, in pixels.
+
+    Returns:
+        bytes: The encoded thumbnail.
+
+    Raises:
+        ImportError: Pillow is not installed.
+        OSError: The image can't be decoded.
+        ValueError: The image is too large to be decoded.
+    """
+    from PIL import Image  # noqa: PLC0415
+
+    try:
+        with Image.open(io.BytesIO(image)) as picture:
+            picture.thumbnail((size, size))
+            output = io.BytesIO()
+            picture.convert("RGB").save(output, format="JPEG", quality=85)
+    except Image.DecompressionBombError as exception:
+        raise ValueError(str(exception)) from exception
+    return output.getvalue()
+
+
+def make_thumbnails(image: bytes, sizes: tuple[int, ...]) -> list[bytes]:
+    """Generate the thumbnails of an image at several sizes in a process pool.
+
+    Args:
+        image (bytes): The encoded image.
+        sizes (tuple[int, ...]): The sizes of the thumbnails.
+
+    Returns:
+        list[bytes]: The thumbnails, in the same order as ``sizes``.
+    """
+    return list(_get_pool().map(make_thumbnail, [image] * len(sizes), sizes))
+
+
+def image_mimetype(image: bytes) -> str:
+    """Guess the mimetype of an encoded image from its signature.
+
+    Args:
+        image (bytes): The encoded image.
+
+    Returns:
+        str: The mimetype.
+    """
+    if image.startswith(b"\x89PNG"):
+        return "image/png"
+    if image.startswith((b"GIF87a", b"GIF89a")):
+        return "image/gif"
+    if image[8:12] == b"WEBP":
+        return "image/webp"
+    return "image/jpeg"
+
+
+class CoverCache:
+    """Content-addressed on-disk cache of cover thumbnails with LRU eviction.
+
+    Thumbnails are stored under the SHA-256 digest of the original cover, so books
+    sharing the same art share the same files. A small index file maps each audio
+    file (by path, size and modification time) to its cover digest, so the audio
+    file is only parsed again when it changes. The least recently used files are
+    evicted when the cache grows beyond ``COVER_CACHE_MAX_BYTES``.
+
+    The thumbnails are generated with Pillow. Without it, a warning is logged and a
+    single copy of the original cover is stored and served for every size.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an instance of CoverCache."""
+        self.directory: Path | None = None
+        self.max_bytes: int = 0
+        self.sizes: tuple[int, ...] = ()
+        self.resize: bool = False
+        self._entries: OrderedDict[Path, int] = OrderedDict()
+        self._total_bytes: int = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app: Flask) -> None:
+        """Initialize the cache for a Flask application.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        directory = app.config.get("COVER_CACHE_DIR")
+        self.directory = (
+            Path(directory) if directory else Path(app.instance_path) / "covers"
+        )
+        self.media_root = app.config["MEDIA_ROOT"] or ""
+        self.max_bytes = app.config["COVER_CACHE_MAX_BYTES"]
+        self.sizes = tuple(app.config["COVER_SIZES"])
+        self.resize = _can_resize()
+        if not self.resize:
+            log.warning("Pillow is not installed, the covers are served at full size")
+        self._load_entries()
+
+    def get_cover(self, file_path: Path | str, size: int) -> Cover | None:
+        """Get the thumbnail of the cover of an audio file, generating it if needed.
+
+        Args:
+            file_path (Path | str): Path of the audio file.
+            size (int): The thumbnail size, one of ``COVER_SIZES``.
+
+        Returns:
+            Cover | None: The thumbnail or None if the file has no cover or is outside
+                the media root.
+        """
+        digest = self.get_digest(file_path)
+        resolved = resolve_media_path(file_path, self.media_root)
+        if digest is None or resolved is None:
+            return None
+        data = self._read(self._thumbnail_path(digest, size))
+        if data is None:
+            self._store(resolved)
+            data = self._read(self._thumbnail_path(digest, size))
+        return Cover(digest, image_mimetype(data), data) if data is not None else None
+
+    def get_digest(self, file_path: Path | str) -> str | None:
+        """Get the digest of the cover of an audio file, extracting it if needed.
+
+        Args:
+            file_path (Path | str): Path of the audio file.
+
+        Returns:
+            str | None: The digest or None if the file has no cover, its cover can't
+                be decoded, or it is outside the media root.
+        """
+        resolved = resolve_media_path(file_path, self.media_root)
+        if resolved is None:
+            log.warning(f"Can't read the cover of {file_path}: outside the media root")
+            return None
+        try:
+            index_path = self._index_path(resolved)
+        except OSError:
+            return None
+        index = self._read(index_path)
+        if index is not None:
+            return index.decode("ascii") or None
+        return self._store(resolved)
+
+    def _store(self, file_path: Path) -> str | None:
+        picture = extract_cover(file_path)
+        sizes = self.sizes if self.resize else (ORIGINAL_SIZE,)
+        thumbnails: list[bytes] = []
+        if picture is not None and not self.resize:
+            thumbnails = [picture.data]
+        elif picture is not None:
+            try:
+                thumbnails = make_thumbnails(picture.data, sizes)
+            except (OSError, ValueError) as exception:
+                log.warning(f"Can't decode the cover of {file_path}: {exception}")
+                picture = None
+        digest = hashlib.sha256(picture.data).hexdigest() if picture else ""
+        for size, thumbnail in zip(sizes, thumbnails, strict=False):
+            self._write(self._thumbnail_path(digest, size), thumbnail)
+        self._write(self._index_path(file_path), digest.encode("ascii"))
+        return digest or None
+
+    def _index_path(self, file_path: Path) -> Path:
+        stat = file_path.stat()
+        key = f"{file_path}|{stat.st_size}|{stat.st_mtime_ns}"
+        return self._path("index", hashlib.sha256(key.encode()).hexdigest())
+
+    def _thumbnail_path(self, digest: str, size: int) -> Path:
+        if not self.resize:
+            size = ORIGINAL_SIZE
+        return self._path("thumbnails", f"{digest}-{size}")
+
+    def _path(self, kind: str, name: str) -> Path:
+        if self.directory is None:
+            raise RuntimeError("CoverCache is not initialized.")
+        return self.directory / kind / name[:2] / name
+
+    def _read(self, path: Path) -> bytes | None:
+        with self._lock:
+            if path not in self._entries:
+                return None
+            self._entries.move_to_end(path)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except OSError:
+            self._forget(path)
+            return None
+        return data
+
+    def _write(self, path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        temporary.write_bytes(data)
+        temporary.replace(path)
+        with self._lock:
+            self._total_bytes += len(data) - self._entries.pop(path, 0)
+            self._entries[path] = len(data)
+        self._evict()
+
+    def _forget(self, path: Path) -> None:
+        with self._lock:
+            self._total_bytes -= self._entries.pop(path, 0)
+
+    def _evict(self) -> None:
+        while True:
+            with self._lock:
+                if self._total_bytes <= self.max_bytes or not self._entries:
+                    return
+                path, size = self._entries.popitem(last=False)
+                self._total_bytes -= size
+            path.unlink(missing_ok=True)
+            log.debug(f"Evicted {path.name} from the cover cache")
+
+    def _load_entries(self) -> None:
+        files: list[tuple[float, Path, int]] = []
+        if self.directory is not None and self.directory.is_dir():
+            for path in self.directory.glob("*/*/*"):
+                if path.suffix == ".tmp":
+                    path.unlink(missing_ok=True)
+                    continue
+                stat = path.stat()
+                files.append((stat.st_mtime, path, stat.st_size))
+        with self._lock:
+            self._entries = OrderedDict((path, size) for _, path, size in sorted(files))
+            self._total_bytes = sum(self._entries.values())
+        self._evict()
+
+
+def _can_resize() -> bool:
+    return importlib.util.find_spec("PIL") is not None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool  # noqa: PLW0603
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=min(4, os.cpu_count() or 1))
+            atexit.register(_pool.shutdown, cancel_futures=True)
+        return _pool
@@ -0,0 +1,256 @@
+"""Detection and merging of near-duplicate library items."""
+
+from __future__ import annotations
+
+import logging
+import re
+import unicodedata
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import TYPE_CHECKING, NamedTuple
+
+from audiobooks.extensions import db
+
+from .models import Author, Book, Genre, LibraryModel, Series
+from .progress import merge_progress
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping
+
+
+log: logging.Logger = logging.getLogger(__name__)
+
+NUMBER_WORDS: dict[str, str] = {
+    word: str(number)
+    for number, word in enumerate(
+        [
+            "zero",
+            "one",
+            "two",
+            "three",
+            "four",
+            "five",
+            "six",
+            "seven",
+            "eight",
+            "nine",
+            "ten",
+            "eleven",
+            "twelve",
+            "thirteen",
+            "fourteen",
+            "fifteen",
+            "sixteen",
+            "seventeen",
+            "eighteen",
+            "nineteen",
+            "twenty",
+        ]
+    )
+}
+ROMAN_NUMERALS: dict[str, str] = {
+    numeral: str(number)
+    for number, numeral in enumerate(
+        [
+            "i",
+            "ii",
+            "iii",
+            "iv",
+            "v",
+            "vi",
+            "vii",
+            "viii",
+            "ix",
+            "x",
+            "xi",
+            "xii",
+            "xiii",
+            "xiv",
+            "xv",
+        ],
+        start=1,
+    )
+}
+BOOK_RELATIONSHIPS: dict[type[LibraryModel], str] = {
+    Author: "author",
+    Genre: "genre",
+    Series: "series",
+}
+DEFAULT_THRESHOLD: float = 0.85
+MAX_BLOCK_SIZE: int = 200
+
+
+class DuplicateCandidate(NamedTuple):
+    """A pair of records that may be duplicates."""
+
+    first: LibraryModel
+    second: LibraryModel
+    score: float
+
+
+def normalize_name(name: str) -> str:
+    """Normalize a name so that spelling variants of it compare equal.
+
+    Accents, punctuation and case are removed, runs of initials are joined, and
+    numbers written as words or roman numerals are converted to digits, so that
+    "J. R. R. Tolkien" and "J.R.R. Tolkien", or "Book One" and "Book 1", share the
+    same normalized name. Roman numerals are only converted after the first word,
+    and single letters only at the end of the name, so "Ann V. Smith" keeps its
+    initial.
+
+    Args:
+        name (str): The name to normalize.
+
+    Returns:
+        str: The normalized name.
+    """
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+    normalized: list[str] = []
+    joining_initials = False
+    tokens = re.sub(r"[^a-z0-9]+", " ", name.lower()).split()
+    for position, token in enumerate(tokens, start=1):
+        is_initial = len(token) == 1 and token.isalpha()
+        if is_initial and joining_initials:
+            normalized[-1] += token
+            continue
+        joining_initials = is_initial
+        word = NUMBER_WORDS.get(token, token)
+        if normalized and (not is_initial or position == len(tokens)):
+            word = ROMAN_NUMERALS.get(word, word)
+        normalized.append(word)
+    return " ".join(normalized)
+
+
+def trigrams(name: str) -> set[str]:
+    """Get the character trigrams of a normalized name.
+
+    Args:
+        name (str): The normalized name.
+
+    Returns:
+        set[str]: The trigrams, including the padded start and end of each word.
+    """
+    padded = f"  {name} "
+    return {padded[index : index + 3] for index in range(len(padded) - 2)}
+
+
+def similarity(first: str, second: str) -> float:
+    """Score the similarity of two normalized names.
+
+    Args:
+        first (str): The first normalized name.
+        second (str): The second normalized name.
+
+    Returns:
+        float: The similarity, from 0 (different) to 1 (identical).
+    """
+    if first == second:
+        return 1.0
+    return SequenceMatcher(None, first, second, autojunk=False).ratio()
+
+
+def find_duplicates(
+    model: type[LibraryModel], threshold: float = DEFAULT_THRESHOLD
+) -> list[DuplicateCandidate]:
+    """Find the records of a model that are likely to be duplicates.
+
+    Names are indexed by trigram, and only pairs of names sharing a block are scored,
+    which avoids comparing every pair of records. The blocks of more than
+    ``MAX_BLOCK_SIZE`` names are skipped and logged, since their trigrams are too
+    common to discriminate between names and comparing them is quadratic. This trades
+    some recall for speed: a pair of names sharing only such common trigrams is not
+    compared, which is rare above the default threshold since similar names share
+    most of their trigrams.
+
+    Args:
+        model (type[LibraryModel]): The library model to search.
+        threshold (float, optional): The minimum similarity of the candidates.
+            Defaults to DEFAULT_THRESHOLD.
+
+    Returns:
+        list[DuplicateCandidate]: The candidates, the most similar first.
+    """
+    records: list[LibraryModel] = list(db.session.execute(db.select(model)).scalars())
+    names: list[str] = [normalize_name(record.name) for record in records]
+    blocks: defaultdict[str, list[int]] = defaultdict(list)
+    for index, name in enumerate(names):
+        for trigram in trigrams(name):
+            blocks[trigram].append(index)
+    pairs = _candidate_pairs(names, blocks, threshold)
+    candidates = [
+        DuplicateCandidate(records[first], records[second], score)
+        for (first, second) in pairs
+        if (score := similarity(names[first], names[second])) >= threshold
+    ]
+    return sorted(candidates, key=lambda candidate: -candidate.score)
+
+
+def merge_records(
+    keep: LibraryModel, duplicates: Iterable[LibraryModel]
+) -> LibraryModel:
+    """Merge duplicate records into one.
+
+    The books referring to the duplicates are re-pointed to the kept record through
+    the ORM, so that the change feed records them, then the duplicates are deleted.
+    When books are merged, the listening positions of the duplicates are moved to
+    the kept book, and their chapters are deleted with them. All the changes are
+    made in the current session, so they are committed or rolled back together.
+
+    Args:
+        keep (LibraryModel): The record to keep.
+        duplicates (Iterable[LibraryModel]): The records to merge into ``keep``.
+
+    Returns:
+        LibraryModel: The kept record.
+
+    Raises:
+        TypeError: The records are not all of the same mergeable model.
+        ValueError: The kept record is also in the duplicates.
+    """
+    model = type(keep)
+    duplicates = list(duplicates)
+    if (model is not Book and model not in BOOK_RELATIONSHIPS) or any(
+        type(d) is not model for d in duplicates
+    ):
+        raise TypeError(f"Can't merge {duplicates!r} into {keep!r}")
+    if any(duplicate.record_id == keep.record_id for duplicate in duplicates):
+        raise ValueError(f"Can't merge {keep!r} into itself")
+    if isinstance(keep, Book):
+        merge_progress(keep, duplicates)
+        for duplicate in duplicates:
+            duplicate.delete()
+        return keep
+    relationship = BOOK_RELATIONSHIPS[model]
+    books = db.session.scalars(
+        db.select(Book).where(
+            getattr(Book, f"{relationship}_id").in_(
+                [duplicate.record_id for duplicate in duplicates]
+            )
+        )
+    )
+    for book in books:
+        setattr(book, relationship, keep)
+    for duplicate in duplicates:
+        duplicate.delete()
+    return keep
+
+
+def _candidate_pairs(
+    names: list[str], blocks: Mapping[str, list[int]], threshold: float
+) -> set[tuple[int, int]]:
+    pairs: set[tuple[int, int]] = set()
+    for trigram, block in blocks.items():
+        if len(block) > MAX_BLOCK_SIZE:
+            log.info(f"Skipped the block of {trigram!r}: {len(block)} names")
+            continue
+        for position, first in enumerate(block):
+            for second in block[position + 1 :]:
+                if _max_similarity(names[first], names[second]) >= threshold:
+                    pairs.add((first, second))
+    return pairs
+
+
+def _max_similarity(first: str, second: str) -> float:
+    total = len(first) + len(second)
+    return 2 * min(len(first), len(second)) / total if total else 1.0
@@ -0,0 +1,33 @@
+"""Resolution of the media files of the books inside the media root."""
+
+from __future__ import annotations
+
+from pathlib import Path, PurePath
+
+from flask import current_app
+
+
+def resolve_media_path(
+    file_path: PurePath | str, media_root: PurePath | str | None = None
+) -> Path | None:
+    """Resolve the path of a media file, if it is inside the media root.
+
+    A relative path is relative to the media root. The symbolic links are followed
+    before the check, so a link can't point outside of the media root.
+
+    Args:
+        file_path (PurePath | str): The path of the media file.
+        media_root (PurePath | str | None, optional): The media root. Defaults to the
+            ``MEDIA_ROOT`` of the current application.
+
+    Returns:
+        Path | None: The resolved path, or None if it is outside the media root or
+            no media root is configured.
+    """
+    if media_root is None:
+        media_root = current_app.config["MEDIA_ROOT"]
+    if not media_root or not str(file_path):
+        return None
+    root = Path(media_root).resolve()
+    resolved = (root / file_path).resolve()
+    return resolved if resolved.is_relative_to(root) else None
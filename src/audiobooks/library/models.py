@@ -5,7 +5,8 @@ from __future__ import annotations
 from datetime import date
 from decimal import Decimal
 from enum import Enum
-from typing import Any, Self
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Self
 
 from sqlalchemy.ext.hybrid import hybrid_property
 
@@ -15,6 +16,10 @@ from audiobooks.extensions import db
 from .utils import clean_name
 
 
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session
+
+
 class LibraryModel(Model):
     """Base class for a model containing only uniquely named items."""
 
@@ -41,17 +46,21 @@ class LibraryModel(Model):
         return f"{type(self).__name__}('{self.name}')"
 
     @classmethod
-    def get_by_name(cls: type[Self], name: str) -> Self | None:
+    def get_by_name(
+        cls: type[Self], name: str, session: Session | None = None
+    ) -> Self | None:
         """Get a record by name.
 
         Args:
             name (str): The name of the record.
+            session (Session, optional): The session to query. Defaults to the
+                application's ``db.session``.
 
         Returns:
             LibraryModel | None: The record or None if not found.
         """
         query = db.select(cls).filter_by(name=clean_name(name))
-        return db.session.execute(query).scalar_one_or_none()
+        return (session or db.session).execute(query).scalar_one_or_none()
 
     @classmethod
     def get(cls: type[Self], record: Self | str | int) -> Self | None:
@@ -99,11 +108,24 @@ class Series(LibraryModel):
 class Book(LibraryModel):
     """Model for the ``book`` table in the database."""
 
+    __table_args__ = (
+        db.Index("ix_book_series_order", "series_id", "series_number"),
+        db.Index("ix_book_author_duration", "author_id", "duration_ms"),
+        db.Index("ix_book_genre_duration", "genre_id", "duration_ms"),
+        db.Index("ix_book_series_duration", "series_id", "duration_ms"),
+    )
+
     author_id = db.Column(db.Integer, db.ForeignKey("author.record_id"))
     genre_id = db.Column(db.Integer, db.ForeignKey("genre.record_id"))
     series_id = db.Column(db.Integer, db.ForeignKey("series.record_id"))
     series_number = db.Column(SqliteDecimal(precision=3))
     release_date = db.Column(db.Date)
+    file_path = db.Column(db.String)
+    duration_ms = db.Column(db.Integer)
+    indexed_at = db.Column(db.DateTime)
+    _chapters = db.relationship(
+        "Chapter", cascade="all, delete-orphan", order_by="Chapter.number", lazy=True
+    )
 
     def __init__(
         self,
@@ -114,6 +136,7 @@ class Book(LibraryModel):
         series: Series | str | None = None,
         series_number: Decimal | str | None = None,
         release_date: date | str | None = None,
+        file_path: Path | str | None = None,
     ) -> None:
         """Initialize a model record for a book.
 
@@ -129,6 +152,8 @@ class Book(LibraryModel):
                 series. Default to None.
             release_date (date | str | None, optional): The book's release date.
                 Defaults to None.
+            file_path (Path | str | None, optional): Path of the book's audio file.
+                Defaults to None.
 
         """
         super().__init__(name=name)
@@ -141,6 +166,19 @@ class Book(LibraryModel):
         if isinstance(release_date, str):
             release_date = date.fromisoformat(release_date)
         self.release_date = release_date
+        self.file_path = str(file_path) if file_path else None
+
+
+class Chapter(Model):
+    """Model for the ``chapter`` table in the database."""
+
+    __table_args__ = (db.UniqueConstraint("book_id", "number"),)
+
+    book_id = db.Column(db.Integer, db.ForeignKey("book.record_id"), nullable=False)
+    number = db.Column(db.Integer, nullable=False)
+    title = db.Column(db.String, nullable=False)
+    start_ms = db.Column(db.Integer, nullable=False)
+    end_ms = db.Column(db.Integer)
 
 
 class LibraryItems(Enum):
@@ -0,0 +1,315 @@
+"""Listening progress of the users, buffered in memory and written in batches."""
+
+from __future__ import annotations
+
+import atexit
+import functools
+import logging
+import threading
+from collections import defaultdict
+from datetime import UTC, datetime
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from flask import Flask, current_app
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from audiobooks.database import Model
+from audiobooks.extensions import db, write_coalescer
+from audiobooks.libraries import current_library, use_library
+
+from .models import Book
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from sqlalchemy.orm import Session
+
+    from audiobooks.coalescer import WriteCoalescer
+
+
+log: logging.Logger = logging.getLogger(__name__)
+EXTENSION_NAME = "progress_buffer"
+
+
+class ListeningProgress(Model):
+    """Model for the ``listening_progress`` table in the database.
+
+    The positions of a book are deleted with the book.
+    """
+
+    __table_args__ = (db.UniqueConstraint("user", "book_id"),)
+
+    user = db.Column(db.String, nullable=False)
+    book_id = db.Column(db.Integer, db.ForeignKey("book.record_id"), nullable=False)
+    position_ms = db.Column(db.Integer, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False)
+    book = db.relationship(
+        Book,
+        backref=db.backref(
+            "_listening_progress", cascade="all, delete-orphan", lazy=True
+        ),
+    )
+
+
+class ProgressKey(NamedTuple):
+    """The library, user and book of a listening position."""
+
+    library: str | None
+    user: str
+    book_id: int
+
+
+class Position(NamedTuple):
+    """A listening position and when it was reported."""
+
+    position_ms: int
+    updated_at: datetime
+
+
+class _BufferState:
+    def __init__(self, interval: float, max_pending: int) -> None:
+        self.interval: float = interval
+        self.max_pending: int = max_pending
+        self.pending: dict[ProgressKey, Position] = {}
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stop = threading.Event()
+        self.thread: threading.Thread | None = None
+
+
+def upsert_progress(rows: list[dict[str, Any]]) -> int:
+    """Insert or update listening positions with a single statement.
+
+    A stored position is only replaced by a position reported at the same time or
+    later, so several application processes can write to the same database. The
+    positions of the books deleted since they were reported are dropped.
+
+    Args:
+        rows (list[dict[str, Any]]): The ``user``, ``book_id``, ``position_ms`` and
+            ``updated_at`` of each position.
+
+    Returns:
+        int: The number of positions written.
+    """
+    query = db.select(Book.record_id).where(
+        Book.record_id.in_({row["book_id"] for row in rows})
+    )
+    books = set(db.session.scalars(query))
+    rows = [row for row in rows if row["book_id"] in books]
+    if not rows:
+        return 0
+    statement = sqlite_insert(ListeningProgress)
+    statement = statement.on_conflict_do_update(
+        index_elements=["user", "book_id"],
+        set_={
+            "position_ms": statement.excluded.position_ms,
+            "updated_at": statement.excluded.updated_at,
+        },
+        where=statement.excluded.updated_at >= ListeningProgress.updated_at,
+    )
+    db.session.execute(statement, rows)
+    return len(rows)
+
+
+def merge_progress(keep: Book, duplicates: Iterable[Book]) -> None:
+    """Move the stored listening positions of duplicate books to the kept book.
+
+    A user with positions in several of the books keeps the latest one. The changes
+    are flushed, so the positions left are deleted with the duplicates.
+
+    Args:
+        keep (Book): The book to keep.
+        duplicates (Iterable[Book]): The books merged into ``keep``.
+    """
+    query = (
+        db.select(ListeningProgress)
+        .where(
+            ListeningProgress.book_id.in_(
+                [keep.record_id, *(duplicate.record_id for duplicate in duplicates)]
+            )
+        )
+        .order_by(ListeningProgress.updated_at.desc())
+    )
+    positions: dict[str, list[ListeningProgress]] = defaultdict(list)
+    for progress in db.session.scalars(query):
+        positions[progress.user].append(progress)
+    for user_positions in positions.values():
+        latest = user_positions[0]
+        kept = next((p for p in user_positions if p.book_id == keep.record_id), None)
+        if kept is None:
+            latest.book_id = keep.record_id
+        elif kept is not latest:
+            kept.position_ms, kept.updated_at = latest.position_ms, latest.updated_at
+    db.session.flush()
+
+
+def read_progress(
+    user: str, book: Book, session: Session | None = None
+) -> Position | None:
+    """Read the stored listening position of a user in a book.
+
+    Args:
+        user (str): The name of the user.
+        book (Book): The book.
+        session (Session, optional): The session to query. Defaults to the
+            application's ``db.session``.
+
+    Returns:
+        Position | None: The position, or None if the user never listened to it.
+    """
+    query = db.select(ListeningProgress.position_ms, ListeningProgress.updated_at)
+    query = query.filter_by(user=user, book_id=book.record_id)
+    row = (session or db.session).execute(query).one_or_none()
+    return Position(*row) if row else None
+
+
+class ProgressBuffer:
+    """Flask extension buffering the listening positions reported by the players.
+
+    Only the latest position of each user and book is kept in memory. A flusher
+    thread writes the buffered positions every ``PROGRESS_FLUSH_INTERVAL`` seconds,
+    or as soon as ``PROGRESS_MAX_PENDING`` positions are buffered, with one upsert
+    statement per library through the write coalescer. These two settings bound the
+    positions lost if the process is killed. The buffer is also flushed when the
+    application shuts down.
+    """
+
+    def __init__(self, coalescer: WriteCoalescer) -> None:
+        """Initialize an instance of ProgressBuffer.
+
+        Args:
+            coalescer (WriteCoalescer): The write coalescer.
+        """
+        self.coalescer: WriteCoalescer = coalescer
+
+    def init_app(self, app: Flask) -> None:
+        """Initialize the progress buffer for a Flask application.
+
+        The flusher thread is started with the first buffered position.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        app.extensions[EXTENSION_NAME] = _BufferState(
+            app.config["PROGRESS_FLUSH_INTERVAL"], app.config["PROGRESS_MAX_PENDING"]
+        )
+        atexit.register(self.shutdown, app)
+
+    def record(self, user: str, book_id: int, position_ms: int) -> None:
+        """Buffer a listening position, replacing the pending one of the same book.
+
+        The position is for the library selected for the request.
+
+        Args:
+            user (str): The name of the user.
+            book_id (int): The id of the book.
+            position_ms (int): The position in the book, in milliseconds.
+        """
+        state: _BufferState = current_app.extensions[EXTENSION_NAME]
+        key = ProgressKey(current_library(), user, book_id)
+        position = Position(position_ms, datetime.now(UTC).replace(tzinfo=None))
+        with state.lock:
+            state.pending[key] = position
+            if state.thread is None:
+                app: Flask = current_app._get_current_object()  # type: ignore[attr-defined]  # noqa: SLF001
+                state.thread = threading.Thread(
+                    target=self._flush_loop,
+                    args=(app, state),
+                    name="progress-flusher",
+                    daemon=True,
+                )
+                state.thread.start()
+            if len(state.pending) >= state.max_pending:
+                state.wake.set()
+
+    def get_pending(self, user: str, book_id: int) -> Position | None:
+        """Get the buffered position of a user in a book, not written yet.
+
+        Args:
+            user (str): The name of the user.
+            book_id (int): The id of the book.
+
+        Returns:
+            Position | None: The position, or None if none is buffered.
+        """
+        state: _BufferState = current_app.extensions[EXTENSION_NAME]
+        with state.lock:
+            return state.pending.get(ProgressKey(current_library(), user, book_id))
+
+    def flush(self, app: Flask) -> int:
+        """Write the buffered positions to the database.
+
+        Args:
+            app (Flask): The Flask application.
+
+        Returns:
+            int: The number of positions written.
+        """
+        state: _BufferState | None = app.extensions.get(EXTENSION_NAME)
+        return self._flush(app, state) if state is not None else 0
+
+    def shutdown(self, app: Flask) -> None:
+        """Stop the flusher thread of an application and flush the buffer.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        state: _BufferState | None = app.extensions.pop(EXTENSION_NAME, None)
+        if state is None:
+            return
+        state.stop.set()
+        state.wake.set()
+        if state.thread is not None:
+            state.thread.join()
+        self._flush(app, state)
+
+    def _flush_loop(self, app: Flask, state: _BufferState) -> None:
+        while not state.stop.is_set():
+            state.wake.wait(state.interval)
+            state.wake.clear()
+            try:
+                self._flush(app, state)
+            except Exception:
+                log.exception("Can't flush the listening positions")
+
+    def _flush(self, app: Flask, state: _BufferState) -> int:
+        with state.flush_lock:
+            with state.lock:
+                batch, state.pending = state.pending, {}
+            if not batch:
+                return 0
+            rows: dict[str | None, list[dict[str, Any]]] = defaultdict(list)
+            for key, position in batch.items():
+                rows[key.library].append(
+                    {"user": key.user, "book_id": key.book_id} | position._asdict()
+                )
+            written = 0
+            with app.app_context():
+                for library, library_rows in rows.items():
+                    try:
+                        with use_library(library):
+                            written += self.coalescer.execute(
+                                functools.partial(upsert_progress, library_rows)
+                            )
+                    except Exception as exception:  # noqa: BLE001
+                        log.warning(
+                            f"Can't write {len(library_rows)} listening positions: "
+                            f"{exception}"
+                        )
+                        self._restore(state, batch, library)
+            log.debug(f"Wrote {written} listening positions")
+            return written
+
+    @staticmethod
+    def _restore(
+        state: _BufferState, batch: dict[ProgressKey, Position], library: str | None
+    ) -> None:
+        with state.lock:
+            for key, position in batch.items():
+                if key.library == library:
+                    state.pending.setdefault(key, position)
+
+
+progress_buffer = ProgressBuffer(write_coalescer)
@@ -2,14 +2,43 @@
 
 from __future__ import annotations
 
+import functools
 import logging
-
-from flask import Blueprint, Response, abort, make_response, redirect, request
+from typing import Any
+
+from flask import (
+    Blueprint,
+    Response,
+    abort,
+    current_app,
+    g,
+    make_response,
+    redirect,
+    request,
+    send_file,
+)
 from sqlalchemy.exc import SQLAlchemyError
 
-from audiobooks.extensions import db
+from audiobooks.admission import writes
+from audiobooks.extensions import (
+    cover_cache,
+    db,
+    libraries,
+    read_snapshot,
+    write_coalescer,
+)
+from audiobooks.libraries import current_library
 
-from .models import LibraryModel, get_library_item
+from .batch import Lookup, resolve_lookups
+from .changes import compact_changes, read_changes
+from .chapters import index_book, read_chapters, total_durations
+from .containers import audio_mimetype
+from .covers import Cover
+from .duplicates import DEFAULT_THRESHOLD, find_duplicates, merge_records
+from .media import resolve_media_path
+from .models import Book, LibraryModel, Series, get_library_item
+from .progress import Position, progress_buffer, read_progress
+from .similar import read_similar_books
 
 
 log: logging.Logger = logging.getLogger(__name__)
@@ -18,6 +47,17 @@ library_blueprint = Blueprint(
 )
 
 
+@library_blueprint.url_value_preprocessor
+def select_library(endpoint: str | None, values: dict[str, Any] | None) -> None:
+    """Select the library of the request for ``db.session``.
+
+    Args:
+        endpoint (str | None): The endpoint of the request.
+        values (dict[str, Any] | None): The URL values of the request.
+    """
+    g.library = values.pop("library", None) if values else None
+
+
 def get_model(item: str) -> type[LibraryModel]:
     """Get the library model corresponding to an item.
 
@@ -49,6 +89,161 @@ def get_record(item: str, record_id: int) -> LibraryModel:
     return get_model(item).get_by_id(record_id) or abort(404)
 
 
+def check_file_path(arguments: dict[str, str]) -> None:
+    """Check that the file path in the arguments of a record is inside the media root.
+
+    Args:
+        arguments (dict[str, str]): The arguments of the record.
+
+    Raises:
+        HTTPError: Raises 400 error if the file path is outside the media root.
+    """
+    file_path = arguments.get("file_path")
+    if file_path and resolve_media_path(file_path) is None:
+        log.warning(f"Can't use {file_path!r}: it is outside the media root")
+        abort(400)
+
+
+def _create_record(model: type[LibraryModel], arguments: dict[str, str]) -> int:
+    record: LibraryModel = model.create(**arguments)
+    db.session.flush()
+    return record.record_id
+
+
+def _update_record(
+    model: type[LibraryModel], record_id: int, arguments: dict[str, str]
+) -> None:
+    record: LibraryModel | None = model.get_by_id(record_id)
+    if record is None:
+        raise KeyError(f"{model.__name__}({record_id}) was deleted")
+    record.update(**arguments)
+    db.session.flush()
+
+
+def _delete_record(model: type[LibraryModel], record_id: int) -> str:
+    record: LibraryModel | None = model.get_by_id(record_id)
+    if record is None:
+        return f"{model.__name__}({record_id})"
+    name = str(record)
+    record.delete()
+    db.session.flush()
+    return name
+
+
+def _index_book(record_id: int) -> bool:
+    book: Book | None = Book.get_by_id(record_id)
+    if book is None:
+        raise KeyError(f"Book({record_id}) was deleted")
+    indexed = index_book(book)
+    db.session.flush()
+    return indexed
+
+
+@library_blueprint.route("/batch", methods=["POST"])
+def read_batch() -> Response:
+    """Read several records in one request.
+
+    The body is a JSON list of lookups such as ``{"item": "book", "record_id": 1}``
+    or ``{"item": "author", "name": "Alice Bob"}``. The lookups are resolved with
+    one query per model, and the results are returned in the same order, with null
+    for the records not found.
+
+    Returns:
+        Response: The records.
+
+    Raises:
+        HTTPError: Raises 400 error if the lookups are not valid.
+        HTTPError: Raises 413 error if there are more than ``BATCH_MAX_SIZE`` lookups.
+    """
+    body = request.get_json(silent=True)
+    if not isinstance(body, list):
+        abort(400)
+    if len(body) > current_app.config["BATCH_MAX_SIZE"]:
+        abort(413)
+    try:
+        lookups: list[Lookup] = [Lookup.from_dict(lookup) for lookup in body]
+    except (TypeError, ValueError) as exception:
+        log.warning(f"Can't read batch: {exception}")
+        abort(400)
+    records = resolve_lookups(lookups, read_snapshot.session)
+    return make_response([record.to_dict() if record else None for record in records])
+
+
+@library_blueprint.route("/changes")
+def list_changes() -> Response:
+    """List the changes made to the library after a sequence number.
+
+    The last sequence number already seen is given with the ``since`` argument, and
+    the page size with the ``limit`` argument.
+
+    Returns:
+        Response: The changes, the last sequence number, and whether there are more.
+    """
+    since: int = request.args.get("since", default=0, type=int)
+    limit: int = min(
+        request.args.get("limit", current_app.config["CHANGES_PAGE_SIZE"], type=int),
+        current_app.config["CHANGES_MAX_PAGE_SIZE"],
+    )
+    changes, more = read_changes(since, max(limit, 1))
+    return make_response(
+        {
+            "changes": [change.to_feed() for change in changes],
+            "last_seq": changes[-1].record_id if changes else since,
+            "more": more,
+        }
+    )
+
+
+@library_blueprint.route("/changes/compact")
+@writes
+def compact_change_log() -> Response:
+    """Compact the changes up to a sequence number given with the ``before`` argument.
+
+    Returns:
+        Response: The number of changes removed or an error message.
+
+    Raises:
+        HTTPError: Raises 400 error if the compaction failed.
+    """
+    before: int = request.args.get("before", type=int) or abort(400)
+    try:
+        removed: int = compact_changes(before)
+        db.session.commit()
+        return make_response({"removed": removed})
+    except SQLAlchemyError as exception:
+        db.session.rollback()
+        log.warning(f"Can't compact the changes: {exception}")
+        abort(400)
+
+
+@library_blueprint.route("/all/<string:item>/search")
+def search_all_libraries(item: str) -> Response:
+    """Search records by name across the default library and all named libraries.
+
+    The maximum number of records can be set with the ``limit`` argument.
+
+    Args:
+        item (str): The type of record to search.
+
+    Returns:
+        Response: The records with the name of their library.
+
+    Raises:
+        HTTPError: Raises 400 error if the name is missing.
+        HTTPError: Raises 404 error if the model is not found, or if the request is
+            for a named library.
+    """
+    if current_library() is not None:
+        abort(404)
+    model: type[LibraryModel] = get_model(item)
+    name: str = request.args.get("name", "").strip()
+    if not name:
+        abort(400)
+    max_limit: int = current_app.config["LIBRARY_SEARCH_LIMIT"]
+    limit: int = min(request.args.get("limit", max_limit, type=int), max_limit)
+    return make_response(libraries.search(model.__tablename__, name, limit))
+
+
 @library_blueprint.route("/<string:item>/find")
 def find_by_name(item: str) -> Response:
     """Find a record in the database by name.
@@ -64,11 +259,12 @@ def find_by_name(item: str) -> Response:
     """
     model: type[LibraryModel] = get_model(item)
     name: str = request.args.get("name", type=str) or abort(404)
-    record: LibraryModel = model.get_by_name(name) or abort(404)
+    record: LibraryModel = model.get_by_name(name, read_snapshot.session) or abort(404)
     return make_response(redirect(f"./{record.record_id}"))
 
 
 @library_blueprint.route("/<string:item>/create")
+@writes
 def create_record(item: str) -> Response:
     """Create new record and add it to the database.
 
@@ -79,21 +275,23 @@ def create_record(item: str) -> Response:
         Response: The record or an error message.
 
     Raises:
-        HTTPError: Raises 400 error if the creation failed.
+        HTTPError: Raises 400 error if the creation failed or the file path is outside
+            the media root.
         HTTPError: Raises 404 error if the model is not found.
     """
     model: type[LibraryModel] = get_model(item)
+    arguments: dict[str, str] = request.args.to_dict()
+    check_file_path(arguments)
     try:
-        record: LibraryModel = model.create(**request.args.to_dict())
+        record_id: int = write_coalescer.execute(
+            functools.partial(_create_record, model, arguments)
+        )
+        return make_response(redirect(f"./{record_id}"))
     except (TypeError, ValueError) as exception:
         log.warning(f"Can't create {item}: {exception}")
         abort(400)
-    try:
-        db.session.commit()
-        return make_response(redirect(f"./{record.record_id}"))
     except SQLAlchemyError as exception:
-        db.session.rollback()
-        log.warning(f"Can't add {record}: {exception}")
+        log.warning(f"Can't add {item} {arguments}: {exception}")
         abort(400)
 
 
@@ -111,11 +309,15 @@ def read_record(item: str, record_id: int) -> Response:
     Raises:
         HTTPError: Raises 404 error if the record is not found.
     """
-    record: LibraryModel = get_record(item, record_id)
+    model: type[LibraryModel] = get_model(item)
+    record: LibraryModel = model.get_by_id(record_id, read_snapshot.session) or abort(
+        404
+    )
     return make_response(record.to_dict())
 
 
 @library_blueprint.route("/<string:item>/<int:record_id>/update")
+@writes
 def update_record(item: str, record_id: int) -> Response:
     """Update a record from the database.
 
@@ -127,25 +329,28 @@ def update_record(item: str, record_id: int) -> Response:
         Response: The record or an error message.
 
     Raises:
-        HTTPError: Raises 400 error if the update failed.
+        HTTPError: Raises 400 error if the update failed or the file path is outside
+            the media root.
         HTTPError: Raises 404 error if the record is not found.
     """
     record: LibraryModel = get_record(item, record_id)
+    arguments: dict[str, str] = request.args.to_dict()
+    check_file_path(arguments)
     try:
-        record.update(**request.args.to_dict())
+        write_coalescer.execute(
+            functools.partial(_update_record, type(record), record_id, arguments)
+        )
+        return make_response(redirect(f"../{record_id}"))
     except KeyError as exception:
         log.warning(f"Can't update {item}: {exception}")
         abort(400)
-    try:
-        db.session.commit()
-        return make_response(redirect(f"../{record.record_id}"))
     except SQLAlchemyError as exception:
-        db.session.rollback()
-        log.warning(f"Can't update {record}: {exception}")
+        log.warning(f"Can't update {record!r}: {exception}")
         abort(400)
 
 
 @library_blueprint.route("/<string:item>/<int:record_id>/delete")
+@writes
 def delete_record(item: str, record_id: int) -> Response:
     """Delete a record from the database.
 
@@ -162,10 +367,355 @@ def delete_record(item: str, record_id: int) -> Response:
     """
     record: LibraryModel = get_record(item, record_id)
     try:
-        record.delete()
+        deleted: str = write_coalescer.execute(
+            functools.partial(_delete_record, type(record), record_id)
+        )
+        return make_response(f"Deleted: {deleted}")
+    except SQLAlchemyError as exception:
+        log.warning(f"Can't delete {record!r}: {exception}")
+        abort(400)
+
+
+@library_blueprint.route("/book/<int:record_id>/cover")
+def read_cover(record_id: int) -> Response:
+    """Read the cover art of a book.
+
+    The thumbnail size is chosen with the ``size`` argument, which defaults to the
+    largest size in ``COVER_SIZES``.
+
+    Args:
+        record_id (int): The id of the book.
+
+    Returns:
+        Response: The cover image.
+
+    Raises:
+        HTTPError: Raises 400 error if the size is not supported.
+        HTTPError: Raises 404 error if the book or its cover is not found.
+    """
+    sizes: tuple[int, ...] = current_app.config["COVER_SIZES"]
+    size: int = request.args.get("size", default=max(sizes), type=int)
+    if size not in sizes:
+        abort(400)
+    book: Book = get_record("book", record_id)  # type: ignore[assignment]
+    if not book.file_path:
+        abort(404)
+    digest: str | None = cover_cache.get_digest(book.file_path)
+    if digest is None:
+        abort(404)
+    etag = f"{digest[:32]}-{size}"
+    if request.if_none_match.contains(etag):
+        response = make_response("", 304)
+    else:
+        cover: Cover = cover_cache.get_cover(book.file_path, size) or abort(404)
+        response = make_response(cover.data)
+        response.mimetype = cover.mimetype
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config["COVER_MAX_AGE"]
+    return response
+
+
+@library_blueprint.route("/book/<int:record_id>/audio")
+def read_audio(record_id: int) -> Response:
+    """Stream the audio file of a book.
+
+    Range and If-Range requests are answered with partial content, so a player can
+    seek without downloading the file from the beginning. The file is sent by the
+    WSGI server's file wrapper, or by the front-end server with ``USE_X_SENDFILE``.
+    Only the files inside ``MEDIA_ROOT`` are sent.
+
+    Args:
+        record_id (int): The id of the book.
+
+    Returns:
+        Response: The audio file, or the requested range of it.
+
+    Raises:
+        HTTPError: Raises 404 error if the book or its audio file is not found, or if
+            the file is outside the media root.
+    """
+    book: Book = get_record("book", record_id)  # type: ignore[assignment]
+    file_path = resolve_media_path(book.file_path) if book.file_path else None
+    if file_path is None or not file_path.is_file():
+        log.warning(f"Can't find the audio file of {book!r} in the media root")
+        abort(404)
+    return send_file(
+        file_path,
+        mimetype=audio_mimetype(book.file_path),
+        conditional=True,
+        etag=True,
+    )
+
+
+@library_blueprint.route("/book/<int:record_id>/chapters")
+def read_book_chapters(record_id: int) -> Response:
+    """Read the indexed duration and chapters of a book.
+
+    Args:
+        record_id (int): The id of the book.
+
+    Returns:
+        Response: The duration and the chapters of the book.
+
+    Raises:
+        HTTPError: Raises 404 error if the book is not found.
+    """
+    book: Book = get_record("book", record_id)  # type: ignore[assignment]
+    return make_response(
+        {
+            "record_id": book.record_id,
+            "duration_ms": book.duration_ms,
+            "chapters": [chapter.to_dict() for chapter in read_chapters(book)],
+        }
+    )
+
+
+@library_blueprint.route("/book/<int:record_id>/index")
+@writes
+def index_book_chapters(record_id: int) -> Response:
+    """Index the duration and chapters of a book from the headers of its audio file.
+
+    Args:
+        record_id (int): The id of the book.
+
+    Returns:
+        Response: The indexed chapters.
+
+    Raises:
+        HTTPError: Raises 400 error if the audio file can't be read.
+        HTTPError: Raises 404 error if the book or its audio file is not found.
+    """
+    book: Book = get_record("book", record_id)  # type: ignore[assignment]
+    if not book.file_path:
+        abort(404)
+    try:
+        indexed = write_coalescer.execute(functools.partial(_index_book, record_id))
+    except (KeyError, SQLAlchemyError) as exception:
+        log.warning(f"Can't index {book!r}: {exception}")
+        abort(400)
+    if not indexed:
+        log.warning(f"Can't read the chapters of {book!r}")
+        abort(400)
+    return make_response(redirect("./chapters"))
+
+
+@library_blueprint.route("/book/<int:record_id>/similar")
+def read_book_similar(record_id: int) -> Response:
+    """Read the books most similar to a book, from the similar books index.
+
+    The index is updated by the ``index_similar_books`` job.
+
+    Args:
+        record_id (int): The id of the book.
+
+    Returns:
+        Response: The similar books, the most similar first.
+
+    Raises:
+        HTTPError: Raises 404 error if the book is not found.
+    """
+    book: Book = get_record("book", record_id)  # type: ignore[assignment]
+    return make_response(
+        {"record_id": book.record_id, "similar": read_similar_books(book)}
+    )
+
+
+@library_blueprint.route("/book/<int:record_id>/progress/update")
+def update_progress(record_id: int) -> Response:
+    """Report the listening position of a user in a book.
+
+    The ``user`` and ``position_ms`` arguments are required. The position is
+    buffered and written to the database in a later batch, keeping only the latest
+    position of the user in the book.
+
+    Args:
+        record_id (int): The id of the book.
+
+    Returns:
+        Response: The buffered position.
+
+    Raises:
+        HTTPError: Raises 400 error if the user or the position is not valid.
+        HTTPError: Raises 404 error if the book is not found.
+    """
+    user: str = request.args.get("user", "").strip()
+    position_ms: int | None = request.args.get("position_ms", type=int)
+    if not user or position_ms is None or position_ms < 0:
+        log.warning(f"Can't update the progress: {request.args.to_dict()}")
+        abort(400)
+    book: Book = get_record("book", record_id)  # type: ignore[assignment]
+    progress_buffer.record(user, book.record_id, position_ms)
+    return make_response(
+        {"user": user, "record_id": book.record_id, "position_ms": position_ms}, 202
+    )
+
+
+@library_blueprint.route("/book/<int:record_id>/progress")
+def read_book_progress(record_id: int) -> Response:
+    """Read the listening position of the user given with the ``user`` argument.
+
+    A position still buffered is returned before it is written to the database.
+
+    Args:
+        record_id (int): The id of the book.
+
+    Returns:
+        Response: The position and when it was reported.
+
+    Raises:
+        HTTPError: Raises 400 error if the user is missing.
+        HTTPError: Raises 404 error if the book or the position is not found.
+    """
+    user: str = request.args.get("user", "").strip() or abort(400)
+    book: Book = get_record("book", record_id)  # type: ignore[assignment]
+    position: Position = (
+        progress_buffer.get_pending(user, book.record_id)
+        or read_progress(user, book)
+        or abort(404)
+    )
+    return make_response(
+        {
+            "user": user,
+            "record_id": book.record_id,
+            "position_ms": position.position_ms,
+            "updated_at": position.updated_at.isoformat(),
+        }
+    )
+
+
+@library_blueprint.route("/<string:item>/durations")
+def read_durations(item: str) -> Response:
+    """Read the total indexed duration of the books of each record.
+
+    Args:
+        item (str): The type of record: author, genre or series.
+
+    Returns:
+        Response: The number of indexed books and their total duration per record.
+
+    Raises:
+        HTTPError: Raises 404 error if the model is not found or has no books.
+    """
+    model: type[LibraryModel] = get_model(item)
+    try:
+        return make_response(total_durations(model))
+    except TypeError as exception:
+        log.warning(f"Can't total the durations: {exception}")
+        abort(404)
+
+
+@library_blueprint.route("/<string:item>/duplicates")
+def find_duplicate_records(item: str) -> Response:
+    """Find records that are likely to be duplicates.
+
+    The minimum similarity of the candidates can be set with the ``threshold``
+    argument.
+
+    Args:
+        item (str): The type of record to search.
+
+    Returns:
+        Response: The pairs of candidates with their similarity.
+
+    Raises:
+        HTTPError: Raises 404 error if the model is not found.
+    """
+    model: type[LibraryModel] = get_model(item)
+    threshold: float = request.args.get("threshold", DEFAULT_THRESHOLD, type=float)
+    return make_response(
+        [
+            {
+                "records": [candidate.first.to_dict(), candidate.second.to_dict()],
+                "score": round(candidate.score, 3),
+            }
+            for candidate in find_duplicates(model, threshold)
+        ]
+    )
+
+
+@library_blueprint.route("/<string:item>/<int:record_id>/merge")
+@writes
+def merge_duplicate_records(item: str, record_id: int) -> Response:
+    """Merge duplicate records into a record.
+
+    The ids of the duplicates are given with one or more ``duplicate`` arguments.
+
+    Args:
+        item (str): The type of record to merge.
+        record_id (int): The id of the record to keep.
+
+    Returns:
+        Response: The kept record or an error message.
+
+    Raises:
+        HTTPError: Raises 400 error if the merge failed.
+        HTTPError: Raises 404 error if a record is not found.
+    """
+    record: LibraryModel = get_record(item, record_id)
+    duplicates: list[LibraryModel] = [
+        get_record(item, duplicate_id)
+        for duplicate_id in request.args.getlist("duplicate", type=int)
+    ]
+    try:
+        merge_records(record, duplicates)
+    except (TypeError, ValueError) as exception:
+        log.warning(f"Can't merge {item}: {exception}")
+        abort(400)
+    try:
         db.session.commit()
-        return make_response("Deleted: {record}")
+        return make_response(redirect(f"../{record.record_id}"))
     except SQLAlchemyError as exception:
         db.session.rollback()
-        log.warning(f"Can't delete {record}: {exception}")
+        log.warning(f"Can't merge into {record}: {exception}")
         abort(400)
+
+
+@library_blueprint.route("/series/<int:record_id>/books")
+def read_series_books(record_id: int) -> Response:
+    """Read the books of a series in reading order, with the gaps in the numbering.
+
+    The order and the whole number of the previous book are computed in a single
+    query using the ``(series_id, series_number)`` index. Books without a number are
+    listed last.
+
+    Args:
+        record_id (int): The id of the series.
+
+    Returns:
+        Response: The books and the missing whole numbers of the series.
+
+    Raises:
+        HTTPError: Raises 404 error if the series is not found.
+    """
+    series: Series = get_record("series", record_id)  # type: ignore[assignment]
+    number = Book.series_number
+    order = (number.is_(None), number, Book.record_id)
+    whole_number = number.whole_number()
+    previous_whole_number = db.func.lag(whole_number).over(order_by=order)
+    query = (
+        db.select(
+            Book.record_id,
+            Book.name,
+            number,
+            whole_number.label("whole_number"),
+            previous_whole_number.label("previous_whole_number"),
+        )
+        .where(Book.series_id == series.record_id)
+        .order_by(*order)
+    )
+    books: list[dict[str, int | str | None]] = []
+    gaps: list[int] = []
+    for row in db.session.execute(query):
+        books.append(
+            {
+                "record_id": row.record_id,
+                "name": row.name,
+                "series_number": str(row.series_number)
+                if row.series_number is not None
+                else None,
+            }
+        )
+        if row.whole_number is not None:
+            gaps.extend(range((row.previous_whole_number or 0) + 1, row.whole_number))
+    return make_response({"series": series.name, "books": books, "gaps": gaps})
@@ -0,0 +1,293 @@
+"""Precomputed index of similar books, kept up to date from the change feed."""
+
+from __future__ import annotations
+
+import heapq
+import math
+from collections import defaultdict
+from typing import TYPE_CHECKING
+
+from audiobooks.database import Model
+from audiobooks.extensions import db
+
+from .changes import Change, last_change, read_checkpoint, save_checkpoint
+from .models import Book
+
+
+if TYPE_CHECKING:
+    from collections.abc import Collection, Iterable
+
+    from sqlalchemy.orm import Session
+
+
+CONSUMER: str = "similar_books"
+FEATURE_WEIGHTS: dict[str, float] = {
+    "series": 4.0,
+    "author": 3.0,
+    "genre": 1.0,
+    "era": 0.5,
+}
+_BATCH_SIZE: int = 500
+
+FeatureVector = dict[str, float]
+
+
+class SimilarBook(Model):
+    """Model for the ``similar_book`` table in the database.
+
+    Each book has up to ``SIMILAR_BOOKS_COUNT`` rows, one per neighbor, ranked from
+    the most similar. The index on ``similar_id`` finds the books listing a changed
+    book as a neighbor.
+    """
+
+    __table_args__ = (
+        db.UniqueConstraint("book_id", "rank"),
+        db.Index("ix_similar_book_similar_id", "similar_id"),
+    )
+
+    book_id = db.Column(db.Integer, db.ForeignKey("book.record_id"), nullable=False)
+    rank = db.Column(db.Integer, nullable=False)
+    similar_id = db.Column(db.Integer, db.ForeignKey("book.record_id"), nullable=False)
+    score = db.Column(db.Float, nullable=False)
+
+
+def read_feature_vectors() -> dict[int, FeatureVector]:
+    """Read the feature vectors of all the books.
+
+    The features are the author, series, genre and release decade of a book, with
+    the weights of ``FEATURE_WEIGHTS``. The vectors are normalized, so their dot
+    product is the cosine similarity of two books.
+
+    Returns:
+        dict[int, FeatureVector]: The vector of each book id.
+    """
+    query = db.select(
+        Book.record_id, Book.author_id, Book.series_id, Book.genre_id, Book.release_date
+    )
+    vectors: dict[int, FeatureVector] = {}
+    for record_id, author_id, series_id, genre_id, release_date in db.session.execute(
+        query
+    ):
+        features = {
+            "author": author_id,
+            "series": series_id,
+            "genre": genre_id,
+            "era": release_date.year // 10 * 10 if release_date else None,
+        }
+        vector = {
+            f"{feature}:{value}": FEATURE_WEIGHTS[feature]
+            for feature, value in features.items()
+            if value is not None
+        }
+        norm = math.sqrt(sum(weight**2 for weight in vector.values()))
+        vectors[record_id] = {key: weight / norm for key, weight in vector.items()}
+    return vectors
+
+
+def invert(vectors: dict[int, FeatureVector]) -> dict[str, list[tuple[int, float]]]:
+    """Build the inverted index of the feature vectors.
+
+    Args:
+        vectors (dict[int, FeatureVector]): The vector of each book id.
+
+    Returns:
+        dict[str, list[tuple[int, float]]]: The book ids and weights of each feature.
+    """
+    postings: dict[str, list[tuple[int, float]]] = defaultdict(list)
+    for record_id, vector in vectors.items():
+        for feature, weight in vector.items():
+            postings[feature].append((record_id, weight))
+    return postings
+
+
+def similarity_scores(
+    vector: FeatureVector, postings: dict[str, list[tuple[int, float]]], record_id: int
+) -> dict[int, float]:
+    """Score the books sharing a feature with a feature vector.
+
+    The products of the weights are accumulated along the posting lists of the
+    features of the vector.
+
+    Args:
+        vector (FeatureVector): The feature vector.
+        postings (dict[str, list[tuple[int, float]]]): The inverted index.
+        record_id (int): The id of the book of the vector, excluded from the scores.
+
+    Returns:
+        dict[int, float]: The similarity of each book sharing a feature.
+    """
+    scores: dict[int, float] = defaultdict(float)
+    for feature, weight in vector.items():
+        for other_id, other_weight in postings[feature]:
+            scores[other_id] += weight * other_weight
+    scores.pop(record_id, None)
+    return scores
+
+
+def nearest_books(
+    vector: FeatureVector,
+    postings: dict[str, list[tuple[int, float]]],
+    record_id: int,
+    count: int,
+) -> list[tuple[int, float]]:
+    """Find the books most similar to a feature vector.
+
+    Only the books sharing a feature with the vector are scored.
+
+    Args:
+        vector (FeatureVector): The feature vector.
+        postings (dict[str, list[tuple[int, float]]]): The inverted index.
+        record_id (int): The id of the book of the vector, excluded from the results.
+        count (int): The maximum number of books.
+
+    Returns:
+        list[tuple[int, float]]: The book ids and their similarity, the most similar
+            first, then by id.
+    """
+    scores = similarity_scores(vector, postings, record_id)
+    return heapq.nsmallest(
+        count, scores.items(), key=lambda neighbor: (-neighbor[1], neighbor[0])
+    )
+
+
+def affected_books(
+    changed: Collection[int],
+    vectors: dict[int, FeatureVector],
+    postings: dict[str, list[tuple[int, float]]],
+    count: int,
+) -> set[int]:
+    """Find the books whose neighbors can change after some books changed.
+
+    These are the changed books, the books listing a changed book as a neighbor,
+    and the other books a changed book now enters the neighbors of: the books with
+    fewer than ``count`` neighbors, and those whose last stored neighbor is less
+    similar than the changed book.
+
+    Args:
+        changed (Collection[int]): The ids of the changed books.
+        vectors (dict[int, FeatureVector]): The vector of each book id.
+        postings (dict[str, list[tuple[int, float]]]): The inverted index.
+        count (int): The number of neighbors of each book.
+
+    Returns:
+        set[int]: The ids of the books.
+    """
+    affected = set(changed)
+    for batch in _batches(list(changed)):
+        query = db.select(SimilarBook.book_id).where(SimilarBook.similar_id.in_(batch))
+        affected.update(db.session.scalars(query))
+    candidates: dict[int, list[tuple[float, int]]] = defaultdict(list)
+    for record_id in changed:
+        if record_id not in vectors:
+            continue
+        scores = similarity_scores(vectors[record_id], postings, record_id)
+        for other_id, score in scores.items():
+            if other_id not in affected:
+                candidates[other_id].append((-score, record_id))
+    last_neighbors: dict[int, tuple[float, int]] = {}
+    for batch in _batches(list(candidates)):
+        query = db.select(
+            SimilarBook.book_id, SimilarBook.score, SimilarBook.similar_id
+        ).where(SimilarBook.book_id.in_(batch), SimilarBook.rank == count)
+        for book_id, score, similar_id in db.session.execute(query):
+            last_neighbors[book_id] = (-score, similar_id)
+    for other_id, neighbors in candidates.items():
+        last = last_neighbors.get(other_id)
+        if last is None or min(neighbors) < last:
+            affected.add(other_id)
+    return affected
+
+
+def changed_books(since: int, until: int) -> set[int]:
+    """Read the ids of the books changed between two sequence numbers.
+
+    Args:
+        since (int): The sequence number of the last change already processed.
+        until (int): The sequence number of the last change to process.
+
+    Returns:
+        set[int]: The ids of the created, updated and deleted books.
+    """
+    query = (
+        db.select(Change.item_record)
+        .distinct()
+        .where(
+            Change.item == "book", Change.record_id > since, Change.record_id <= until
+        )
+    )
+    return set(db.session.scalars(query))
+
+
+def update_similar_books(count: int, *, rebuild: bool = False) -> dict[str, int]:
+    """Update the similar books index with the changes since its last update.
+
+    Only the neighbors of the books affected by the changed books are computed
+    again, unless the index is rebuilt or was never built. Nothing is read when the
+    change feed has no new change.
+
+    Args:
+        count (int): The number of neighbors of each book.
+        rebuild (bool, optional): Compute the neighbors of all the books. Defaults
+            to False.
+
+    Returns:
+        dict[str, int]: The number of changed books and of books updated.
+    """
+    since, until = read_checkpoint(CONSUMER), last_change()
+    if since and since == until and not rebuild:
+        return {"changed": 0, "updated": 0}
+    vectors = read_feature_vectors()
+    postings = invert(vectors)
+    if rebuild or not since:
+        changed = set(vectors)
+        affected = set(vectors)
+        db.session.execute(db.delete(SimilarBook))
+    else:
+        changed = changed_books(since, until)
+        affected = affected_books(changed, vectors, postings, count)
+        for batch in _batches(list(affected)):
+            db.session.execute(
+                db.delete(SimilarBook).where(SimilarBook.book_id.in_(batch))
+            )
+    rows = [
+        {"book_id": record_id, "rank": rank, "similar_id": other_id, "score": score}
+        for record_id in sorted(affected & vectors.keys())
+        for rank, (other_id, score) in enumerate(
+            nearest_books(vectors[record_id], postings, record_id, count), start=1
+        )
+    ]
+    if rows:
+        db.session.execute(db.insert(SimilarBook), rows)
+    save_checkpoint(CONSUMER, until)
+    return {"changed": len(changed), "updated": len(affected)}
+
+
+def read_similar_books(
+    book: Book, session: Session | None = None
+) -> list[dict[str, int | float | str]]:
+    """Read the precomputed neighbors of a book.
+
+    Args:
+        book (Book): The book.
+        session (Session, optional): The session to query. Defaults to the
+            application's ``db.session``.
+
+    Returns:
+        list[dict[str, int | float | str]]: The id, name and similarity of each
+            neighbor, the most similar first.
+    """
+    query = (
+        db.select(SimilarBook.similar_id, Book.name, SimilarBook.score)
+        .join(Book, Book.record_id == SimilarBook.similar_id)
+        .where(SimilarBook.book_id == book.record_id)
+        .order_by(SimilarBook.rank)
+    )
+    return [
+        {"record_id": similar_id, "name": name, "score": round(score, 4)}
+        for similar_id, name, score in (session or db.session).execute(query)
+    ]
+
+
+def _batches(values: list[int]) -> Iterable[list[int]]:
+    for start in range(0, len(values), _BATCH_SIZE):
+        yield values[start : start + _BATCH_SIZE]
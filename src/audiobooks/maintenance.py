@@ -0,0 +1,459 @@
+"""Online maintenance of the SQLite database."""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import click
+import sqlalchemy
+from flask import Flask, current_app
+from flask.cli import AppGroup
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from flask_sqlalchemy import SQLAlchemy
+
+
+log: logging.Logger = logging.getLogger(__name__)
+EXTENSION_NAME = "maintenance"
+INCREMENTAL_AUTO_VACUUM: int = 2
+
+
+def configure_sqlite(engine: sqlalchemy.Engine, journal_mode: str | None) -> None:
+    """Set the journal mode of every new connection of a SQLite engine.
+
+    A new database, still without any page, is also switched to incremental
+    auto-vacuum before its first page is written. Other databases are left
+    unchanged: setting the auto-vacuum mode of a database needs its write lock, so
+    doing it on every connection would block them during a write transaction.
+
+    Args:
+        engine (Engine): The database engine.
+        journal_mode (str | None): The journal mode, such as WAL, or None to keep the
+            mode of the database.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    @sqlalchemy.event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection: sqlite3.Connection, _: object) -> None:
+        cursor = dbapi_connection.cursor()
+        if not cursor.execute("PRAGMA page_count").fetchone()[0]:
+            cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        if journal_mode:
+            cursor.execute(f"PRAGMA journal_mode = {journal_mode}")
+        cursor.close()
+
+
+def optimize(engine: sqlalchemy.Engine) -> None:
+    """Run ``PRAGMA optimize``, which analyzes the tables whose statistics are stale.
+
+    Args:
+        engine (Engine): The database engine.
+    """
+    with engine.connect() as connection:
+        connection.exec_driver_sql("PRAGMA optimize")
+
+
+def analyze(engine: sqlalchemy.Engine) -> None:
+    """Run ``ANALYZE`` to rebuild the statistics of all the tables.
+
+    Args:
+        engine (Engine): The database engine.
+    """
+    with engine.connect() as connection:
+        connection.exec_driver_sql("ANALYZE")
+        connection.commit()
+
+
+def incremental_vacuum(
+    engine: sqlalchemy.Engine,
+    pages_per_step: int,
+    sleep: float = 0.0,
+    progress: Callable[[int, int], None] | None = None,
+) -> int:
+    """Return the free pages of the database to the file system, a few at a time.
+
+    Each step is a short write transaction, so readers and writers are only blocked
+    briefly. The database must use incremental auto-vacuum, see
+    ``enable_incremental_vacuum``.
+
+    Args:
+        engine (Engine): The database engine.
+        pages_per_step (int): The number of pages freed by each step.
+        sleep (float, optional): Pause between steps, in seconds. Defaults to 0.
+        progress (Callable[[int, int], None], optional): Called after each step with
+            the number of pages freed so far and the total. Defaults to None.
+
+    Returns:
+        int: The number of pages freed.
+    """
+    with engine.connect() as connection:
+        auto_vacuum = connection.exec_driver_sql("PRAGMA auto_vacuum").scalar()
+        if auto_vacuum != INCREMENTAL_AUTO_VACUUM:
+            log.warning("Incremental vacuum is not enabled for the database.")
+            return 0
+        total = connection.exec_driver_sql("PRAGMA freelist_count").scalar() or 0
+        freed = 0
+        while freed < total:
+            # The pragma frees one page each time it is stepped, but sqlite3 steps a
+            # statement without result columns only once, unless it runs in a script.
+            connection.commit()
+            connection.connection.driver_connection.executescript(  # type: ignore[union-attr]
+                f"PRAGMA incremental_vacuum({pages_per_step})"
+            )
+            remaining = connection.exec_driver_sql("PRAGMA freelist_count").scalar()
+            freed = total - (remaining or 0)
+            if progress is not None:
+                progress(freed, total)
+            if remaining and sleep:
+                time.sleep(sleep)
+            if not remaining:
+                break
+    return freed
+
+
+def enable_incremental_vacuum(engine: sqlalchemy.Engine) -> None:
+    """Switch the database to incremental auto-vacuum.
+
+    This rebuilds the whole database with ``VACUUM``, blocking it until it is done,
+    so it is only meant to be run once, offline.
+
+    Args:
+        engine (Engine): The database engine.
+    """
+    with engine.connect() as connection:
+        connection.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+        connection.commit()
+        connection.execution_options(isolation_level="AUTOCOMMIT").exec_driver_sql(
+            "VACUUM"
+        )
+
+
+def integrity_check(engine: sqlalchemy.Engine, *, quick: bool = False) -> list[str]:
+    """Check the integrity of the database.
+
+    Args:
+        engine (Engine): The database engine.
+        quick (bool, optional): Run the faster ``quick_check`` instead. Defaults to
+            False.
+
+    Returns:
+        list[str]: The problems found, or ``["ok"]``.
+    """
+    pragma = "quick_check" if quick else "integrity_check"
+    with engine.connect() as connection:
+        return list(connection.exec_driver_sql(f"PRAGMA {pragma}").scalars())
+
+
+def upgrade_schema(
+    connection: sqlalchemy.Connection, metadata: sqlalchemy.MetaData
+) -> list[str]:
+    """Add the columns and indexes missing from the tables of an existing database.
+
+    ``create_all`` only creates the missing tables, so the columns added to a model
+    after its table was created are added with ``ALTER TABLE ... ADD COLUMN``, and
+    the missing indexes are created. SQLite can only add columns which are nullable
+    or have a default value.
+
+    Args:
+        connection (Connection): A connection to the database, in a transaction.
+        metadata (MetaData): The metadata of the tables.
+
+    Returns:
+        list[str]: The statements run.
+    """
+    dialect = connection.dialect
+    statements: list[str] = []
+    for table in metadata.sorted_tables:
+        name = dialect.identifier_preparer.quote(table.name)
+        columns = {
+            row.name for row in connection.exec_driver_sql(f"PRAGMA table_info({name})")
+        }
+        if not columns:
+            continue
+        indexes = {
+            row.name for row in connection.exec_driver_sql(f"PRAGMA index_list({name})")
+        }
+        statements.extend(
+            f"ALTER TABLE {name} ADD COLUMN "
+            f"{sqlalchemy.schema.CreateColumn(column).compile(dialect=dialect)}"
+            for column in table.columns
+            if column.name not in columns
+        )
+        statements.extend(
+            str(sqlalchemy.schema.CreateIndex(index).compile(dialect=dialect))
+            for index in table.indexes
+            if index.name not in indexes
+        )
+    for statement in statements:
+        log.info(f"Upgrading the database schema: {statement}")
+        connection.exec_driver_sql(statement)
+    return statements
+
+
+def backup(
+    engine: sqlalchemy.Engine,
+    target: Path | str,
+    pages_per_step: int,
+    sleep: float = 0.0,
+    progress: Callable[[int, int], None] | None = None,
+) -> Path:
+    """Make a consistent copy of the database while it is in use.
+
+    The online backup API copies the database a few pages at a time, releasing its
+    lock between steps, and restarts if the database is changed by another
+    connection, so the copy is always consistent. Steps must be large enough to
+    finish between the writes of the other connections.
+
+    Args:
+        engine (Engine): The database engine.
+        target (Path | str): Path of the backup file.
+        pages_per_step (int): The number of pages copied by each step.
+        sleep (float, optional): Pause between steps, in seconds. Defaults to 0.
+        progress (Callable[[int, int], None], optional): Called after each step with
+            the number of pages copied so far and the total. Defaults to None.
+
+    Returns:
+        Path: The path of the backup file.
+    """
+    target = Path(target)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    temporary = target.with_name(f"{target.name}.tmp")
+
+    def report(status: int, remaining: int, total: int) -> None:
+        if progress is not None:
+            progress(total - remaining, total)
+        if sleep:
+            time.sleep(sleep)
+
+    with engine.connect() as connection:
+        source: sqlite3.Connection = connection.connection.driver_connection
+        destination = sqlite3.connect(temporary)
+        try:
+            source.backup(destination, pages=pages_per_step, progress=report)
+        except BaseException:
+            destination.close()
+            temporary.unlink(missing_ok=True)
+            raise
+        destination.close()
+    temporary.replace(target)
+    log.info(f"Backed up the database to {target}")
+    return target
+
+
+def backup_path(directory: Path | str) -> Path:
+    """Get a timestamped path for a new backup file.
+
+    Args:
+        directory (Path | str): The directory of the backups.
+
+    Returns:
+        Path: The path of the backup file.
+    """
+    timestamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%S%fZ")
+    return Path(directory) / f"audiobooks-{timestamp}.sqlite"
+
+
+def prune_backups(directory: Path | str, keep: int) -> list[Path]:
+    """Delete the oldest backup files, keeping only the most recent ones.
+
+    Args:
+        directory (Path | str): The directory of the backups.
+        keep (int): The number of backups to keep.
+
+    Returns:
+        list[Path]: The deleted backup files.
+    """
+    backups = sorted(Path(directory).glob("audiobooks-*.sqlite"), reverse=True)
+    for path in backups[keep:]:
+        path.unlink(missing_ok=True)
+    return backups[keep:]
+
+
+def database_status(engine: sqlalchemy.Engine) -> dict[str, int | str]:
+    """Get the storage status of the database.
+
+    Args:
+        engine (Engine): The database engine.
+
+    Returns:
+        dict[str, int | str]: The page size and counts, auto-vacuum and journal modes.
+    """
+    pragmas = ("page_size", "page_count", "freelist_count", "auto_vacuum")
+    with engine.connect() as connection:
+        return {
+            pragma: connection.exec_driver_sql(f"PRAGMA {pragma}").scalar()
+            for pragma in (*pragmas, "journal_mode")
+        }
+
+
+class DatabaseMaintenance:
+    """Flask extension for the online maintenance of the SQLite database.
+
+    Every SQLite connection is set to ``SQLITE_JOURNAL_MODE``, WAL by default, so
+    readers are never blocked by the short write transactions of the maintenance
+    tasks, and new databases are created with incremental auto-vacuum. The tasks are
+    available as ``flask maintenance`` commands and as background jobs, which can be
+    scheduled with ``JOB_SCHEDULE``.
+    """
+
+    def __init__(self, database: SQLAlchemy) -> None:
+        """Initialize an instance of DatabaseMaintenance.
+
+        Args:
+            database (SQLAlchemy): The Flask-SQLAlchemy extension.
+        """
+        self.db: SQLAlchemy = database
+
+    def init_app(self, app: Flask) -> None:
+        """Initialize the database maintenance for a Flask application.
+
+        Must be initialized before the database tables are created, so that new
+        databases use incremental auto-vacuum.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        with app.app_context():
+            configure_sqlite(self.db.engine, app.config["SQLITE_JOURNAL_MODE"])
+        app.extensions[EXTENSION_NAME] = self
+        app.cli.add_command(maintenance_cli)
+
+    def engine(self) -> sqlalchemy.Engine:
+        """Get the engine of the library selected for ``db.session``.
+
+        Returns:
+            Engine: The engine of the library, or the default engine.
+        """
+        return self.db.session.get_bind()
+
+    @staticmethod
+    def backup_dir(library: str | None = None) -> Path:
+        """Get the directory of the backups of the current application.
+
+        Args:
+            library (str | None, optional): The name of a named library, whose
+                backups are in a subdirectory. Defaults to None.
+
+        Returns:
+            Path: ``BACKUP_DIR``, or the ``backups`` directory of the instance folder.
+        """
+        directory = current_app.config["BACKUP_DIR"]
+        directory = Path(directory or Path(current_app.instance_path) / "backups")
+        return directory / library if library else directory
+
+    def backup(
+        self,
+        progress: Callable[[int, int], None] | None = None,
+        library: str | None = None,
+    ) -> tuple[Path, list[Path]]:
+        """Back up the database of the selected library to the backup directory.
+
+        Only the ``BACKUP_KEEP`` most recent backups are kept.
+
+        Args:
+            progress (Callable[[int, int], None], optional): Called after each step
+                with the number of pages copied so far and the total. Defaults to None.
+            library (str | None, optional): The name of the named library selected
+                for ``db.session``. Defaults to None, for the default library.
+
+        Returns:
+            tuple[Path, list[Path]]: The new backup file and the deleted backup files.
+        """
+        config = current_app.config
+        directory = self.backup_dir(library)
+        path = backup(
+            self.engine(),
+            backup_path(directory),
+            config["BACKUP_PAGES_PER_STEP"],
+            config["BACKUP_STEP_SLEEP"],
+            progress,
+        )
+        return path, prune_backups(directory, config["BACKUP_KEEP"])
+
+    def vacuum(self, progress: Callable[[int, int], None] | None = None) -> int:
+        """Run an incremental vacuum of the database of the selected library.
+
+        Args:
+            progress (Callable[[int, int], None], optional): Called after each step
+                with the number of pages freed so far and the total. Defaults to None.
+
+        Returns:
+            int: The number of pages freed.
+        """
+        config = current_app.config
+        return incremental_vacuum(
+            self.engine(),
+            config["VACUUM_PAGES_PER_STEP"],
+            config["VACUUM_STEP_SLEEP"],
+            progress,
+        )
+
+
+maintenance_cli = AppGroup("maintenance", help="Maintenance of the library database.")
+
+
+def _maintenance() -> DatabaseMaintenance:
+    return current_app.extensions[EXTENSION_NAME]
+
+
+@maintenance_cli.command("optimize")
+@click.option("--full", is_flag=True, help="Rebuild all the statistics with ANALYZE.")
+def optimize_command(*, full: bool) -> None:
+    """Update the statistics of the query planner."""
+    engine = _maintenance().db.engine
+    if full:
+        analyze(engine)
+    else:
+        optimize(engine)
+    click.echo("Statistics updated.")
+
+
+@maintenance_cli.command("vacuum")
+@click.option("--enable", is_flag=True, help="Switch to incremental auto-vacuum first.")
+def vacuum_command(*, enable: bool) -> None:
+    """Return the free pages of the database to the file system."""
+    maintenance = _maintenance()
+    if enable:
+        enable_incremental_vacuum(maintenance.db.engine)
+    click.echo(f"Freed {maintenance.vacuum()} pages.")
+
+
+@maintenance_cli.command("check")
+@click.option("--quick", is_flag=True, help="Run the faster quick_check.")
+def check_command(*, quick: bool) -> None:
+    """Check the integrity of the database."""
+    engine = _maintenance().db.engine
+    problems = integrity_check(engine, quick=quick)
+    for problem in problems:
+        click.echo(problem)
+    if problems != ["ok"]:
+        raise click.exceptions.Exit(1)
+
+
+@maintenance_cli.command("backup")
+@click.argument(
+    "target", type=click.Path(dir_okay=False, path_type=Path), required=False
+)
+def backup_command(target: Path | None) -> None:
+    """Make a hot backup of the database to TARGET, or to the backup directory."""
+    maintenance = _maintenance()
+    if target is None:
+        path, _ = maintenance.backup()
+    else:
+        config = current_app.config
+        path = backup(
+            maintenance.db.engine,
+            target,
+            config["BACKUP_PAGES_PER_STEP"],
+            config["BACKUP_STEP_SLEEP"],
+        )
+    click.echo(f"Backed up to {path}")
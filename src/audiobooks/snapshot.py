@@ -0,0 +1,244 @@
+"""In-memory read snapshot of the database for read-heavy deployments."""
+
+from __future__ import annotations
+
+import atexit
+import itertools
+import logging
+import sqlite3
+import threading
+import time
+from typing import TYPE_CHECKING
+
+import sqlalchemy
+import sqlalchemy.orm
+from flask import current_app, g, has_app_context
+
+from audiobooks.libraries import current_library
+
+
+if TYPE_CHECKING:
+    from flask import Flask
+    from flask_sqlalchemy import SQLAlchemy
+
+
+log: logging.Logger = logging.getLogger(__name__)
+EXTENSION_NAME = "read_snapshot"
+_snapshot_ids = itertools.count()
+
+
+class Snapshot:
+    """In-memory copy of an SQLite database, refreshed with the backup API.
+
+    The primary database is copied into a shared-cache in-memory database. A refresh
+    only copies the database again if it changed since the last copy, which is
+    detected with ``PRAGMA data_version`` on a dedicated connection to the primary.
+    The previous copy is kept until the next refresh so that sessions opened on it
+    can finish their reads. The database is copied at most once every
+    ``min_interval`` seconds, so a burst of writes doesn't copy it after each one.
+    """
+
+    def __init__(
+        self, database: str, max_age: float, min_interval: float = 0.0
+    ) -> None:
+        """Initialize an instance of Snapshot.
+
+        Args:
+            database (str): Path of the primary SQLite database.
+            max_age (float): Maximum age of the snapshot when it is read, in seconds.
+            min_interval (float, optional): Minimum time between two copies of the
+                database, in seconds. Defaults to 0.0.
+        """
+        self.max_age: float = max_age
+        self.min_interval: float = min_interval
+        self.engine: sqlalchemy.Engine | None = None
+        self.loaded_at: float = 0.0
+        self.copied_at: float = 0.0
+        self.dirty: bool = True
+        self._source = sqlite3.connect(database, check_same_thread=False)
+        self._anchor: sqlite3.Connection | None = None
+        self._retired: tuple[sqlalchemy.Engine, sqlite3.Connection] | None = None
+        self._data_version: int | None = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def is_stale(self) -> bool:
+        """Whether the snapshot must be refreshed before being read."""
+        return self.dirty or time.monotonic() - self.loaded_at > self.max_age
+
+    def refresh(self, *, force: bool = False) -> bool:
+        """Refresh the snapshot if the primary database changed.
+
+        The database is not copied if it was copied less than ``min_interval``
+        seconds ago, and the snapshot stays stale.
+
+        Args:
+            force (bool, optional): Copy the database even if it didn't change, or
+                was just copied. Defaults to False.
+
+        Returns:
+            bool: True if the database was copied.
+        """
+        with self._lock:
+            self.dirty = False
+            data_version = self._source.execute("PRAGMA data_version").fetchone()[0]
+            if not force and self.engine and data_version == self._data_version:
+                self.loaded_at = time.monotonic()
+                return False
+            if (
+                not force
+                and self.engine
+                and time.monotonic() - self.copied_at < self.min_interval
+            ):
+                self.dirty = True
+                return False
+            uri = f"file:snapshot-{next(_snapshot_ids)}?mode=memory&cache=shared"
+            anchor = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            self._source.backup(anchor)
+            retired, self._retired = self._retired, None
+            if self.engine is not None and self._anchor is not None:
+                self._retired = (self.engine, self._anchor)
+            self.engine = sqlalchemy.create_engine(
+                "sqlite://",
+                creator=lambda: sqlite3.connect(uri, uri=True, check_same_thread=False),
+                poolclass=sqlalchemy.pool.QueuePool,
+            )
+            self._anchor, self._data_version = anchor, data_version
+            self.loaded_at = self.copied_at = time.monotonic()
+        if retired is not None:
+            retired[0].dispose()
+            retired[1].close()
+        log.debug(f"Refreshed the read snapshot (data version {data_version})")
+        return True
+
+    def start(self, interval: float) -> None:
+        """Start refreshing the snapshot in a background thread.
+
+        Args:
+            interval (float): Time between refreshes, in seconds.
+        """
+        self._thread = threading.Thread(
+            target=self._refresh_loop,
+            args=(interval,),
+            name="read-snapshot",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background refreshes and close the connections of the snapshot."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            if self._retired is not None:
+                self._retired[0].dispose()
+                self._retired[1].close()
+            if self.engine is not None:
+                self.engine.dispose()
+            if self._anchor is not None:
+                self._anchor.close()
+            self.engine = self._anchor = self._retired = None
+            self._source.close()
+
+    def _refresh_loop(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.refresh()
+            except sqlite3.Error as exception:
+                log.warning(f"Can't refresh the read snapshot: {exception}")
+
+
+class ReadSnapshot:
+    """Flask extension serving reads from an in-memory snapshot of the database.
+
+    When ``READ_SNAPSHOT`` is enabled, the SQLite database is copied into memory at
+    startup and refreshed every ``READ_SNAPSHOT_REFRESH_INTERVAL`` seconds. A read
+    refreshes the snapshot first if it is older than ``READ_SNAPSHOT_MAX_AGE``
+    seconds, or if the application committed a write since the last refresh. The
+    database is copied at most once every ``READ_SNAPSHOT_MIN_REFRESH_INTERVAL``
+    seconds, and the reads that find the snapshot stale in between go to the primary
+    database. Writes always go to the primary database through ``db.session``.
+    """
+
+    def __init__(self, database: SQLAlchemy) -> None:
+        """Initialize an instance of ReadSnapshot.
+
+        Args:
+            database (SQLAlchemy): The Flask-SQLAlchemy extension of the primary.
+        """
+        self.db: SQLAlchemy = database
+
+    def init_app(self, app: Flask) -> None:
+        """Initialize the read snapshot for a Flask application.
+
+        The snapshot is closed when the process exits.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        if not app.config["READ_SNAPSHOT"]:
+            return
+        with app.app_context():
+            database = self.db.engine.url.database
+        if not database or database == ":memory:":
+            log.warning("The read snapshot needs a database file, it is disabled.")
+            return
+        snapshot = Snapshot(
+            database,
+            app.config["READ_SNAPSHOT_MAX_AGE"],
+            app.config["READ_SNAPSHOT_MIN_REFRESH_INTERVAL"],
+        )
+        snapshot.refresh()
+        if interval := app.config["READ_SNAPSHOT_REFRESH_INTERVAL"]:
+            snapshot.start(interval)
+        app.extensions[EXTENSION_NAME] = snapshot
+        atexit.register(self.shutdown, app)
+        app.teardown_appcontext(_close_session)
+        if not sqlalchemy.event.contains(self.db.session, "after_commit", _mark_dirty):
+            sqlalchemy.event.listen(self.db.session, "after_commit", _mark_dirty)
+
+    def shutdown(self, app: Flask) -> None:
+        """Stop the snapshot of an application and close its connections.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        snapshot: Snapshot | None = app.extensions.pop(EXTENSION_NAME, None)
+        if snapshot is not None:
+            snapshot.stop()
+
+    @property
+    def session(self) -> sqlalchemy.orm.Session:
+        """The session to use for reads in the current application context.
+
+        Returns:
+            Session: A session on the snapshot, or ``db.session`` if it is disabled,
+                if a named library is selected, or if the snapshot is stale and was
+                copied too recently to be copied again.
+        """
+        snapshot: Snapshot | None = current_app.extensions.get(EXTENSION_NAME)
+        if snapshot is None or current_library() is not None:
+            return self.db.session
+        if "snapshot_session" not in g:
+            if snapshot.is_stale:
+                snapshot.refresh()
+            if snapshot.is_stale:
+                return self.db.session
+            g.snapshot_session = sqlalchemy.orm.Session(
+                bind=snapshot.engine, autoflush=False
+            )
+        return g.snapshot_session
+
+
+def _close_session(exception: BaseException | None = None) -> None:
+    session: sqlalchemy.orm.Session | None = g.pop("snapshot_session", None)
+    if session is not None:
+        session.close()
+
+
+def _mark_dirty(session: sqlalchemy.orm.Session) -> None:
+    if has_app_context() and (snapshot := current_app.extensions.get(EXTENSION_NAME)):
+        snapshot.dirty = True
@@ -1,6 +1,8 @@
 """Defines fixtures for all tests."""
 
 import os
+import tempfile
+from pathlib import Path
 
 import flask
 import flask_sqlalchemy
@@ -21,6 +23,8 @@ class TestConfig(Config):
     SECRET_KEY: str = "no-secrets-in-tests"
     TESTING: bool = True
     SQLALCHEMY_DATABASE_URI: str = "sqlite:///:memory:"
+    MEDIA_ROOT: str = tempfile.mkdtemp(prefix="audiobooks-media-")
+    COVER_CACHE_DIR: str = tempfile.mkdtemp(prefix="audiobooks-covers-")
 
 
 @pytest.fixture(scope="session")
@@ -35,6 +39,12 @@ def app() -> flask.Flask:  # type: ignore[reportGeneralTypeIssue]
     test_context.pop()
 
 
+@pytest.fixture()
+def media_path() -> Path:
+    """Create an empty directory inside the media root of the tests."""
+    return Path(tempfile.mkdtemp(dir=TestConfig.MEDIA_ROOT))
+
+
 @pytest.fixture()
 def test_db(app: flask.Flask) -> flask_sqlalchemy.SQLAlchemy:  # type: ignore[reportGeneralTypeIssue]
     """Create a database for the tests."""
@@ -0,0 +1,102 @@
+"""Tests for audiobooks.admission."""
+
+from __future__ import annotations
+
+import threading
+
+import flask
+import pytest
+from flask.testing import FlaskClient
+
+from audiobooks.admission import writes
+from audiobooks.app import create_app
+
+from .conftest import TestConfig
+
+
+class AdmissionConfig(TestConfig):
+    """Configuration class for testing the admission control."""
+
+    ADMISSION_CONTROL: bool = True
+    ADMISSION_READ_LIMIT: int = 2
+    ADMISSION_WRITE_LIMIT: int = 1
+    ADMISSION_ROUTE_LIMITS: dict[str, int] = {"expensive": 1}  # noqa: RUF012
+    ADMISSION_QUEUE_TIMEOUT: float = 0.05
+
+
+started = threading.Event()
+release = threading.Event()
+
+
+def wait_if_asked() -> str:
+    """View waiting for the release event with the ``block`` argument."""
+    if flask.request.args.get("block"):
+        started.set()
+        release.wait(5)
+    return "done"
+
+
+@writes
+def write_if_asked() -> str:
+    """Write view waiting for the release event with the ``block`` argument."""
+    return wait_if_asked()
+
+
+@pytest.fixture()
+def admission_app() -> flask.Flask:
+    """Create an application with admission control and blocking routes."""
+    app = create_app("tests.test_admission.AdmissionConfig")
+    app.add_url_rule("/test/read", "read", wait_if_asked)
+    app.add_url_rule("/test/expensive", "expensive", wait_if_asked)
+    app.add_url_rule("/test/write", "write", write_if_asked)
+    blueprint = flask.Blueprint("other", __name__)
+    blueprint.add_url_rule("/test/other/expensive", "expensive", wait_if_asked)
+    app.register_blueprint(blueprint)
+    started.clear()
+    release.clear()
+    return app
+
+
+def start_blocking(app: flask.Flask, path: str) -> threading.Thread:
+    """Send a request that blocks until released, and wait for it to start."""
+    started.clear()
+    thread = threading.Thread(target=app.test_client().get, args=(f"{path}?block=1",))
+    thread.start()
+    assert started.wait(5)
+    return thread
+
+
+def test_admission(admission_app: flask.Flask) -> None:
+    """Test the route limits, the read and write pools, and the metrics."""
+    client = admission_app.test_client()
+    threads = [start_blocking(admission_app, "/test/expensive")]
+    response = client.get("/test/expensive")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert client.get("/test/other/expensive").status_code == 200
+    threads.append(start_blocking(admission_app, "/test/write"))
+    assert client.get("/test/write").status_code == 503
+    assert client.get("/test/read").status_code == 200
+    metrics = client.get("/admin/admission").json
+    assert metrics["shed"] == 2
+    assert metrics["routes"]["expensive"]["in_flight"] == 1
+    assert metrics["pools"]["read"]["in_flight"] == 1
+    assert metrics["pools"]["write"] | {"max_waiting": 0} == {
+        "limit": 1,
+        "in_flight": 1,
+        "waiting": 0,
+        "max_waiting": 0,
+        "admitted": 1,
+        "shed": 1,
+    }
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert client.get("/test/write").status_code == 200
+    metrics = client.get("/admin/admission").json
+    assert [pool["in_flight"] for pool in metrics["pools"].values()] == [0, 0]
+
+
+def test_admission__disabled(client: FlaskClient) -> None:
+    """Test the metrics route without admission control."""
+    assert client.get("/admin/admission").json == {"enabled": False}
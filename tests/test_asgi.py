@@ -0,0 +1,114 @@
+"""Tests for audiobooks.asgi and audiobooks.benchmark."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import tempfile
+from pathlib import Path
+
+import flask
+import pytest
+
+from audiobooks.app import create_app
+from audiobooks.asgi import AsyncLibraryApp, create_asgi_app
+from audiobooks.benchmark import asgi_request, run_benchmark
+
+from .conftest import TestConfig
+
+
+pytest.importorskip("aiosqlite")
+pytest.importorskip("greenlet")
+
+ASGI_DIR = Path(tempfile.mkdtemp(prefix="audiobooks-asgi-"))
+
+
+class AsgiConfig(TestConfig):
+    """Configuration class for testing the ASGI application on database files."""
+
+    SQLALCHEMY_DATABASE_URI: str = f"sqlite:///{ASGI_DIR / 'default.sqlite'}"
+    LIBRARIES: dict[str, str] = {"family": str(ASGI_DIR / "family.sqlite")}  # noqa: RUF012
+
+
+@pytest.fixture(scope="module")
+def asgi_flask_app() -> flask.Flask:
+    """Create the Flask application sharing the databases of the ASGI application."""
+    return create_app("tests.test_asgi.AsgiConfig")
+
+
+def call(app: AsyncLibraryApp, path: str, query_string: bytes = b"") -> tuple:
+    """Send a GET request to the ASGI application and close its connections."""
+
+    async def request() -> tuple:
+        try:
+            return await asgi_request(app, path, query_string)
+        finally:
+            await app.shutdown()
+
+    return asyncio.run(request())
+
+
+def test_read_record(asgi_flask_app: flask.Flask) -> None:
+    """Test that the ASGI application reads the records written by Flask."""
+    client = asgi_flask_app.test_client()
+    client.get("/lib/author/create?name=async%20author")
+    location = client.get("/lib/book/create?name=async%20book&author=async%20author")
+    record_id = int(location.headers["Location"].removeprefix("./"))
+    app = create_asgi_app("tests.test_asgi.AsgiConfig")
+    status, headers, body = call(app, f"/lib/book/{record_id}")
+    assert status == 200
+    assert headers["content-type"] == "application/json"
+    assert json.loads(body) == client.get(f"/lib/book/{record_id}").json
+    assert json.loads(body)["author"] == "Async Author"
+    status, _, body = call(app, f"/lib/book/{record_id}/chapters")
+    assert (status, json.loads(body)["chapters"]) == (200, [])
+    status, headers, _ = call(app, "/lib/book/find", b"name=ASYNC%20BOOK")
+    assert (status, headers["location"]) == (302, f"./{record_id}")
+    assert call(app, "/lib/book/0")[0] == 404
+    assert call(app, "/lib/unknown/1")[0] == 404
+    assert call(app, "/lib/book/find")[0] == 404
+
+
+def test_read_library_record(asgi_flask_app: flask.Flask) -> None:
+    """Test the routes of the ASGI application under /lib/<library>."""
+    client = asgi_flask_app.test_client()
+    response = client.get("/lib/family/genre/create?name=family%20genre")
+    record_id = int(response.headers["Location"].removeprefix("./"))
+    app = create_asgi_app("tests.test_asgi.AsgiConfig")
+    status, _, body = call(app, f"/lib/family/genre/{record_id}")
+    assert (status, json.loads(body)["name"]) == (200, "Family Genre")
+    assert call(app, f"/lib/other/genre/{record_id}")[0] == 404
+
+
+def test_lifespan() -> None:
+    """Test that the ASGI application creates the tables at startup."""
+    app = create_asgi_app("tests.test_asgi.AsgiConfig")
+    messages = iter([{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}])
+    sent: list[str] = []
+
+    async def receive() -> dict:
+        return next(messages)
+
+    async def send(message: dict) -> None:
+        sent.append(message["type"])
+
+    asyncio.run(app({"type": "lifespan"}, receive, send))
+    assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+
+
+def test_create_asgi_app__memory() -> None:
+    """Test that the ASGI application needs a database file."""
+    with pytest.raises(ValueError, match="database file"):
+        create_asgi_app("tests.conftest.TestConfig")
+
+
+def test_run_benchmark(tmp_path: Path) -> None:
+    """Test for run_benchmark with a few requests."""
+    results = run_benchmark([1, 4], requests=20, records=8, directory=tmp_path)
+    assert [(r.path, r.connections, r.errors) for r in results] == [
+        ("wsgi", 1, 0),
+        ("wsgi", 4, 0),
+        ("asgi", 1, 0),
+        ("asgi", 4, 0),
+    ]
+    assert all(result.throughput > 0 for result in results)
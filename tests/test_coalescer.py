@@ -0,0 +1,74 @@
+"""Tests for audiobooks.coalescer."""
+
+from __future__ import annotations
+
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import flask
+import pytest
+import sqlalchemy
+
+from audiobooks.app import create_app
+from audiobooks.extensions import db, write_coalescer
+
+from .conftest import TestConfig
+
+
+class CoalescingConfig(TestConfig):
+    """Configuration class for testing the write coalescer."""
+
+    SQLALCHEMY_DATABASE_URI: str = (
+        f"sqlite:///{Path(tempfile.mkdtemp()) / 'coalescer.sqlite'}"
+    )
+    WRITE_COALESCING: bool = True
+    WRITE_BATCH_WINDOW: float = 0.2
+
+
+@pytest.fixture()
+def coalescing_app() -> flask.Flask:
+    """Create an application with the write coalescer enabled."""
+    coalescing_app = create_app("tests.test_coalescer.CoalescingConfig")
+    yield coalescing_app
+    write_coalescer.shutdown(coalescing_app)
+
+
+def test_group_commit(coalescing_app: flask.Flask) -> None:
+    """Test that concurrent writes share a commit, with errors kept per operation."""
+    commits: list[None] = []
+    with coalescing_app.app_context():
+        sqlalchemy.event.listen(db.engine, "commit", lambda _: commits.append(None))
+    names = ["Group%20One", "Group%20Two", "Group%20One", "Group%20Three"]
+
+    def create(name: str) -> int:
+        client = coalescing_app.test_client()
+        return client.get(f"/lib/author/create?name={name}").status_code
+
+    with ThreadPoolExecutor(len(names)) as executor:
+        status_codes = list(executor.map(create, names))
+    assert sorted(status_codes) == [302, 302, 302, 400]
+    assert len(commits) == 1
+    client = coalescing_app.test_client()
+    response = client.get("/lib/author/find?name=Group%20Three")
+    assert response.status_code == 302
+    record_id = response.headers["Location"].removeprefix("./")
+    assert client.get(f"/lib/author/{record_id}/delete").status_code == 200
+    assert client.get(f"/lib/author/{record_id}").status_code == 404
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_writer_error(
+    coalescing_app: flask.Flask, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that the writes fail instead of waiting when the writer thread stops."""
+
+    def fail(batch: list[object]) -> None:
+        raise RuntimeError("rollback failed")
+
+    monkeypatch.setattr(write_coalescer, "_write_batch", fail)
+    with coalescing_app.test_request_context():
+        with pytest.raises(RuntimeError, match="writer thread stopped"):
+            write_coalescer.execute(lambda: None, timeout=5)
+        with pytest.raises(RuntimeError, match="writer thread stopped"):
+            write_coalescer.execute(lambda: None, timeout=5)
@@ -95,3 +95,19 @@ def test_decimal(example: ExampleModel, test_db: flask_sqlalchemy.SQLAlchemy) ->
     assert db_item.number == Decimal("1.1")
     assert ExampleModel.query.filter(ExampleModel.number > 1).first() == example  # type: ignore[reportOptionalOperand]
     assert ExampleModel.query.filter(ExampleModel.number > 1.9).first() is None  # type: ignore[reportOptionalOperand]
+
+
+def test_decimal__sql_expressions(
+    example: ExampleModel, test_db: flask_sqlalchemy.SQLAlchemy
+) -> None:
+    """Test for SqliteDecimal SQL expressions and aggregates."""
+    example.update(number="2.5")
+    ExampleModel.create(name="other", number=3)
+    test_db.session.commit()
+    whole_numbers = test_db.session.scalars(
+        db.select(ExampleModel.number.whole_number()).order_by(ExampleModel.number)
+    ).all()
+    assert whole_numbers == [2, 3]
+    total = test_db.session.scalar(db.select(db.func.sum(ExampleModel.number)))
+    assert total == Decimal("5.5")
+    assert test_db.session.scalar(db.select(db.func.max(ExampleModel.number))) == 3
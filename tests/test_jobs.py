@@ -0,0 +1,211 @@
+"""Tests for audiobooks.jobs."""
+
+from __future__ import annotations
+
+import tempfile
+import threading
+from pathlib import Path
+
+import flask
+import flask_sqlalchemy
+import pytest
+from flask.testing import FlaskClient
+
+from audiobooks.app import create_app
+from audiobooks.extensions import db
+from audiobooks.jobs.models import Job, JobStatus
+from audiobooks.jobs.runner import JobContext, is_owner_running, process_owner
+from audiobooks.jobs.tasks import job_runner
+from audiobooks.library.models import Author, Book
+
+from .conftest import TestConfig
+from .test_library_chapters import chapters_mp3  # noqa: F401
+
+
+URL_PREFIX = "/jobs"
+started = threading.Event()
+
+
+class JobsConfig(TestConfig):
+    """Configuration class for testing the jobs with a database file."""
+
+    SQLALCHEMY_DATABASE_URI: str = (
+        f"sqlite:///{Path(tempfile.mkdtemp()) / 'jobs.sqlite'}"
+    )
+    JOB_CANCEL_POLL_INTERVAL: float = 0.05
+
+
+@pytest.fixture()
+def jobs_app() -> flask.Flask:
+    """Create an application with a database file, shared by the job workers."""
+    return create_app("tests.test_jobs.JobsConfig")
+
+
+@job_runner.job_type("test_create_author")
+def create_author(context: JobContext, name: str) -> str:
+    """Example job creating an author."""
+    context.progress(1, 1)
+    return Author.create(name=name).name
+
+
+@job_runner.job_type("test_fail")
+def fail(context: JobContext) -> None:
+    """Example job failing."""
+    raise ValueError("Failed on purpose")
+
+
+@job_runner.job_type("test_wait_for_cancel")
+def wait_for_cancel(context: JobContext) -> None:
+    """Example job running until it is cancelled."""
+    started.set()
+    while not context.cancelled:
+        threading.Event().wait(0.01)
+    context.check_cancelled()
+
+
+def test_submit(test_db: flask_sqlalchemy.SQLAlchemy) -> None:
+    """Test for JobRunner.submit with a successful job."""
+    job = job_runner.submit("test_create_author", name="alice bob")
+    job = job_runner.wait(job.record_id, timeout=5)
+    assert job is not None
+    assert job.status == JobStatus.SUCCEEDED
+    assert job.result == "Alice Bob"
+    assert (job.done, job.total) == (1, 1)
+    assert Author.get_by_name("Alice Bob") is not None
+
+
+def test_submit__failure(test_db: flask_sqlalchemy.SQLAlchemy) -> None:
+    """Test for JobRunner.submit with a failing job."""
+    job = job_runner.submit("test_fail")
+    job = job_runner.wait(job.record_id, timeout=5)
+    assert job is not None
+    assert job.status == JobStatus.FAILED
+    assert job.error == "Failed on purpose"
+    with pytest.raises(TypeError):
+        job_runner.submit("test_create_author", title="Example")
+
+
+def test_cancel(test_db: flask_sqlalchemy.SQLAlchemy) -> None:
+    """Test for JobRunner.cancel with a running job."""
+    job = job_runner.submit("test_wait_for_cancel")
+    assert started.wait(5)
+    job_runner.cancel(job.record_id)
+    job = job_runner.wait(job.record_id, timeout=5)
+    assert job is not None
+    assert job.status == JobStatus.CANCELLED
+    assert JobStatus(job.status).is_finished
+
+
+def test_cancel__from_record(jobs_app: flask.Flask) -> None:
+    """Test that a running job stops when its record is marked for cancellation."""
+    started.clear()
+    with jobs_app.app_context():
+        job = job_runner.submit("test_wait_for_cancel")
+        assert started.wait(5)
+        job_runner.update_job(job.record_id, cancel_requested=True)
+        job = job_runner.wait(job.record_id, timeout=5)
+    assert job is not None
+    assert job.status == JobStatus.CANCELLED
+
+
+def test_shutdown(jobs_app: flask.Flask) -> None:
+    """Test that JobRunner.shutdown cancels the running and queued jobs."""
+    started.clear()
+    with jobs_app.app_context():
+        running = job_runner.submit("test_wait_for_cancel")
+        assert started.wait(5)
+        queued = job_runner.submit("test_wait_for_cancel")
+        job_runner.shutdown(jobs_app)
+        for job_id in (running.record_id, queued.record_id):
+            job = job_runner.get_job(job_id)
+            assert job is not None
+            assert job.status == JobStatus.CANCELLED
+        with pytest.raises(RuntimeError):
+            job_runner.submit("test_wait_for_cancel")
+
+
+def test_index_chapters(jobs_app: flask.Flask, chapters_mp3: Path) -> None:
+    """Test the index_chapters job on a database file with several books."""
+    with jobs_app.app_context():
+        for number in range(3):
+            path = chapters_mp3.with_name(f"indexed-{number}.mp3")
+            path.write_bytes(chapters_mp3.read_bytes())
+            Book.create(name=f"Indexed {number}", file_path=path)
+        db.session.commit()
+        job = job_runner.submit("index_chapters")
+        job = job_runner.wait(job.record_id, timeout=10)
+    assert job is not None
+    assert (job.status, job.error) == (JobStatus.SUCCEEDED, None)
+    assert job.result == {"scanned": 3, "indexed": 3}
+    assert (job.done, job.total) == (3, 3)
+
+
+def test_index_chapters__broken(jobs_app: flask.Flask, media_path: Path) -> None:
+    """Test that the index_chapters job doesn't read a broken file again."""
+    path = media_path / "broken.mp3"
+    path.write_bytes(b"ID3")
+    with jobs_app.app_context():
+        book = Book.create(name="Broken", file_path=path)
+        db.session.commit()
+        attempts, scanned = [], []
+        for arguments in ({}, {}, {"reindex": True}):
+            job = job_runner.submit("index_chapters", **arguments)
+            job = job_runner.wait(job.record_id, timeout=10)
+            assert job is not None
+            scanned.append(job.result["scanned"])
+            db.session.refresh(book)
+            attempts.append(book.indexed_at)
+        assert book.duration_ms is None
+    assert scanned[:2] == [1, 0]
+    assert attempts[0] is not None
+    assert attempts[0] == attempts[1] < attempts[2]
+
+
+def test_reap(jobs_app: flask.Flask) -> None:
+    """Test that only the jobs of the stopped processes are marked as failed."""
+    host, boot_id, pid, start = process_owner().rsplit(":", 3)
+    owners = {
+        "current": process_owner(),
+        "other host": f"other-{host}:{boot_id}:{pid}:{start}",
+        "stopped": f"{host}:{boot_id}:{2**22 + 1}:{start}",
+        "rebooted": f"{host}:other-{boot_id}:{pid}:{start}",
+        "reused pid": f"{host}:{boot_id}:{pid}:other-{start}",
+        "unknown": None,
+    }
+    assert is_owner_running(owners["current"])
+    with jobs_app.app_context():
+        jobs = {
+            name: Job(job_type="test_fail", status=JobStatus.RUNNING, owner=owner)
+            for name, owner in owners.items()
+        }
+        db.session.add_all(jobs.values())
+        db.session.commit()
+        reaped = job_runner.reap()
+        assert sorted(reaped) == sorted(
+            jobs[name].record_id
+            for name in ("stopped", "rebooted", "reused pid", "unknown")
+        )
+        db.session.expire_all()
+        assert jobs["current"].status == JobStatus.RUNNING
+        assert jobs["other host"].status == JobStatus.RUNNING
+        assert jobs["stopped"].status == JobStatus.FAILED
+
+
+def test_routes(client: FlaskClient) -> None:
+    """Test for the job routes."""
+    response = client.get(f"{URL_PREFIX}/scan_covers/submit")
+    assert response.status_code == 302
+    job_id = int(response.headers["Location"].removeprefix("../"))
+    job_runner.wait(job_id, timeout=5)
+    response = client.get(f"{URL_PREFIX}/{job_id}")
+    assert response.status_code == 200
+    assert response.json["status"] == "succeeded"
+    assert response.json["result"] == {"scanned": 0, "covers": 0}
+    response = client.get(f"{URL_PREFIX}/{job_id}/cancel")
+    assert response.status_code == 302
+    assert client.get(f"{URL_PREFIX}/FAIL/submit").status_code == 404
+    response = client.get(f"{URL_PREFIX}/compact_changes/submit")
+    assert response.status_code == 400
+    response = client.get(f"{URL_PREFIX}/scan_covers/submit?FAIL=FAIL")
+    assert response.status_code == 400
+    assert client.get(f"{URL_PREFIX}/999").status_code == 404
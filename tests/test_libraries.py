@@ -0,0 +1,179 @@
+"""Tests for audiobooks.libraries."""
+
+from __future__ import annotations
+
+import sqlite3
+import tempfile
+from pathlib import Path
+
+import flask
+import pytest
+
+from audiobooks.app import create_app
+from audiobooks.extensions import write_coalescer
+from audiobooks.jobs.models import JobStatus
+from audiobooks.jobs.tasks import job_runner
+from audiobooks.maintenance import INCREMENTAL_AUTO_VACUUM
+
+from .conftest import TestConfig
+
+
+LIBRARIES_DIR = Path(tempfile.mkdtemp(prefix="audiobooks-libraries-"))
+
+
+class LibrariesConfig(TestConfig):
+    """Configuration class for testing named libraries."""
+
+    LIBRARIES: dict[str, str] = {  # noqa: RUF012
+        "family": str(LIBRARIES_DIR / "family.sqlite"),
+        "archive": str(LIBRARIES_DIR / "archive.sqlite"),
+    }
+
+
+class LibraryJobsConfig(LibrariesConfig):
+    """Configuration class with a default database file, shared by the job workers."""
+
+    SQLALCHEMY_DATABASE_URI: str = f"sqlite:///{LIBRARIES_DIR / 'default.sqlite'}"
+
+
+class CoalescingLibrariesConfig(LibrariesConfig):
+    """Configuration class for testing named libraries with the write coalescer."""
+
+    WRITE_COALESCING: bool = True
+
+
+class ManyLibrariesConfig(TestConfig):
+    """Configuration class with more libraries than SQLite can attach at once."""
+
+    LIBRARIES: dict[str, str] = {  # noqa: RUF012
+        f"shelf-{number}": str(LIBRARIES_DIR / f"shelf-{number}.sqlite")
+        for number in range(12)
+    }
+
+
+class InvalidLibrariesConfig(TestConfig):
+    """Configuration class with a reserved library name."""
+
+    LIBRARIES: dict[str, str] = {"all": str(LIBRARIES_DIR / "all.sqlite")}  # noqa: RUF012
+
+
+@pytest.fixture()
+def libraries_app() -> flask.Flask:
+    """Create an application with named libraries."""
+    return create_app("tests.test_libraries.LibrariesConfig")
+
+
+def library_names(library: str) -> list[str]:
+    """Read the author names stored in the database file of a library."""
+    with sqlite3.connect(LibrariesConfig.LIBRARIES[library]) as connection:
+        return [row[0] for row in connection.execute("SELECT name FROM author")]
+
+
+def test_library_routes(libraries_app: flask.Flask) -> None:
+    """Test that the routes under /lib/<library> use the library's database."""
+    client = libraries_app.test_client()
+    response = client.get("/lib/family/author/create?name=family%20author")
+    assert response.status_code == 302
+    record_id = response.headers["Location"].removeprefix("./")
+    response = client.get(f"/lib/family/author/{record_id}")
+    assert response.status_code == 200
+    assert response.json["name"] == "Family Author"
+    assert "Family Author" in library_names("family")
+    assert "Family Author" not in library_names("archive")
+    assert client.get(f"/lib/author/{record_id}").status_code == 404
+    assert client.get(f"/lib/unknown/author/{record_id}").status_code == 404
+
+
+def test_library_settings(libraries_app: flask.Flask) -> None:
+    """Test that the library databases use WAL and incremental auto-vacuum."""
+    with sqlite3.connect(LibrariesConfig.LIBRARIES["family"]) as connection:
+        journal_mode = connection.execute("PRAGMA journal_mode").fetchone()[0]
+        auto_vacuum = connection.execute("PRAGMA auto_vacuum").fetchone()[0]
+    connection.close()
+    assert (journal_mode, auto_vacuum) == ("wal", INCREMENTAL_AUTO_VACUUM)
+
+
+def test_library_jobs(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the maintenance and library jobs run on every library."""
+    libraries_app = create_app("tests.test_libraries.LibraryJobsConfig")
+    monkeypatch.setitem(libraries_app.config, "BACKUP_DIR", str(tmp_path))
+    client = libraries_app.test_client()
+    client.get("/lib/archive/author/create?name=archive%20author")
+    for name in ("first", "second"):
+        client.get(f"/lib/archive/book/create?name={name}&author=archive%20author")
+    with libraries_app.app_context():
+        jobs = {
+            job_type: job_runner.submit(job_type)
+            for job_type in ("backup_database", "check_database", "index_similar_books")
+        }
+        results = {
+            job_type: job_runner.wait(job.record_id, timeout=5)
+            for job_type, job in jobs.items()
+        }
+    assert {job.status for job in results.values()} == {JobStatus.SUCCEEDED}
+    assert set(results["backup_database"].result["paths"]) == {
+        "default",
+        "family",
+        "archive",
+    }
+    assert (tmp_path / "archive").is_dir()
+    assert results["check_database"].result == {"ok": True, "problems": []}
+    with sqlite3.connect(LibrariesConfig.LIBRARIES["archive"]) as connection:
+        similar = connection.execute("SELECT count(*) FROM similar_book").fetchone()
+    connection.close()
+    assert similar == (2,)
+    response = client.get("/admin/maintenance")
+    assert set(response.json["libraries"]) == {"default", "family", "archive"}
+
+
+def test_coalesced_library_writes() -> None:
+    """Test that coalesced writes are committed to the library of the request."""
+    app = create_app("tests.test_libraries.CoalescingLibrariesConfig")
+    client = app.test_client()
+    response = client.get("/lib/archive/author/create?name=archived%20author")
+    write_coalescer.shutdown(app)
+    assert response.status_code == 302
+    assert "Archived Author" in library_names("archive")
+    assert "Archived Author" not in library_names("family")
+
+
+def test_search_all_libraries(libraries_app: flask.Flask) -> None:
+    """Test for route /lib/all/<item>/search."""
+    client = libraries_app.test_client()
+    for library in ("", "family/", "archive/"):
+        client.get(f"/lib/{library}author/create?name=alice%20{library[:-1] or 'x'}")
+    response = client.get("/lib/all/author/search?name=ALICE")
+    assert response.status_code == 200
+    assert {(r["library"], r["name"]) for r in response.json} >= {
+        ("default", "Alice X"),
+        ("family", "Alice Family"),
+        ("archive", "Alice Archive"),
+    }
+    response = client.get("/lib/all/author/search?name=alice&limit=1")
+    assert len(response.json) == 1
+    assert client.get("/lib/all/author/search").status_code == 400
+    assert client.get("/lib/family/all/author/search?name=a").status_code == 404
+
+
+def test_search_many_libraries() -> None:
+    """Test that the search covers more libraries than SQLite can attach at once."""
+    client = create_app("tests.test_libraries.ManyLibrariesConfig").test_client()
+    for library in ManyLibrariesConfig.LIBRARIES:
+        client.get(f"/lib/{library}/author/create?name=bob%20{library}")
+    response = client.get("/lib/all/author/search?name=bob")
+    assert response.status_code == 200
+    assert [record["library"] for record in response.json] == sorted(
+        ManyLibrariesConfig.LIBRARIES
+    )
+    response = client.get("/lib/all/author/search?name=bob&limit=3")
+    assert [record["name"] for record in response.json] == [
+        "Bob Shelf-0",
+        "Bob Shelf-1",
+        "Bob Shelf-10",
+    ]
+
+
+def test_invalid_library_name() -> None:
+    """Test that reserved library names are rejected."""
+    with pytest.raises(ValueError, match="Invalid library name"):
+        create_app("tests.test_libraries.InvalidLibrariesConfig")
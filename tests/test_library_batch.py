@@ -0,0 +1,60 @@
+"""Tests for audiobooks.library.batch."""
+
+import flask_sqlalchemy
+import pytest
+import sqlalchemy
+
+from audiobooks.library.batch import Lookup, resolve_lookups
+from audiobooks.library.models import Author, Book
+
+from .test_library_models import author, book  # noqa: F401
+
+
+def test_lookup_from_dict() -> None:
+    """Test for Lookup.from_dict."""
+    assert Lookup.from_dict({"item": "book", "record_id": 1}) == Lookup(Book, 1, None)
+    assert Lookup.from_dict({"item": "author", "name": " alice  BOB"}) == Lookup(
+        Author, None, "Alice Bob"
+    )
+    for invalid in ({"item": "FAIL", "record_id": 1}, {"item": "book"}, ["book", 1]):
+        with pytest.raises((TypeError, ValueError), match=r"Invalid|needs"):
+            Lookup.from_dict(invalid)
+
+
+def test_resolve_lookups(author: Author, book: Book) -> None:
+    """Test for resolve_lookups."""
+    lookups = [
+        Lookup(Book, book.record_id, None),
+        Lookup(Author, None, "Alice Bob"),
+        Lookup(Author, 999, None),
+        Lookup(Author, author.record_id, None),
+    ]
+    assert resolve_lookups(lookups) == [book, author, None, author]
+
+
+def test_resolve_lookups__eager(
+    author: Author, book: Book, test_db: flask_sqlalchemy.SQLAlchemy
+) -> None:
+    """Test that resolve_lookups loads the relationships read by to_dict."""
+    lookups = [
+        Lookup(Book, book.record_id, None),
+        Lookup(Author, author.record_id, None),
+    ]
+    book_name, author_name = str(book), str(author)
+    test_db.session.expunge_all()
+    records = resolve_lookups(lookups)
+    statements: list[str] = []
+
+    def count_statement(*args: object) -> None:
+        statements.append(str(args[2]))
+
+    sqlalchemy.event.listen(test_db.engine, "before_cursor_execute", count_statement)
+    try:
+        dicts = [record.to_dict() for record in records if record is not None]
+    finally:
+        sqlalchemy.event.remove(
+            test_db.engine, "before_cursor_execute", count_statement
+        )
+    assert statements == []
+    assert dicts[0]["author"] == author_name
+    assert dicts[1]["books"] == [book_name]
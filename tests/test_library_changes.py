@@ -0,0 +1,55 @@
+"""Tests for audiobooks.library.changes."""
+
+import flask_sqlalchemy
+
+from audiobooks.library.changes import Change, compact_changes, read_changes
+from audiobooks.library.models import Author, Book
+
+
+def test_record_changes(test_db: flask_sqlalchemy.SQLAlchemy) -> None:
+    """Test that changes are recorded on flush, including the nulled foreign keys."""
+    author = Author.create(name="Alice Bob")
+    test_db.session.commit()
+    author.update(name="Alice Bobby")
+    Book.create(name="Example", author=author)
+    test_db.session.commit()
+    author.update(name="Alice Bobby")
+    test_db.session.commit()
+    author.delete()
+    test_db.session.commit()
+    changes, more = read_changes(0, 10)
+    assert not more
+    assert [(c.item, c.operation) for c in changes] == [
+        ("author", "create"),
+        ("book", "create"),
+        ("author", "update"),
+        ("book", "update"),
+        ("author", "delete"),
+    ]
+    assert [c.record_id for c in changes] == sorted(c.record_id for c in changes)
+
+
+def test_read_changes__paging(test_db: flask_sqlalchemy.SQLAlchemy) -> None:
+    """Test for read_changes with several pages."""
+    for name in ("A", "B", "C"):
+        Author.create(name=name)
+    test_db.session.commit()
+    first_page, more = read_changes(0, 2)
+    assert more
+    second_page, more = read_changes(first_page[-1].record_id, 2)
+    assert not more
+    assert len(second_page) == 1
+
+
+def test_compact_changes(test_db: flask_sqlalchemy.SQLAlchemy) -> None:
+    """Test for compact_changes."""
+    author = Author.create(name="Alice Bob")
+    test_db.session.commit()
+    for name in ("Alice", "Bob", "Carol"):
+        author.update(name=name)
+        test_db.session.commit()
+    last_seq = read_changes(0, 10)[0][-1].record_id
+    assert compact_changes(last_seq) == 3
+    test_db.session.commit()
+    changes = test_db.session.scalars(test_db.select(Change)).all()
+    assert [(c.operation, c.record_id) for c in changes] == [("update", last_seq)]
@@ -0,0 +1,130 @@
+"""Tests for audiobooks.library.chapters."""
+
+from __future__ import annotations
+
+import struct
+from pathlib import Path
+
+import flask
+import flask_sqlalchemy
+import pytest
+
+from audiobooks.library.chapters import (
+    extract_audio_index,
+    index_book,
+    read_chapters,
+    total_durations,
+)
+from audiobooks.library.containers import ChapterMark, read_mp3_duration
+from audiobooks.library.models import Author, Book
+
+from .test_library_covers import make_atom, make_id3
+
+
+def make_chap(element_id: bytes, start: int, end: int, title: str) -> bytes:
+    """Build the data of an ID3v2.3 CHAP frame with a TIT2 sub-frame."""
+    tit2 = b"\x03" + title.encode()
+    subframe = b"TIT2" + struct.pack(">I", len(tit2)) + b"\x00\x00" + tit2
+    return element_id + b"\x00" + struct.pack(">IIII", start, end, 0, 0) + subframe
+
+
+@pytest.fixture()
+def chapters_mp3(media_path: Path) -> Path:
+    """Generate an MP3 file with a length and two chapters."""
+    frames = [
+        (b"TLEN", b"\x00" + b"90000"),
+        (b"CHAP", make_chap(b"ch2", 30_000, 90_000, "Second")),
+        (b"CHAP", make_chap(b"ch1", 0, 30_000, "First")),
+    ]
+    path = media_path / "chapters.mp3"
+    path.write_bytes(make_id3(frames) + b"\x00" * 64)
+    return path
+
+
+@pytest.fixture()
+def chapters_m4b(media_path: Path) -> Path:
+    """Generate an MP4 file with a duration and Nero chapters."""
+    mvhd = make_atom(b"mvhd", b"\x00" * 12 + struct.pack(">II", 1000, 3_600_000))
+    marks = [(0, b"Opening"), (1_200_000 * 10_000, b"Middle")]
+    chpl = make_atom(
+        b"chpl",
+        b"\x01\x00\x00\x00"
+        + b"\x00" * 4
+        + bytes([len(marks)])
+        + b"".join(struct.pack(">QB", start, len(t)) + t for start, t in marks),
+    )
+    moov = make_atom(b"moov", mvhd + make_atom(b"udta", chpl))
+    path = media_path / "chapters.m4b"
+    path.write_bytes(make_atom(b"ftyp", b"M4B ") + moov)
+    return path
+
+
+def test_extract_audio_index__mp3(chapters_mp3: Path) -> None:
+    """Test for extract_audio_index with ID3 CHAP and TLEN frames."""
+    index = extract_audio_index(chapters_mp3)
+    assert index is not None
+    assert index.duration_ms == 90_000
+    assert index.chapters == [
+        ChapterMark("First", 0, 30_000),
+        ChapterMark("Second", 30_000, 90_000),
+    ]
+
+
+def test_extract_audio_index__mp4(chapters_m4b: Path) -> None:
+    """Test for extract_audio_index with the mvhd and chpl atoms."""
+    index = extract_audio_index(chapters_m4b)
+    assert index is not None
+    assert index.duration_ms == 3_600_000
+    assert index.chapters == [
+        ChapterMark("Opening", 0, 1_200_000),
+        ChapterMark("Middle", 1_200_000, 3_600_000),
+    ]
+
+
+def test_read_mp3_duration__xing(tmp_path: Path) -> None:
+    """Test for read_mp3_duration from the Xing header of the first frame."""
+    header = struct.pack(">I", 0xFFFB9064)  # MPEG-1 layer III, 128 kbps, 44.1 kHz
+    xing = b"Xing" + struct.pack(">II", 1, 3445)
+    path = tmp_path / "xing.mp3"
+    path.write_bytes(make_id3([]) + header + b"\x00" * 32 + xing + b"\x00" * 64)
+    with path.open("rb") as file:
+        assert read_mp3_duration(file) == 3445 * 1152 * 1000 // 44100
+
+
+def test_index_book(
+    chapters_mp3: Path, chapters_m4b: Path, test_db: flask_sqlalchemy.SQLAlchemy
+) -> None:
+    """Test for index_book and total_durations."""
+    author = Author.create(name="Alice Bob")
+    books = [
+        Book.create(name="First", author=author, file_path=chapters_mp3),
+        Book.create(name="Second", author=author, file_path=chapters_m4b),
+        Book.create(name="Third", author=Author.create(name="Carol Dan")),
+    ]
+    assert [index_book(book) for book in books] == [True, True, False]
+    test_db.session.commit()
+    assert [c.title for c in read_chapters(books[1])] == ["Opening", "Middle"]
+    assert index_book(books[1])
+    test_db.session.commit()
+    assert len(read_chapters(books[1])) == 2
+    assert total_durations(Author) == [
+        {
+            "record_id": author.record_id,
+            "name": "Alice Bob",
+            "books": 2,
+            "duration_ms": 3_690_000,
+            "hours": 1.02,
+        }
+    ]
+    with pytest.raises(TypeError):
+        total_durations(Book)
+
+
+def test_index_book__outside_media_root(
+    app: flask.Flask, chapters_mp3: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that index_book doesn't read a file outside the media root."""
+    monkeypatch.setitem(app.config, "MEDIA_ROOT", str(chapters_mp3.parent / "media"))
+    book = Book.create(name="Outside", file_path=chapters_mp3)
+    assert not index_book(book)
+    assert book.duration_ms is None
@@ -0,0 +1,175 @@
+"""Tests for audiobooks.library.covers and audiobooks.library.containers."""
+
+from __future__ import annotations
+
+import logging
+import struct
+from pathlib import Path
+
+import flask
+import pytest
+
+from audiobooks.configuration import Config
+from audiobooks.library import covers
+from audiobooks.library.containers import (
+    audio_mimetype,
+    read_id3_cover,
+    read_mp4_cover,
+)
+from audiobooks.library.covers import CoverCache, extract_cover, image_mimetype
+
+
+PNG_IMAGE = b"\x89PNG\r\n\x1a\n" + b"\x00" * 32
+
+
+def make_id3(frames: list[tuple[bytes, bytes]]) -> bytes:
+    """Build an ID3v2.3 tag from (frame id, data) pairs."""
+    body = b"".join(
+        frame_id + struct.pack(">I", len(data)) + b"\x00\x00" + data
+        for frame_id, data in frames
+    )
+    size = bytes((len(body) >> shift) & 0x7F for shift in (21, 14, 7, 0))
+    return b"ID3\x03\x00\x00" + size + body
+
+
+def make_atom(kind: bytes, payload: bytes) -> bytes:
+    """Build an MP4 atom."""
+    return struct.pack(">I4s", len(payload) + 8, kind) + payload
+
+
+@pytest.fixture()
+def mp3_file(media_path: Path) -> Path:
+    """Generate an MP3 file with an embedded front cover."""
+    apic = b"\x00image/png\x00\x03cover\x00" + PNG_IMAGE
+    other = b"\x00image/jpeg\x00\x04back\x00" + b"\xff\xd8back"
+    path = media_path / "book.mp3"
+    path.write_bytes(make_id3([(b"APIC", other), (b"APIC", apic)]) + b"\xff" * 64)
+    return path
+
+
+@pytest.fixture()
+def mp4_file(media_path: Path) -> Path:
+    """Generate an MP4 file with an embedded cover."""
+    data = make_atom(b"data", struct.pack(">II", 14, 0) + PNG_IMAGE)
+    ilst = make_atom(b"ilst", make_atom(b"covr", data))
+    meta = make_atom(b"meta", b"\x00" * 4 + ilst)
+    moov = make_atom(b"moov", make_atom(b"udta", meta))
+    path = media_path / "book.m4b"
+    path.write_bytes(
+        make_atom(b"ftyp", b"M4B ") + make_atom(b"mdat", b"\x00" * 64) + moov
+    )
+    return path
+
+
+def test_audio_mimetype() -> None:
+    """Test for audio_mimetype."""
+    assert audio_mimetype("books/Example.M4B") == "audio/mp4"
+    assert audio_mimetype(Path("book.mp3")) == "audio/mpeg"
+    assert audio_mimetype("book.txt") == "application/octet-stream"
+
+
+def test_read_id3_cover(mp3_file: Path) -> None:
+    """Test for read_id3_cover, preferring the front cover."""
+    with mp3_file.open("rb") as file:
+        picture = read_id3_cover(file)
+    assert picture is not None
+    assert picture.mimetype == "image/png"
+    assert picture.picture_type == 3
+    assert picture.data == PNG_IMAGE
+
+
+def test_read_mp4_cover(mp4_file: Path) -> None:
+    """Test for read_mp4_cover."""
+    with mp4_file.open("rb") as file:
+        picture = read_mp4_cover(file)
+    assert picture is not None
+    assert picture.mimetype == "image/png"
+    assert picture.data == PNG_IMAGE
+
+
+def test_extract_cover__unsupported(tmp_path: Path) -> None:
+    """Test that extract_cover returns None for unsupported or missing files."""
+    text_file = tmp_path / "book.txt"
+    text_file.write_text("not audio")
+    assert extract_cover(text_file) is None
+    assert extract_cover(tmp_path / "missing.mp3") is None
+
+
+def test_extract_cover__truncated(mp4_file: Path) -> None:
+    """Test that extract_cover returns None for a file truncated in its cover."""
+    data = mp4_file.read_bytes()
+    mp4_file.write_bytes(data[: data.index(b"data") + 6])
+    assert extract_cover(mp4_file) is None
+
+
+def test_image_mimetype() -> None:
+    """Test for image_mimetype."""
+    assert image_mimetype(PNG_IMAGE) == "image/png"
+    assert image_mimetype(b"\xff\xd8\xff") == "image/jpeg"
+
+
+def test_cover_cache(mp3_file: Path, tmp_path: Path) -> None:
+    """Test for CoverCache.get_cover, including eviction."""
+    cache_app = flask.Flask(__name__)
+    cache_app.config.from_object(Config)
+    cache_app.config["COVER_CACHE_DIR"] = str(tmp_path / "cache")
+    cache_app.config["MEDIA_ROOT"] = str(mp3_file.parent)
+    cover_cache = CoverCache()
+    cover_cache.init_app(cache_app)
+    cover = cover_cache.get_cover(mp3_file, 96)
+    assert cover is not None
+    assert cover.data == PNG_IMAGE
+    assert cover.mimetype == "image/png"
+    assert cover_cache.get_cover(mp3_file, 96) == cover
+    cover_cache.max_bytes = len(PNG_IMAGE)
+    cover_cache._evict()  # noqa: SLF001
+    assert len(list((tmp_path / "cache").glob("*/*/*"))) == 1
+
+
+def test_cover_cache__without_pillow(
+    mp3_file: Path,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    """Test that CoverCache stores a single copy of the cover without Pillow."""
+    monkeypatch.setattr(covers, "_can_resize", lambda: False)
+    caplog.set_level(logging.WARNING, logger=covers.__name__)
+    cache_app = flask.Flask(__name__)
+    cache_app.config.from_object(Config)
+    cache_app.config["COVER_CACHE_DIR"] = str(tmp_path / "cache")
+    cache_app.config["MEDIA_ROOT"] = str(mp3_file.parent)
+    cover_cache = CoverCache()
+    cover_cache.init_app(cache_app)
+    assert "Pillow is not installed" in caplog.text
+    small = cover_cache.get_cover(mp3_file, 96)
+    large = cover_cache.get_cover(mp3_file, 512)
+    assert small is not None
+    assert small == large
+    assert small.data == PNG_IMAGE
+    assert len(list((tmp_path / "cache" / "thumbnails").glob("*/*"))) == 1
+
+
+def test_cover_cache__rejected(
+    mp3_file: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test for CoverCache with a file outside the media root or a broken cover."""
+    cache_app = flask.Flask(__name__)
+    cache_app.config.from_object(Config)
+    cache_app.config["COVER_CACHE_DIR"] = str(tmp_path / "cache")
+    cache_app.config["MEDIA_ROOT"] = str(mp3_file.parent / "media")
+    cover_cache = CoverCache()
+    cover_cache.init_app(cache_app)
+    assert cover_cache.get_digest(mp3_file) is None
+    escape = mp3_file.parent / "media" / ".." / mp3_file.name
+    assert cover_cache.get_digest(escape) is None
+    assert not (tmp_path / "cache").exists()
+
+    def fail_to_decode(image: bytes, sizes: tuple[int, ...]) -> list[bytes]:
+        raise OSError("cannot identify image file")
+
+    monkeypatch.setattr(covers, "make_thumbnails", fail_to_decode)
+    cover_cache.media_root = str(mp3_file.parent)
+    cover_cache.resize = True
+    assert cover_cache.get_digest(mp3_file) is None
+    assert cover_cache.get_cover(mp3_file, 96) is None
@@ -0,0 +1,81 @@
+"""Tests for audiobooks.library.duplicates."""
+
+import logging
+
+import flask_sqlalchemy
+import pytest
+
+from audiobooks.library import duplicates
+from audiobooks.library.duplicates import find_duplicates, merge_records, normalize_name
+from audiobooks.library.models import Author, Book
+
+
+@pytest.fixture()
+def authors(test_db: flask_sqlalchemy.SQLAlchemy) -> list[Author]:
+    """Generate Author examples with a near-duplicate."""
+    test_authors = [
+        Author.create(name="J.R.R. Tolkien"),
+        Author.create(name="J. R. R. Tolkien"),
+        Author.create(name="Alice Bob"),
+    ]
+    Book.create(name="The Hobbit", author=test_authors[0])
+    Book.create(name="The Silmarillion", author=test_authors[1])
+    test_db.session.commit()
+    return test_authors
+
+
+def test_normalize_name() -> None:
+    """Test for normalize_name."""
+    assert normalize_name("J.R.R. Tolkien") == normalize_name("J. R. R. Tolkien")
+    assert normalize_name("Book One") == normalize_name("Book 1")
+    assert normalize_name("Rocky IV") == "rocky 4"
+    assert normalize_name("Ann B Smith") == "ann b smith"
+    assert normalize_name("Ann V. Smith") == "ann v smith"
+    assert normalize_name("Henry V") == "henry 5"
+    assert normalize_name("Episode IV: A New Hope") == "episode 4 a new hope"
+
+
+def test_find_duplicates(authors: list[Author]) -> None:
+    """Test for find_duplicates."""
+    candidates = find_duplicates(Author)
+    assert len(candidates) == 1
+    assert {candidates[0].first, candidates[0].second} == set(authors[:2])
+    assert candidates[0].score == 1.0
+
+
+def test_find_duplicates__max_block_size(
+    authors: list[Author],
+    monkeypatch: pytest.MonkeyPatch,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    """Test that find_duplicates skips and logs the blocks over MAX_BLOCK_SIZE."""
+    caplog.set_level(logging.INFO, logger=duplicates.__name__)
+    monkeypatch.setattr(duplicates, "MAX_BLOCK_SIZE", 2)
+    assert len(find_duplicates(Author)) == 1
+    assert "Skipped" not in caplog.text
+    monkeypatch.setattr(duplicates, "MAX_BLOCK_SIZE", 1)
+    assert find_duplicates(Author) == []
+    assert "Skipped the block of 'tol': 2 names" in caplog.text
+
+
+def test_merge_records(
+    authors: list[Author], test_db: flask_sqlalchemy.SQLAlchemy
+) -> None:
+    """Test for merge_records."""
+    merge_records(authors[0], [authors[1]])
+    test_db.session.commit()
+    assert Author.get_by_name("J. R. R. Tolkien") is None
+    db_author = Author.get_by_id(authors[0].record_id)
+    assert db_author is not None
+    assert sorted(book.name for book in db_author.books) == [
+        "The Hobbit",
+        "The Silmarillion",
+    ]
+
+
+def test_merge_records__failure(authors: list[Author]) -> None:
+    """Test that merge_records refuses invalid merges."""
+    with pytest.raises(ValueError, match="itself"):
+        merge_records(authors[0], [authors[0]])
+    with pytest.raises(TypeError):
+        merge_records(authors[0], [Book.get_by_name("The Hobbit")])
@@ -142,7 +142,10 @@ def test_to_dict(author: Author, book: Book) -> None:
         "record_id": 1,
         "author": "Alice Bob",
         "date_added": date.today().isoformat(),
+        "duration_ms": None,
+        "file_path": None,
         "genre": None,
+        "indexed_at": None,
         "name": "Example",
         "release_date": None,
         "series": None,
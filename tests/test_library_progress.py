@@ -0,0 +1,178 @@
+"""Tests for audiobooks.library.progress."""
+
+from __future__ import annotations
+
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import flask
+import pytest
+
+from audiobooks.app import create_app
+from audiobooks.extensions import db
+from audiobooks.library import progress
+from audiobooks.library.duplicates import merge_records
+from audiobooks.library.models import Book
+from audiobooks.library.progress import progress_buffer, upsert_progress
+
+from .conftest import TestConfig
+
+
+URL_PREFIX = "/lib/book"
+
+
+class ProgressConfig(TestConfig):
+    """Configuration class for testing the progress buffer on a database file."""
+
+    SQLALCHEMY_DATABASE_URI: str = (
+        f"sqlite:///{Path(tempfile.mkdtemp()) / 'progress.sqlite'}"
+    )
+    PROGRESS_FLUSH_INTERVAL: float = 60.0
+    PROGRESS_MAX_PENDING: int = 3
+
+
+@pytest.fixture()
+def progress_app() -> flask.Flask:
+    """Create an application with a long flush interval."""
+    app = create_app("tests.test_library_progress.ProgressConfig")
+    yield app
+    progress_buffer.shutdown(app)
+
+
+def create_book(app: flask.Flask, name: str) -> int:
+    """Create a book with the routes of an application and return its id."""
+    response = app.test_client().get(f"{URL_PREFIX}/create?name={name}")
+    return int(response.headers["Location"].removeprefix("./"))
+
+
+def stored_positions() -> list[tuple[str, int, int]]:
+    """Read the listening positions stored in the database file."""
+    path = ProgressConfig.SQLALCHEMY_DATABASE_URI.removeprefix("sqlite:///")
+    with sqlite3.connect(path) as connection:
+        query = "SELECT user, book_id, position_ms FROM listening_progress ORDER BY 1"
+        return list(connection.execute(query))
+
+
+def test_progress_routes(progress_app: flask.Flask) -> None:
+    """Test for routes /book/<record_id>/progress and /progress/update."""
+    client = progress_app.test_client()
+    record_id = create_book(progress_app, "Progress")
+    for position in (1000, 2000, 3000):
+        response = client.get(
+            f"{URL_PREFIX}/{record_id}/progress/update?user=alice&position_ms={position}"
+        )
+        assert response.status_code == 202
+    response = client.get(f"{URL_PREFIX}/{record_id}/progress?user=alice")
+    assert response.json["position_ms"] == 3000
+    assert ("alice", record_id, 3000) not in stored_positions()
+    assert progress_buffer.flush(progress_app) == 1
+    assert ("alice", record_id, 3000) in stored_positions()
+    response = client.get(f"{URL_PREFIX}/{record_id}/progress?user=alice")
+    assert response.json["position_ms"] == 3000
+    assert client.get(f"{URL_PREFIX}/{record_id}/progress?user=bob").status_code == 404
+    assert client.get(f"{URL_PREFIX}/{record_id}/progress").status_code == 400
+    update = f"{URL_PREFIX}/{record_id}/progress/update"
+    assert client.get(f"{update}?user=alice&position_ms=-1").status_code == 400
+    assert client.get(f"{update}?position_ms=1").status_code == 400
+    assert (
+        client.get(f"{URL_PREFIX}/0/progress/update?user=a&position_ms=1").status_code
+        == 404
+    )
+
+
+def test_flush_on_max_pending(progress_app: flask.Flask) -> None:
+    """Test that the buffer is flushed as soon as it holds the maximum of positions."""
+    client = progress_app.test_client()
+    record_id = create_book(progress_app, "Busy")
+    for user in ("carol", "dan", "erin"):
+        client.get(
+            f"{URL_PREFIX}/{record_id}/progress/update?user={user}&position_ms=5"
+        )
+    deadline = time.monotonic() + 5
+    while len([p for p in stored_positions() if p[1] == record_id]) < 3:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_flush_on_shutdown() -> None:
+    """Test that the pending positions are written when the application shuts down."""
+    app = create_app("tests.test_library_progress.ProgressConfig")
+    record_id = create_book(app, "Shutdown")
+    app.test_client().get(
+        f"{URL_PREFIX}/{record_id}/progress/update?user=fay&position_ms=42"
+    )
+    progress_buffer.shutdown(app)
+    assert ("fay", record_id, 42) in stored_positions()
+
+
+def test_upsert_progress__order(progress_app: flask.Flask) -> None:
+    """Test that a stored position is not replaced by an older one."""
+    record_id = create_book(progress_app, "Order")
+    rows = [
+        {"user": "gus", "book_id": record_id, "position_ms": position, "updated_at": at}
+        for position, at in ((20, datetime(2024, 1, 2)), (10, datetime(2024, 1, 1)))  # noqa: DTZ001
+    ]
+    with progress_app.app_context():
+        for row in rows:
+            upsert_progress([row])
+            db.session.commit()
+    assert ("gus", record_id, 20) in stored_positions()
+
+
+def test_flush__error(
+    progress_app: flask.Flask, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that the positions are kept when a flush fails, whatever the error."""
+    client = progress_app.test_client()
+    record_id = create_book(progress_app, "Failing")
+    client.get(f"{URL_PREFIX}/{record_id}/progress/update?user=hal&position_ms=7")
+
+    def fail(rows: list[dict[str, object]]) -> None:
+        raise RuntimeError("disk on fire")
+
+    monkeypatch.setattr(progress, "upsert_progress", fail)
+    assert progress_buffer.flush(progress_app) == 0
+    monkeypatch.undo()
+    assert progress_buffer.flush(progress_app) == 1
+    assert ("hal", record_id, 7) in stored_positions()
+
+
+def test_delete_book(progress_app: flask.Flask) -> None:
+    """Test that the positions of a book are deleted with it."""
+    client = progress_app.test_client()
+    record_id = create_book(progress_app, "Deleted")
+    update = f"{URL_PREFIX}/{record_id}/progress/update?position_ms=9"
+    client.get(f"{update}&user=ida")
+    progress_buffer.flush(progress_app)
+    client.get(f"{update}&user=jay")
+    assert client.get(f"{URL_PREFIX}/{record_id}/delete").status_code == 200
+    assert progress_buffer.flush(progress_app) == 0
+    assert [p for p in stored_positions() if p[1] == record_id] == []
+
+
+def test_merge_books(progress_app: flask.Flask) -> None:
+    """Test that merging books moves the latest positions to the kept book."""
+    client = progress_app.test_client()
+    keep, duplicate = (
+        create_book(progress_app, "Kept"),
+        create_book(progress_app, "Copy"),
+    )
+    for record_id, user, position in (
+        (keep, "kim", 1),
+        (duplicate, "kim", 2),
+        (duplicate, "lou", 3),
+        (duplicate, "max", 4),
+        (keep, "max", 5),
+    ):
+        client.get(
+            f"{URL_PREFIX}/{record_id}/progress/update?user={user}&position_ms={position}"
+        )
+        progress_buffer.flush(progress_app)
+    with progress_app.app_context():
+        merge_records(db.session.get(Book, keep), [db.session.get(Book, duplicate)])
+        db.session.commit()
+    positions = [p for p in stored_positions() if p[1] in {keep, duplicate}]
+    assert positions == [("kim", keep, 2), ("lou", keep, 3), ("max", keep, 5)]
@@ -1,9 +1,16 @@
 """Tests for audiobooks.library.routes."""
 
+from pathlib import Path
+
+import flask_sqlalchemy
 from flask.testing import FlaskClient
 
-from audiobooks.library.models import Author
+from audiobooks.library.models import Author, Book, Series
+from audiobooks.library.similar import update_similar_books
 
+from .test_library_chapters import chapters_m4b  # noqa: F401
+from .test_library_covers import mp3_file, mp4_file  # noqa: F401
+from .test_library_duplicates import authors  # noqa: F401
 from .test_library_models import author  # noqa: F401
 
 
@@ -94,3 +101,243 @@ def test_delete__success(client: FlaskClient, author: Author) -> None:
     """Test for route /<item>/<record_id>/delete."""
     response = client.get(f"{URL_PREFIX}/author/{author.record_id}/delete")
     assert response.status_code == 200
+
+
+def test_read_cover__success(
+    client: FlaskClient, mp3_file: Path, test_db: flask_sqlalchemy.SQLAlchemy
+) -> None:
+    """Test for route /book/<record_id>/cover."""
+    book = Book.create(name="Example", file_path=mp3_file)
+    test_db.session.commit()
+    response = client.get(f"{URL_PREFIX}/book/{book.record_id}/cover?size=96")
+    assert response.status_code == 200
+    assert response.mimetype == "image/png"
+    assert response.cache_control.max_age is not None
+    etag = response.headers["ETag"]
+    response = client.get(
+        f"{URL_PREFIX}/book/{book.record_id}/cover?size=96",
+        headers={"If-None-Match": etag},
+    )
+    assert response.status_code == 304
+
+
+def test_read_cover__failure(
+    client: FlaskClient, test_db: flask_sqlalchemy.SQLAlchemy
+) -> None:
+    """Test for route /book/<record_id>/cover without a cover or a valid size."""
+    book = Book.create(name="Example")
+    test_db.session.commit()
+    response = client.get(f"{URL_PREFIX}/book/{book.record_id}/cover")
+    assert response.status_code == 404
+    response = client.get(f"{URL_PREFIX}/book/{book.record_id}/cover?size=1")
+    assert response.status_code == 400
+    book.file_path = str(Path(__file__).resolve())
+    test_db.session.commit()
+    response = client.get(f"{URL_PREFIX}/book/{book.record_id}/cover")
+    assert response.status_code == 404
+
+
+def test_read_cover__truncated(
+    client: FlaskClient, mp4_file: Path, test_db: flask_sqlalchemy.SQLAlchemy
+) -> None:
+    """Test for route /book/<record_id>/cover with a truncated audio file."""
+    data = mp4_file.read_bytes()
+    mp4_file.write_bytes(data[: data.index(b"data") + 6])
+    book = Book.create(name="Example", file_path=mp4_file)
+    test_db.session.commit()
+    response = client.get(f"{URL_PREFIX}/book/{book.record_id}/cover?size=96")
+    assert response.status_code == 404
+
+
+def test_read_audio(
+    client: FlaskClient, mp4_file: Path, test_db: flask_sqlalchemy.SQLAlchemy
+) -> None:
+    """Test for route /book/<record_id>/audio with full and partial requests."""
+    book = Book.create(name="Example", file_path=mp4_file)
+    test_db.session.commit()
+    content = mp4_file.read_bytes()
+    response = client.get(f"{URL_PREFIX}/book/{book.record_id}/audio")
+    assert response.status_code == 200
+    assert response.mimetype == "audio/mp4"
+    assert response.headers["Accept-Ranges"] == "bytes"
+    assert response.data == content
+    etag = response.headers["ETag"]
+    response = client.get(
+        f"{URL_PREFIX}/book/{book.record_id}/audio",
+        headers={"Range": "bytes=10-19", "If-Range": etag},
+    )
+    assert response.status_code == 206
+    assert response.headers["Content-Range"] == f"bytes 10-19/{len(content)}"
+    assert response.data == content[10:20]
+    response = client.get(
+        f"{URL_PREFIX}/book/{book.record_id}/audio",
+        headers={"Range": "bytes=10-19", "If-Range": '"stale"'},
+    )
+    assert response.status_code == 200
+    mp4_file.unlink()
+    response = client.get(f"{URL_PREFIX}/book/{book.record_id}/audio")
+    assert response.status_code == 404
+
+
+def test_read_audio__outside_media_root(
+    client: FlaskClient, media_path: Path, test_db: flask_sqlalchemy.SQLAlchemy
+) -> None:
+    """Test for route /book/<record_id>/audio with a file outside the media root."""
+    outside = Path(__file__).resolve()
+    book = Book.create(name="Example", file_path=outside)
+    test_db.session.commit()
+    response = client.get(f"{URL_PREFIX}/book/{book.record_id}/audio")
+    assert response.status_code == 404
+    response = client.get(f"{URL_PREFIX}/book/create?name=Other&file_path={outside}")
+    assert response.status_code == 400
+    escape = f"{media_path}/../../../../../../{outside}"
+    response = client.get(
+        f"{URL_PREFIX}/book/{book.record_id}/update?file_path={escape}"
+    )
+    assert response.status_code == 400
+    inside = media_path / "inside.mp3"
+    response = client.get(
+        f"{URL_PREFIX}/book/{book.record_id}/update?file_path={inside}"
+    )
+    assert response.status_code == 302
+
+
+def test_index_book_chapters(
+    client: FlaskClient, chapters_m4b: Path, test_db: flask_sqlalchemy.SQLAlchemy
+) -> None:
+    """Test for routes /book/<record_id>/index, /chapters and /<item>/durations."""
+    author = Author.create(name="Alice Bob")
+    book = Book.create(name="Example", author=author, file_path=chapters_m4b)
+    test_db.session.commit()
+    response = client.get(f"{URL_PREFIX}/book/{book.record_id}/index")
+    assert response.status_code == 302
+    assert response.headers["Location"] == "./chapters"
+    response = client.get(f"{URL_PREFIX}/book/{book.record_id}/chapters")
+    assert response.status_code == 200
+    assert response.json["duration_ms"] == 3_600_000
+    assert [c["title"] for c in response.json["chapters"]] == ["Opening", "Middle"]
+    response = client.get(f"{URL_PREFIX}/author/durations")
+    assert response.status_code == 200
+    assert response.json[0]["hours"] == 1.0
+    assert client.get(f"{URL_PREFIX}/book/durations").status_code == 404
+    book = Book.create(name="No File")
+    test_db.session.commit()
+    response = client.get(f"{URL_PREFIX}/book/{book.record_id}/index")
+    assert response.status_code == 404
+
+
+def test_find_duplicates(client: FlaskClient, authors: list[Author]) -> None:
+    """Test for route /<item>/duplicates."""
+    response = client.get(f"{URL_PREFIX}/author/duplicates")
+    assert response.status_code == 200
+    assert len(response.json) == 1
+
+
+def test_merge__success(client: FlaskClient, authors: list[Author]) -> None:
+    """Test for route /<item>/<record_id>/merge."""
+    response = client.get(
+        f"{URL_PREFIX}/author/{authors[0].record_id}/merge"
+        f"?duplicate={authors[1].record_id}"
+    )
+    assert response.status_code == 302
+    assert Author.get_by_id(authors[1].record_id) is None
+
+
+def test_merge__fail_args(client: FlaskClient, authors: list[Author]) -> None:
+    """Test for route /<item>/<record_id>/merge with invalid arguments."""
+    record_id = authors[0].record_id
+    response = client.get(
+        f"{URL_PREFIX}/author/{record_id}/merge?duplicate={record_id}"
+    )
+    assert response.status_code == 400
+    response = client.get(f"{URL_PREFIX}/author/{record_id}/merge?duplicate=999")
+    assert response.status_code == 404
+
+
+def test_read_series_books(
+    client: FlaskClient, test_db: flask_sqlalchemy.SQLAlchemy
+) -> None:
+    """Test for route /series/<record_id>/books."""
+    series = Series.create(name="Example Series")
+    for name, number in (("Four", "4"), ("One", "1"), ("Half", "1.5"), ("None", None)):
+        Book.create(name=name, series=series, series_number=number)
+    test_db.session.commit()
+    response = client.get(f"{URL_PREFIX}/series/{series.record_id}/books")
+    assert response.status_code == 200
+    assert [book["name"] for book in response.json["books"]] == [
+        "One",
+        "Half",
+        "Four",
+        "None",
+    ]
+    assert response.json["books"][1]["series_number"] == "1.5"
+    assert response.json["gaps"] == [2, 3]
+
+
+def test_list_changes(client: FlaskClient, author: Author) -> None:
+    """Test for route /changes."""
+    client.get(f"{URL_PREFIX}/author/{author.record_id}/update?name=Test")
+    response = client.get(f"{URL_PREFIX}/changes?since=0&limit=1")
+    assert response.status_code == 200
+    assert response.json["changes"][0]["operation"] == "create"
+    assert response.json["more"]
+    response = client.get(f"{URL_PREFIX}/changes?since={response.json['last_seq']}")
+    assert [c["operation"] for c in response.json["changes"]] == ["update"]
+    assert not response.json["more"]
+
+
+def test_compact_changes(client: FlaskClient, author: Author) -> None:
+    """Test for route /changes/compact."""
+    client.get(f"{URL_PREFIX}/author/{author.record_id}/update?name=Test")
+    response = client.get(f"{URL_PREFIX}/changes/compact?before=999")
+    assert response.status_code == 200
+    assert response.json["removed"] == 1
+    response = client.get(f"{URL_PREFIX}/changes/compact")
+    assert response.status_code == 400
+
+
+def test_read_batch__success(client: FlaskClient, author: Author) -> None:
+    """Test for route /batch."""
+    response = client.post(
+        f"{URL_PREFIX}/batch",
+        json=[
+            {"item": "author", "record_id": author.record_id},
+            {"item": "author", "name": author.name},
+            {"item": "book", "record_id": 999},
+        ],
+    )
+    assert response.status_code == 200
+    assert [record and record["name"] for record in response.json] == [
+        author.name,
+        author.name,
+        None,
+    ]
+
+
+def test_read_batch__failure(client: FlaskClient) -> None:
+    """Test for route /batch with invalid or too many lookups."""
+    response = client.post(f"{URL_PREFIX}/batch", json=[{"item": "FAIL"}])
+    assert response.status_code == 400
+    response = client.post(f"{URL_PREFIX}/batch", json=["FAIL"])
+    assert response.status_code == 400
+    response = client.post(f"{URL_PREFIX}/batch", json={"item": "author"})
+    assert response.status_code == 400
+    response = client.post(f"{URL_PREFIX}/batch", json=[{}] * 1000)
+    assert response.status_code == 413
+
+
+def test_read_book_similar(
+    client: FlaskClient, author: Author, test_db: flask_sqlalchemy.SQLAlchemy
+) -> None:
+    """Test for route /book/<record_id>/similar."""
+    first = Book.create(name="First", author=author)
+    Book.create(name="Second", author=author)
+    test_db.session.commit()
+    response = client.get(f"{URL_PREFIX}/book/{first.record_id}/similar")
+    assert response.json == {"record_id": first.record_id, "similar": []}
+    update_similar_books(5)
+    test_db.session.commit()
+    response = client.get(f"{URL_PREFIX}/book/{first.record_id}/similar")
+    assert [book["name"] for book in response.json["similar"]] == ["Second"]
+    assert response.json["similar"][0]["score"] == 1.0
+    assert client.get(f"{URL_PREFIX}/book/0/similar").status_code == 404
@@ -0,0 +1,113 @@
+"""Tests for audiobooks.library.similar."""
+
+from __future__ import annotations
+
+import flask_sqlalchemy
+import pytest
+
+from audiobooks.library import similar
+from audiobooks.library.changes import read_checkpoint
+from audiobooks.library.models import Author, Book, Genre, Series
+from audiobooks.library.similar import (
+    CONSUMER,
+    SimilarBook,
+    read_similar_books,
+    update_similar_books,
+)
+
+
+@pytest.fixture()
+def books(test_db: flask_sqlalchemy.SQLAlchemy) -> list[Book]:
+    """Generate books sharing authors, series, genres and release decades."""
+    alice, carol = Author.create(name="Alice Bob"), Author.create(name="Carol Dan")
+    fantasy, mystery = Genre.create(name="Fantasy"), Genre.create(name="Mystery")
+    saga = Series.create(name="Saga")
+    created = [
+        Book.create(name="Saga 1", author=alice, genre=fantasy, series=saga),
+        Book.create(name="Saga 2", author=alice, genre=fantasy, series=saga),
+        Book.create(name="Standalone", author=alice, genre=mystery),
+        Book.create(
+            name="Other", author=carol, genre=fantasy, release_date="2001-01-01"
+        ),
+        Book.create(name="Unrelated", author=carol, genre=mystery),
+        Book.create(name="Poetry", author=Author.create(name="Erin Fay")),
+    ]
+    test_db.session.commit()
+    return created
+
+
+def neighbors(book: Book) -> list[str]:
+    """Get the names of the similar books of a book."""
+    return [similar["name"] for similar in read_similar_books(book)]
+
+
+def test_update_similar_books(
+    books: list[Book], test_db: flask_sqlalchemy.SQLAlchemy
+) -> None:
+    """Test for update_similar_books with a full build and incremental updates."""
+    assert update_similar_books(2) == {"changed": 6, "updated": 6}
+    test_db.session.commit()
+    assert neighbors(books[0]) == ["Saga 2", "Standalone"]
+    assert neighbors(books[4]) == ["Other", "Standalone"]
+    assert neighbors(books[5]) == []
+    assert read_checkpoint(CONSUMER) > 0
+    assert update_similar_books(2) == {"changed": 0, "updated": 0}
+
+    books[4].update(author=books[0].author, series=books[0].series)
+    test_db.session.commit()
+    result = update_similar_books(2)
+    test_db.session.commit()
+    assert result["changed"] == 1
+    assert result["updated"] < len(books)
+    assert neighbors(books[0]) == ["Saga 2", "Unrelated"]
+
+    books[1].delete()
+    test_db.session.commit()
+    update_similar_books(2)
+    test_db.session.commit()
+    assert "Saga 2" not in neighbors(books[0])
+    stored = test_db.session.scalars(test_db.select(SimilarBook.similar_id)).all()
+    assert books[1].record_id not in stored
+
+
+def test_update_similar_books__rebuild(
+    books: list[Book], test_db: flask_sqlalchemy.SQLAlchemy
+) -> None:
+    """Test that an incremental update matches a rebuild."""
+    update_similar_books(3)
+    books[2].update(genre=books[0].genre)
+    Book.create(name="Saga 3", author=books[0].author, series=books[0].series)
+    test_db.session.commit()
+    update_similar_books(3)
+    incremental = {book.name: neighbors(book) for book in books}
+    update_similar_books(3, rebuild=True)
+    assert {book.name: neighbors(book) for book in books} == incremental
+
+
+def test_update_similar_books__affected(
+    books: list[Book],
+    test_db: flask_sqlalchemy.SQLAlchemy,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that only the books a change can reach are updated, to match a rebuild."""
+    update_similar_books(2)
+    test_db.session.commit()
+    monkeypatch.setattr(similar, "read_feature_vectors", None)
+    assert update_similar_books(2) == {"changed": 0, "updated": 0}
+    monkeypatch.undo()
+
+    books[5].update(genre=books[3].genre)
+    test_db.session.commit()
+    result = update_similar_books(2)
+    test_db.session.commit()
+    assert result == {"changed": 1, "updated": 2}
+    assert neighbors(books[3]) == ["Unrelated", "Poetry"]
+
+    books[5].update(author=books[0].author, genre=books[0].genre)
+    test_db.session.commit()
+    result = update_similar_books(2)
+    test_db.session.commit()
+    assert result["updated"] < len(books)
+    incremental = {book.name: neighbors(book) for book in books}
+    update_similar_books(2, rebuild=True)
+    assert {book.name: neighbors(book) for book in books} == incremental
@@ -0,0 +1,232 @@
+"""Tests for audiobooks.maintenance."""
+
+from __future__ import annotations
+
+import math
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+import flask
+import pytest
+from flask.testing import FlaskClient
+
+from audiobooks import maintenance
+from audiobooks.app import create_app
+from audiobooks.extensions import db
+from audiobooks.jobs.models import Job, JobStatus
+from audiobooks.jobs.tasks import job_runner, job_scheduler
+from audiobooks.library.models import Author, Book
+
+from .conftest import TestConfig
+
+
+class MaintenanceConfig(TestConfig):
+    """Configuration class for testing the maintenance of a database file."""
+
+    SQLALCHEMY_DATABASE_URI: str = (
+        f"sqlite:///{Path(tempfile.mkdtemp()) / 'maintenance.sqlite'}"
+    )
+    BACKUP_DIR: str = tempfile.mkdtemp(prefix="audiobooks-backups-")
+    BACKUP_KEEP: int = 2
+    BACKUP_PAGES_PER_STEP: int = 1
+    VACUUM_PAGES_PER_STEP: int = 1
+
+
+class ScheduleConfig(MaintenanceConfig):
+    """Configuration class for testing the job schedule."""
+
+    JOB_SCHEDULE: dict[str, float] = {"optimize_database": 0.05}  # noqa: RUF012
+
+
+BASELINE_SCHEMA = """
+CREATE TABLE author (
+    record_id INTEGER NOT NULL PRIMARY KEY,
+    name VARCHAR NOT NULL UNIQUE,
+    date_added DATE
+);
+CREATE TABLE genre (
+    record_id INTEGER NOT NULL PRIMARY KEY,
+    name VARCHAR NOT NULL UNIQUE,
+    date_added DATE
+);
+CREATE TABLE series (
+    record_id INTEGER NOT NULL PRIMARY KEY,
+    name VARCHAR NOT NULL UNIQUE,
+    date_added DATE
+);
+CREATE TABLE book (
+    record_id INTEGER NOT NULL PRIMARY KEY,
+    name VARCHAR NOT NULL UNIQUE,
+    date_added DATE,
+    author_id INTEGER REFERENCES author (record_id),
+    genre_id INTEGER REFERENCES genre (record_id),
+    series_id INTEGER REFERENCES series (record_id),
+    series_number INTEGER,
+    release_date DATE
+);
+INSERT INTO author (name) VALUES ('Alice Bob');
+INSERT INTO book (name, author_id) VALUES ('Old Book', 1);
+"""
+
+
+class UpgradeConfig(TestConfig):
+    """Configuration class for testing the upgrade of a database file."""
+
+    SQLALCHEMY_DATABASE_URI: str = (
+        f"sqlite:///{Path(tempfile.mkdtemp()) / 'upgrade.sqlite'}"
+    )
+
+
+@pytest.fixture()
+def maintenance_app() -> flask.Flask:
+    """Create an application with a database file."""
+    return create_app("tests.test_maintenance.MaintenanceConfig")
+
+
+@pytest.fixture()
+def schedule_app() -> flask.Flask:
+    """Create an application with a job schedule."""
+    schedule_app = create_app("tests.test_maintenance.ScheduleConfig")
+    yield schedule_app
+    job_scheduler.shutdown(schedule_app)
+
+
+def test_vacuum(maintenance_app: flask.Flask) -> None:
+    """Test that the database uses incremental vacuum and frees its pages."""
+    with maintenance_app.app_context():
+        status = maintenance.database_status(db.engine)
+        assert status["auto_vacuum"] == maintenance.INCREMENTAL_AUTO_VACUUM
+        assert status["journal_mode"] == "wal"
+        for i in range(200):
+            Author.create(name=f"Vacuum Author {i} {'x' * 200}")
+        db.session.commit()
+        db.session.execute(db.delete(Author))
+        db.session.commit()
+        progress: list[tuple[int, int]] = []
+        pages_per_step = 4
+        freed = maintenance.incremental_vacuum(
+            db.engine,
+            pages_per_step,
+            progress=lambda done, total: progress.append((done, total)),
+        )
+        assert freed > pages_per_step
+        assert len(progress) == math.ceil(freed / pages_per_step)
+        assert [done for done, _ in progress[:-1]] == [
+            pages_per_step * step for step in range(1, len(progress))
+        ]
+        assert maintenance.database_status(db.engine)["freelist_count"] == 0
+        assert maintenance.integrity_check(db.engine) == ["ok"]
+
+
+def test_connect_during_write(maintenance_app: flask.Flask) -> None:
+    """Test that a new connection doesn't wait for a write transaction to end."""
+    path = MaintenanceConfig.SQLALCHEMY_DATABASE_URI.removeprefix("sqlite:///")
+    writer = sqlite3.connect(path, isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")
+    try:
+        with maintenance_app.app_context():
+            db.engine.dispose()
+            with db.engine.connect() as connection:
+                query = "SELECT count(*) FROM author"
+                assert connection.exec_driver_sql(query).scalar() is not None
+    finally:
+        writer.execute("ROLLBACK")
+        writer.close()
+
+
+def test_upgrade_schema() -> None:
+    """Test that the tables of a database with the baseline schema are upgraded."""
+    path = UpgradeConfig.SQLALCHEMY_DATABASE_URI.removeprefix("sqlite:///")
+    with sqlite3.connect(path) as connection:
+        connection.executescript(BASELINE_SCHEMA)
+    connection.close()
+    upgrade_app = create_app("tests.test_maintenance.UpgradeConfig")
+    with upgrade_app.app_context():
+        columns = {
+            row.name for row in db.session.execute(db.text("PRAGMA table_info(book)"))
+        }
+        indexes = {
+            row.name for row in db.session.execute(db.text("PRAGMA index_list(book)"))
+        }
+        book = Book.get_by_id(1)
+        assert book is not None
+        assert (book.name, book.author.name, book.file_path) == (
+            "Old Book",
+            "Alice Bob",
+            None,
+        )
+        with db.engine.begin() as connection:
+            assert maintenance.upgrade_schema(connection, db.metadata) == []
+    assert {"file_path", "duration_ms"} <= columns
+    assert {"ix_book_author_duration", "ix_book_series_order"} <= indexes
+    response = upgrade_app.test_client().get("/lib/book/1")
+    assert response.status_code == 200
+    assert response.json["duration_ms"] is None
+
+
+def test_backup(maintenance_app: flask.Flask) -> None:
+    """Test that backups are consistent copies and that old backups are pruned."""
+    with maintenance_app.app_context():
+        Author.create(name="Backed Up Author")
+        db.session.commit()
+        paths = [
+            maintenance_app.extensions["maintenance"].backup()[0] for _ in range(3)
+        ]
+    backups = sorted(Path(MaintenanceConfig.BACKUP_DIR).iterdir())
+    assert backups == sorted(paths[1:])
+    with sqlite3.connect(paths[-1]) as connection:
+        names = connection.execute("SELECT name FROM author").fetchall()
+    assert ("Backed Up Author",) in names
+
+
+def test_cli(maintenance_app: flask.Flask) -> None:
+    """Test for the maintenance commands."""
+    runner = maintenance_app.test_cli_runner()
+    result = runner.invoke(args=["maintenance", "check", "--quick"])
+    assert result.exit_code == 0
+    assert result.output == "ok\n"
+    result = runner.invoke(args=["maintenance", "optimize", "--full"])
+    assert result.exit_code == 0
+    target = Path(tempfile.mkdtemp()) / "cli.sqlite"
+    result = runner.invoke(args=["maintenance", "backup", str(target)])
+    assert result.exit_code == 0
+    assert target.exists()
+
+
+def test_schedule(schedule_app: flask.Flask) -> None:
+    """Test that the scheduler submits the scheduled jobs."""
+    deadline = time.monotonic() + 5
+    with schedule_app.app_context():
+        while time.monotonic() < deadline:
+            query = db.select(Job).where(Job.job_type == "optimize_database")
+            if job := db.session.scalars(query).first():
+                break
+            db.session.rollback()
+            time.sleep(0.05)
+        assert job is not None
+        job = job_runner.wait(job.record_id, timeout=5)
+        response = schedule_app.test_client().get("/admin/maintenance")
+    assert response.json["schedule"] == {"optimize_database": 0.05}
+    assert job.status == JobStatus.SUCCEEDED
+
+
+def test_routes(maintenance_app: flask.Flask, client: FlaskClient) -> None:
+    """Test for the admin maintenance routes."""
+    maintenance_client = maintenance_app.test_client()
+    response = maintenance_client.get("/admin/maintenance/check")
+    assert response.status_code == 302
+    job_id = int(response.headers["Location"].removeprefix("/jobs/"))
+    with maintenance_app.app_context():
+        job = job_runner.wait(job_id, timeout=5)
+    assert job.result == {"ok": True, "problems": []}
+    response = maintenance_client.get("/admin/maintenance")
+    assert response.status_code == 200
+    assert response.json["database"]["journal_mode"] == "wal"
+    assert maintenance_client.get("/admin/maintenance/shred").status_code == 404
+    response = maintenance_client.get("/admin/maintenance/check?FAIL=FAIL")
+    assert response.status_code == 400
+    response = client.get("/admin/maintenance")
+    assert response.status_code == 200
+    assert response.json["database"]["journal_mode"] == "memory"
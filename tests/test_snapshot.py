@@ -0,0 +1,88 @@
+"""Tests for audiobooks.snapshot."""
+
+from __future__ import annotations
+
+import sqlite3
+import tempfile
+from pathlib import Path
+
+import flask
+import pytest
+
+from audiobooks.app import create_app
+from audiobooks.database import db
+from audiobooks.extensions import read_snapshot
+from audiobooks.library.models import Author
+from audiobooks.snapshot import EXTENSION_NAME, Snapshot
+
+from .conftest import TestConfig
+
+
+class SnapshotConfig(TestConfig):
+    """Configuration class for testing the read snapshot."""
+
+    SQLALCHEMY_DATABASE_URI: str = (
+        f"sqlite:///{Path(tempfile.mkdtemp()) / 'snapshot.sqlite'}"
+    )
+    READ_SNAPSHOT: bool = True
+    READ_SNAPSHOT_MAX_AGE: float = 60.0
+    READ_SNAPSHOT_REFRESH_INTERVAL: float = 0.0
+    READ_SNAPSHOT_MIN_REFRESH_INTERVAL: float = 0.0
+
+
+@pytest.fixture()
+def snapshot_app() -> flask.Flask:
+    """Create an application serving reads from a snapshot."""
+    app = create_app("tests.test_snapshot.SnapshotConfig")
+    yield app
+    read_snapshot.shutdown(app)
+
+
+def test_snapshot_refresh(snapshot_app: flask.Flask) -> None:
+    """Test that Snapshot.refresh only copies the database when it changed."""
+    snapshot: Snapshot = snapshot_app.extensions[EXTENSION_NAME]
+    assert not snapshot.refresh()
+    with snapshot_app.app_context():
+        Author.create(name="Snapshot Author")
+        db.session.commit()
+    assert snapshot.is_stale
+    assert snapshot.refresh()
+
+
+def test_snapshot_reads(snapshot_app: flask.Flask) -> None:
+    """Test that reads see the writes committed by the application."""
+    client = snapshot_app.test_client()
+    response = client.get("/lib/author/create?name=Snapshot%20Reader")
+    assert response.status_code == 302
+    record_id = response.headers["Location"].removeprefix("./")
+    response = client.get(f"/lib/author/{record_id}")
+    assert response.status_code == 200
+    assert response.json["name"] == "Snapshot Reader"
+    response = client.get("/lib/author/find?name=snapshot%20reader")
+    assert response.status_code == 302
+
+
+def test_snapshot_min_interval(snapshot_app: flask.Flask) -> None:
+    """Test that the writes don't copy the database more than once per interval."""
+    snapshot: Snapshot = snapshot_app.extensions[EXTENSION_NAME]
+    snapshot.min_interval = 60.0
+    client = snapshot_app.test_client()
+    response = client.get("/lib/author/create?name=Rate%20Limited")
+    record_id = response.headers["Location"].removeprefix("./")
+    assert client.get(f"/lib/author/{record_id}").status_code == 200
+    assert snapshot.is_stale
+    with snapshot_app.app_context():
+        assert read_snapshot.session is db.session
+    assert snapshot.refresh(force=True)
+    assert not snapshot.is_stale
+
+
+def test_snapshot_shutdown(snapshot_app: flask.Flask) -> None:
+    """Test that the shutdown stops the snapshot and closes its connections."""
+    snapshot: Snapshot = snapshot_app.extensions[EXTENSION_NAME]
+    snapshot.start(60.0)
+    read_snapshot.shutdown(snapshot_app)
+    assert EXTENSION_NAME not in snapshot_app.extensions
+    assert snapshot.engine is None
+    with pytest.raises(sqlite3.ProgrammingError):
+        snapshot.refresh()